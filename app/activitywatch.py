@@ -1,22 +1,88 @@
 """
 ActivityWatch API client for querying laptop activity time data.
 """
-import requests
+import codecs
 import json
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+import requests
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Dict, Iterable, Optional
+from config import Config
+from app.models import SessionLocal, ActivityWatchDay
+
+# One keep-alive connection pool for every ActivityWatch request in the process
+_http = requests.Session()
+
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def iter_query_events(chunks: Iterable[bytes]):
+    """
+    Incrementally parse a /query response holding one list of events per
+    timeperiod ([[event, ...], ...]) from an iterable of byte chunks.
+    Yields (period index, event) as soon as each event is complete, so
+    only the current event and one chunk are held in memory rather than
+    the whole body. Non-list period results (e.g. null) are skipped.
+    Raises ValueError on malformed or truncated JSON.
+    """
+    text = codecs.getincrementaldecoder("utf-8")()
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    buffer, pos, eof = "", 0, False
+    period = -1
+    in_outer = in_period = False
+    
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(buffer):
+            if eof:
+                raise ValueError("Truncated ActivityWatch response")
+            chunk = next(chunks, None)
+            eof = chunk is None
+            buffer, pos = buffer[pos:] + text.decode(chunk or b"", final=eof), 0
+            continue
+        
+        char = buffer[pos]
+        if not in_outer:
+            if char != "[":
+                raise ValueError("Expected a list of timeperiod results")
+            in_outer, pos = True, pos + 1
+        elif not in_period and char == "]":
+            return
+        elif not in_period and char == "[":
+            period, in_period, pos = period + 1, True, pos + 1
+        elif in_period and char == "]":
+            in_period, pos = False, pos + 1
+        else:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                value, end = None, None
+            # A value running to the end of the buffer may continue in the next chunk (e.g. a number)
+            if end is None or (end == len(buffer) and not eof):
+                if eof:
+                    raise ValueError("Malformed ActivityWatch response")
+                chunk = next(chunks, None)
+                eof = chunk is None
+                buffer, pos = buffer[pos:] + text.decode(chunk or b"", final=eof), 0
+                continue
+            pos = end
+            if in_period:
+                yield period, value
+            else:
+                period += 1  # A period whose result isn't an event list
 
 
 class ActivityWatchClient:
-    def __init__(self, base_url: str = "http://localhost:5600"):
-        self.base_url = base_url
-        self.api_url = f"{base_url}/api/0"
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = base_url or Config.ACTIVITYWATCH_URL
+        self.api_url = f"{self.base_url}/api/0"
     
     def _make_request(self, method: str, endpoint: str, **kwargs) -> Optional[Dict]:
         """Make HTTP request to ActivityWatch API with error handling."""
         try:
             url = f"{self.api_url}{endpoint}"
-            response = requests.request(method, url, timeout=5, **kwargs)
+            response = _http.request(method, url, timeout=Config.ACTIVITYWATCH_TIMEOUT_SECONDS, **kwargs)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.ConnectionError:
@@ -26,85 +92,209 @@ class ActivityWatchClient:
             print(f"ActivityWatch API error: {e}")
             return None
     
+    def _stream_query(self, days: List[date], query: str, row) -> Optional[Dict[str, list]]:
+        """
+        Run an event `query` over one timeperiod per local date in `days`,
+        parsing the response as it streams in and keeping only row(event)
+        for each event. Returns {iso date: [rows]}, or None if
+        ActivityWatch is unavailable or the response is malformed.
+        """
+        rows = {d.isoformat(): [] for d in days}
+        keys = list(rows)
+        try:
+            with _http.post(f"{self.api_url}/query", json={"timeperiods": self._day_periods(days), "query": [query]},
+                            timeout=Config.ACTIVITYWATCH_TIMEOUT_SECONDS, stream=True) as response:
+                response.raise_for_status()
+                for period, event in iter_query_events(response.iter_content(STREAM_CHUNK_BYTES)):
+                    rows[keys[period]].append(row(event))
+        except requests.exceptions.ConnectionError:
+            print("ActivityWatch not running or not accessible")
+            return None
+        except (requests.exceptions.RequestException, ValueError, KeyError, IndexError) as e:
+            print(f"ActivityWatch API error: {e}")
+            return None
+        return rows
+    
     def get_buckets(self) -> Optional[List[str]]:
         """Get list of available buckets."""
         buckets = self._make_request("GET", "/buckets")
         return list(buckets.keys()) if buckets else None
     
-    def query_active_time(self, start_date: datetime, end_date: datetime) -> Optional[List[Dict]]:
-        """Query ActivityWatch for active time (excluding AFK) within date range."""
-        
-        # Convert to UTC for ActivityWatch query (ActivityWatch stores in UTC)
-        from datetime import timezone
-        
-        # If start_date/end_date are naive, assume they're local time
-        if start_date.tzinfo is None:
-            # Use system local timezone
-            start_date = start_date.replace(tzinfo=datetime.now().astimezone().tzinfo)
-        if end_date.tzinfo is None:
-            # Use system local timezone  
-            end_date = end_date.replace(tzinfo=datetime.now().astimezone().tzinfo)
-        
-        # Convert to UTC for the query
-        start_utc = start_date.astimezone(timezone.utc)
-        end_utc = end_date.astimezone(timezone.utc)
-        
-        # Format dates for ActivityWatch query
-        start_str = start_utc.strftime("%Y-%m-%dT%H:%M:%S")
-        end_str = end_utc.strftime("%Y-%m-%dT%H:%M:%S")
-        
-        # ActivityWatch query to get active time excluding AFK periods
-        query = f"""
+    # Active time: window events intersected with not-AFK periods and summed by
+    # ActivityWatch itself, so only one number per timeperiod comes back
+    ACTIVE_SECONDS_QUERY = """
         afk_events = query_bucket(find_bucket("aw-watcher-afk_"));
+        not_afk = filter_keyvals(afk_events, "status", ["not-afk"]);
         window_events = query_bucket(find_bucket("aw-watcher-window_"));
-        active_events = filter_period_intersect(window_events, 
-            filter_keyvals(afk_events, "status", ["not-afk"]));
-        RETURN = active_events;
+        active_events = filter_period_intersect(window_events, not_afk);
+        RETURN = sum_durations(active_events);
+    """
+    
+    @staticmethod
+    def _timeperiod(start: datetime, end: datetime) -> str:
+        """ActivityWatch timeperiod for an aware start/end, in UTC."""
+        start_str = start.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+00:00")
+        end_str = end.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+00:00")
+        return f"{start_str}/{end_str}"
+    
+    @classmethod
+    def _day_periods(cls, days: List[date]) -> List[str]:
+        """One timeperiod per local date, from local midnight to local midnight."""
+        return [
+            cls._timeperiod(datetime.combine(d, datetime.min.time()).astimezone(),
+                            datetime.combine(d + timedelta(days=1), datetime.min.time()).astimezone())
+            for d in days
+        ]
+    
+    def query_days(self, days: Iterable[date]) -> Optional[Dict[str, float]]:
         """
+        Active seconds (excluding AFK) for each local date in `days`, from one
+        query with a timeperiod per day. ActivityWatch clips events to each
+        period, so activity spanning midnight is split exactly.
+        Returns None if ActivityWatch is unavailable.
+        """
+        days = list(days)
+        if not days:
+            return {}
         
         query_data = {
-            "timeperiods": [f"{start_str}/{end_str}"],
-            "query": [query.strip()]
+            "timeperiods": self._day_periods(days),
+            "query": [self.ACTIVE_SECONDS_QUERY.strip()]
         }
         
         result = self._make_request("POST", "/query", json=query_data)
-        return result[0] if result and len(result) > 0 else []
+        if result is None:
+            return None  # ActivityWatch unavailable (as opposed to no activity)
+        return {d.isoformat(): float(seconds or 0) for d, seconds in zip(days, result)}
+    
+    NOT_AFK_QUERY = """
+        afk_events = query_bucket(find_bucket("aw-watcher-afk_"));
+        not_afk = filter_keyvals(afk_events, "status", ["not-afk"]);
+        RETURN = sort_by_timestamp(not_afk);
+    """
+    
+    def query_not_afk_intervals(self, days: Iterable[date]) -> Optional[Dict[str, List[tuple]]]:
+        """
+        Not-AFK periods for each local date in `days` as sorted
+        (start, end) POSIX timestamps, clipped to the day. Returns None if
+        ActivityWatch is unavailable.
+        """
+        days = list(days)
+        if not days:
+            return {}
+        
+        intervals = self._stream_query(days, self.NOT_AFK_QUERY.strip(), _span)
+        if intervals is None:
+            return None
+        return {day: sorted(spans) for day, spans in intervals.items()}
+    
+    WINDOW_EVENTS_QUERY = """
+        afk_events = query_bucket(find_bucket("aw-watcher-afk_"));
+        not_afk = filter_keyvals(afk_events, "status", ["not-afk"]);
+        window_events = query_bucket(find_bucket("aw-watcher-window_"));
+        active_events = filter_period_intersect(window_events, not_afk);
+        RETURN = sort_by_timestamp(active_events);
+    """
+    
+    def query_window_events(self, days: Iterable[date]) -> Optional[Dict[str, List[tuple]]]:
+        """
+        Not-AFK window events for each local date in `days` as sorted
+        (start, end, app, title) tuples with POSIX timestamps, clipped to
+        the day. Returns None if ActivityWatch is unavailable.
+        """
+        days = list(days)
+        if not days:
+            return {}
+        
+        events = self._stream_query(days, self.WINDOW_EVENTS_QUERY.strip(), _window)
+        if events is None:
+            return None
+        return {day: sorted(rows) for day, rows in events.items()}
+    
+    def calculate_daily_seconds(self, start_date: datetime, end_date: datetime) -> Optional[Dict[str, float]]:
+        """
+        Unrounded active seconds per local day in [start_date, end_date), queried
+        live. Returns None if ActivityWatch is unavailable.
+        """
+        return self.query_days(_dates(start_date.date(), end_date))
     
     def calculate_daily_hours(self, start_date: datetime, end_date: datetime) -> Dict[str, float]:
         """Calculate daily active hours from ActivityWatch data."""
-        active_events = self.query_active_time(start_date, end_date)
+        daily_seconds = self.calculate_daily_seconds(start_date, end_date)
         
-        if not active_events:
+        if not daily_seconds:
             return {}
         
-        daily_hours = {}
-        
-        for event in active_events:
-            # Parse event timestamp and duration
-            timestamp = datetime.fromisoformat(event['timestamp'].replace('Z', '+00:00'))
-            duration_seconds = event['duration']
-            
-            # Convert to local timezone and get date key (YYYY-MM-DD)
-            local_timestamp = timestamp.astimezone()
-            date_key = local_timestamp.date().isoformat()
-            
-            # Add duration to daily total (convert seconds to hours)
-            if date_key not in daily_hours:
-                daily_hours[date_key] = 0
-            daily_hours[date_key] += duration_seconds / 3600
+        # Convert to hours, rounded to 1 decimal place
+        return {date: round(seconds / 3600, 1) for date, seconds in daily_seconds.items()}
+
+
+def _span(event: Dict) -> tuple:
+    """(start, end) POSIX timestamps of an event."""
+    start = datetime.fromisoformat(event['timestamp'].replace('Z', '+00:00')).timestamp()
+    return (start, start + event['duration'])
+
+
+def _window(event: Dict) -> tuple:
+    """(start, end, app, title) of a window event."""
+    data = event.get('data') or {}
+    return _span(event) + (data.get('app') or '', data.get('title') or '')
+
+
+def _dates(start: date, end) -> List[date]:
+    """Local dates from `start` up to (not including) the day `end` falls on, or midnight `end`."""
+    if isinstance(end, datetime):
+        end_day = end.date() + timedelta(days=1) if end.time() != datetime.min.time() else end.date()
+    else:
+        end_day = end
+    return [start + timedelta(days=n) for n in range((end_day - start).days)]
+
+
+def get_daily_active_seconds(start: date, end: date) -> Dict[str, Optional[float]]:
+    """
+    Active seconds per local date in [start, end). Closed days come from the
+    activitywatch_days table; only today and closed days not stored yet are
+    queried (in one request), and the closed ones are stored. Future days
+    are 0. Days ActivityWatch couldn't provide (it's down and they aren't
+    stored) are None.
+    """
+    today = date.today()
+    days = _dates(start, end)
+    keys = [d.isoformat() for d in days]
+    
+    db = SessionLocal()
+    try:
+        rows = db.query(ActivityWatchDay).filter(ActivityWatchDay.day.in_(keys)).all()
+        seconds = {row.day: row.active_seconds for row in rows if row.day < today.isoformat()}
         
-        # Round to 1 decimal place
-        return {date: round(hours, 1) for date, hours in daily_hours.items()}
+        missing = [d for d in days if d <= today and d.isoformat() not in seconds]
+        fetched = ActivityWatchClient().query_days(missing) if missing else {}
+        if fetched:
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            for key, value in fetched.items():
+                if key < today.isoformat():
+                    db.merge(ActivityWatchDay(day=key, active_seconds=value, fetched_at=now))
+            db.commit()
+            seconds.update(fetched)
+    finally:
+        db.close()
+    
+    return {d.isoformat(): (0.0 if d > today else seconds.get(d.isoformat())) for d in days}
 
 
 def get_activitywatch_hours(view: str = "week") -> List[Dict]:
-    """Get ActivityWatch hours data for the specified time period."""
-    from datetime import date
-    
-    client = ActivityWatchClient()
+    """
+    Get ActivityWatch hours for the current week (Sunday→Saturday), the
+    current month, or the last 365 days ('year'). Closed days are served
+    from the local cache, so this works for past days while ActivityWatch
+    is offline (days it never provided show 0).
+    """
     today = date.today()
     
-    if view == "month":
+    if view == "year":
+        start = today - timedelta(days=365)
+        end = today + timedelta(days=1)
+    elif view == "month":
         # First day of current month
         start = today.replace(day=1)
         # First day of next month
@@ -119,20 +309,10 @@ def get_activitywatch_hours(view: str = "week") -> List[Dict]:
         start = today - timedelta(days=days_since_sunday)
         end = start + timedelta(days=7)
     
-    # Convert to datetime for ActivityWatch API
-    start_dt = datetime.combine(start, datetime.min.time())
-    end_dt = datetime.combine(end, datetime.min.time())
-    
-    # Get daily hours from ActivityWatch
-    daily_hours = client.calculate_daily_hours(start_dt, end_dt)
-    
-    # Build output in same format as other endpoints
-    out = []
-    current_date = start
-    while current_date < end:
-        date_str = current_date.isoformat()
-        hours = daily_hours.get(date_str, 0)
-        out.append({"date": date_str, "hours": hours})
-        current_date += timedelta(days=1)
+    daily_seconds = get_daily_active_seconds(start, end)
     
-    return out
\ No newline at end of file
+    # Build output in same format as other endpoints, rounded to 1 decimal place
+    return [
+        {"date": day, "hours": round((seconds or 0) / 3600, 1)}
+        for day, seconds in daily_seconds.items()
+    ]
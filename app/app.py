@@ -1,22 +1,53 @@
 from flask import Flask, jsonify, request, render_template
-from app.models import init_db, SessionLocal, Switch
+from app.models import init_db, engine, lock_for_write, SessionLocal, Switch
 from sqlalchemy.exc import IntegrityError
-from app.models import CustomTask, TagPreset, TodoItem, generate_internal_ticket_id
-from app.jira_client import get_assigned_tickets
+from app.models import CustomTask, TagPreset, TodoItem, TimeBudget, SuggestionRule, generate_internal_ticket_id
+from app.ticket_cache import get_assigned_tickets
+from app.jira_client import get_jira_health
 from app.activitywatch import get_activitywatch_hours
-from app.timesync import get_timewarrior_intervals, get_jira_worklogs, batch_sync_to_jira, get_timewarrior_by_ticket, get_single_ticket_data
+from app.timesync import get_timewarrior_intervals, iter_timewarrior_intervals, iter_with_existing_worklogs, get_jira_worklogs, get_timewarrior_by_ticket, get_single_ticket_data, attach_existing_worklogs, aggregate_intervals, AGGREGATE_MODES
+from app.switch_stats import record_switch, get_anomaly_status
+from app.budgets import apply_session, get_budget_status, PERIODS, SCOPES
+from app.issue_metadata import start_issue_metadata_resolver, get_time_by_issue_field
+from app.reconciliation import get_reconciliation
+from app.attribution import get_attribution, forget_session_days, GROUPS
+from app.chaos import get_daily_chaos, get_chaos_correlation
+from app.suggestions import get_suggestions, rule_dict, validate_pattern, FIELDS as SUGGESTION_FIELDS
+from app.jobs import start_job_workers, enqueue_job, get_job, list_jobs, cancel_job, job_events
+from app.responses import configure_responses, wants_ndjson, ndjson_response, csv_response
 from datetime import date, timedelta, datetime, timezone
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, text, type_coerce, case, select, Float
+from sqlalchemy.orm import aliased
 import json
-import csv
 import time
-from io import StringIO
 from flask import Response
 
-# Initialize database (creates tables if needed)
-init_db()
-
 app = Flask(__name__)
+configure_responses(app)
+
+
+def init_app():
+    """
+    One-time setup before serving: create tables and run migrations. Run it
+    once per start (in the gunicorn master, see gunicorn.conf.py), not in
+    every worker process. The pool is emptied afterwards so forked workers
+    never share the master's SQLite connections.
+    """
+    init_db()
+    engine.dispose()
+
+
+def start_background_threads():
+    """
+    Start this process's background threads: the JIRA metadata scheduler
+    and the job workers. Threads don't survive a fork, so a pre-forking
+    server calls this in each worker after forking.
+    """
+    # Resolve epic/component/type metadata for tracked tickets in the background
+    start_issue_metadata_resolver()
+
+    # Run queued sync/refresh jobs in the background
+    start_job_workers()
 
 
 def get_current_task_from_db():
@@ -51,6 +82,29 @@ def format_duration(start_time):
     return f"{minutes}m"
 
 
+def get_analytics_range(view):
+    """
+    Date range for analytics endpoints: 'week' (Sunday→Saturday),
+    'month' (30-day rolling window) or 'year' (365-day rolling window).
+    """
+    today = date.today()
+    if view == "year":
+        return today - timedelta(days=365), today + timedelta(days=1)
+    if view == "month":
+        return today - timedelta(days=30), today + timedelta(days=1)
+    days_since_sunday = (today.weekday() + 1) % 7
+    start_date = today - timedelta(days=days_since_sunday)
+    return start_date, start_date + timedelta(days=7)
+
+
+def session_seconds_until_next():
+    """SQL expression: seconds from a switch until the next switch (NULL for the last one)."""
+    next_timestamp = func.lead(Switch.timestamp).over(order_by=Switch.timestamp)
+    # julianday() is only millisecond-accurate, so round away the float noise
+    seconds = func.round((func.julianday(next_timestamp) - func.julianday(Switch.timestamp)) * 86400, 3)
+    return type_coerce(seconds, Float)
+
+
 @app.route("/", methods=["GET"])
 def index():
     """
@@ -146,6 +200,9 @@ def current():
         minutes, _ = divmod(remainder, 60)
         total_duration = f"{hours}h {minutes}m"
 
+        # Budgets covering the current task, including the open session
+        budgets = get_budget_status(db, current_task, start_time, task=current_task) if current_task else []
+
     finally:
         db.close()
 
@@ -159,13 +216,14 @@ def current():
         "current": current_task,
         "summary": summary,
         "today": entries,
-        "total": total_duration
+        "total": total_duration,
+        "budgets": budgets
     }), 200
 
 @app.route("/tickets", methods=["GET"])
 def tickets():
     """
-    Return a list of up-to-date Jira tickets assigned to the user.
+    Return a list of Jira tickets assigned to the user from the local cache.
     """
     try:
         issues = get_assigned_tickets()
@@ -175,6 +233,14 @@ def tickets():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/tickets/refresh", methods=["POST"])
+def refresh_tickets():
+    """
+    Queue a full resync of the assigned-tickets cache with JIRA.
+    """
+    job_id = enqueue_job("tickets_refresh", {"full": True}, unique=True)
+    return jsonify({"job_id": job_id}), 202
+
 @app.route("/switch", methods=["POST"])
 def do_switch():
     """
@@ -194,12 +260,13 @@ def do_switch():
     if tags and not isinstance(tags, list):
         return jsonify({"error": "Tags must be an array"}), 400
 
+    # Log into the database; holding the write lock keeps concurrent switches from both closing the same task
+    db = SessionLocal()
+    lock_for_write(db)
+
     # Get current task from database
     from_task, _ = get_current_task_from_db()
 
-    # Log into the database
-    db = SessionLocal()
-
     # Set end_time for the previous task (if any)
     if from_task:
         # Find the most recent switch to the from_task and set its end_time
@@ -211,6 +278,7 @@ def do_switch():
         if previous_switch:
             # Store end time in UTC to match timestamp format
             previous_switch.end_time = datetime.now(timezone.utc).replace(tzinfo=None)
+            apply_session(db, previous_switch.to_task, previous_switch.timestamp, previous_switch.end_time)
 
     # Serialize tags to JSON string for SQLite storage
     tags_json = json.dumps(tags) if tags else None
@@ -224,6 +292,11 @@ def do_switch():
         is_switch=is_switch
     )
     db.add(record)
+
+    # Update running switch-rate statistics for anomaly detection
+    if is_switch:
+        record_switch(db)
+
     db.commit()
     db.close()
 
@@ -237,13 +310,15 @@ def stop_current():
     """
     Stop the current task by setting its end_time. No new record is created.
     """
+    db = SessionLocal()
+    lock_for_write(db)
     from_task, _ = get_current_task_from_db()
 
     if not from_task:
+        db.close()
         return jsonify({"from": None, "to": ""}), 200
 
     # Set end_time for the current task being stopped
-    db = SessionLocal()
     current_switch = db.query(Switch).filter(
         Switch.to_task == from_task,
         Switch.end_time.is_(None)
@@ -251,6 +326,7 @@ def stop_current():
 
     if current_switch:
         current_switch.end_time = datetime.now(timezone.utc).replace(tzinfo=None)
+        apply_session(db, current_switch.to_task, current_switch.timestamp, current_switch.end_time)
         db.commit()
 
     db.close()
@@ -420,6 +496,84 @@ def get_internal_tasks():
     
     return jsonify(result), 200
 
+@app.route("/budgets", methods=["GET"])
+def get_budgets():
+    """
+    Return every time budget with its consumption for the current period.
+    Reads the running counters only; the open session is added live.
+    """
+    current_task, start_time = get_current_task_from_db()
+    db = SessionLocal()
+    try:
+        return jsonify(get_budget_status(db, current_task, start_time)), 200
+    finally:
+        db.close()
+
+@app.route("/budgets", methods=["POST"])
+def set_budget():
+    """
+    Create or update a budget.
+    Expects JSON: {"scope": "ticket|project", "target": "OPS-123", "hours": 8,
+                   "period": "lifetime|week|month", "alert_threshold": 0.8}
+    """
+    data = request.get_json(force=True)
+    scope = data.get("scope", "ticket")
+    target = (data.get("target") or "").strip()
+    period = data.get("period", "lifetime")
+    hours = data.get("hours")
+    alert_threshold = data.get("alert_threshold", 0.8)
+
+    if scope not in SCOPES:
+        return jsonify({"error": "Invalid scope. Must be: ticket, project"}), 400
+    if period not in PERIODS:
+        return jsonify({"error": "Invalid period. Must be: lifetime, week, month"}), 400
+    if not target:
+        return jsonify({"error": "Missing 'target'"}), 400
+    try:
+        hours = float(hours)
+        alert_threshold = float(alert_threshold)
+    except (TypeError, ValueError):
+        return jsonify({"error": "'hours' and 'alert_threshold' must be numbers"}), 400
+    if hours <= 0 or not 0 < alert_threshold <= 1:
+        return jsonify({"error": "'hours' must be positive and 'alert_threshold' between 0 and 1"}), 400
+
+    db = SessionLocal()
+    try:
+        budget = db.query(TimeBudget).filter(
+            TimeBudget.scope == scope,
+            TimeBudget.target == target,
+            TimeBudget.period == period
+        ).first()
+        created = budget is None
+        if created:
+            budget = TimeBudget(scope=scope, target=target, period=period)
+            db.add(budget)
+        budget.hours = hours
+        budget.alert_threshold = alert_threshold
+        db.commit()
+
+        status = get_budget_status(db, task=target if scope == "ticket" else None)
+        entry = next((b for b in status if b["id"] == budget.id), None)
+        return jsonify(entry), 201 if created else 200
+    finally:
+        db.close()
+
+@app.route("/budgets/<int:budget_id>", methods=["DELETE"])
+def delete_budget(budget_id):
+    """
+    Delete a budget. Running totals are kept.
+    """
+    db = SessionLocal()
+    try:
+        budget = db.query(TimeBudget).filter(TimeBudget.id == budget_id).first()
+        if not budget:
+            return jsonify({"error": "Budget not found"}), 404
+        db.delete(budget)
+        db.commit()
+        return jsonify({"message": f"Budget {budget_id} deleted"}), 200
+    finally:
+        db.close()
+
 @app.route("/tags/presets", methods=["GET"])
 def get_tag_presets():
     """
@@ -538,11 +692,19 @@ def get_switch_counts():
     db.close()
     return jsonify(out), 200
 
+def metrics_switch_row(r):
+    return {"timestamp": r.timestamp.astimezone().isoformat(),
+            "from": r.from_task,
+            "to":   r.to_task,
+            "note": r.note,
+            "category": r.category}
+
 @app.route("/metrics/switches", methods=["GET"])
 def get_switches():
     """
     Return the raw Switch records for the specified time period, ordered newest-first.
     View parameter: 'week' or 'month' (defaults to 'month')
+    With Accept: application/x-ndjson the rows are streamed, one per line.
     """
     view = request.args.get("view", "month")
     today = date.today()
@@ -561,133 +723,117 @@ def get_switches():
             end_date = date(start_date.year, start_date.month + 1, 1)
 
     db = SessionLocal()
-    rows = (
+    query = (
         db.query(Switch)
         .filter(Switch.timestamp >= start_date)
         .filter(Switch.timestamp < end_date)
         .filter(Switch.is_switch.is_(True))
         .order_by(Switch.timestamp.desc())
-        .all()
     )
+    if wants_ndjson():
+        return ndjson_response((metrics_switch_row(r) for r in query.yield_per(1000)), db.close), 200
+
+    rows = query.all()
     db.close()
 
-    out = [
-        {"timestamp": r.timestamp.astimezone().isoformat(),
-            "from": r.from_task,
-            "to":   r.to_task,
-            "note": r.note,
-            "category": r.category}
-        for r in rows
-    ]
+    out = [metrics_switch_row(r) for r in rows]
     return jsonify(out), 200
 
 @app.route("/analytics/time-consumers", methods=["GET"])
 def get_time_consumers():
     """
     Return top time consuming tasks based on duration between switches.
-    View parameter: 'week' or 'month'
+    View parameter: 'week', 'month' or 'year'
+    Group parameter: 'task' (default) or 'project' (ticket key prefix)
     """
     view = request.args.get("view", "week")
-    today = date.today()
-
-    if view == "month":
-        # 30-day rolling window
-        start_date = today - timedelta(days=30)
-        end_date = today + timedelta(days=1)
-    else:
-        days_since_sunday = (today.weekday() + 1) % 7
-        start_date = today - timedelta(days=days_since_sunday)
-        end_date = start_date + timedelta(days=7)
+    group = request.args.get("group", "task")
+    start_date, end_date = get_analytics_range(view)
 
     db = SessionLocal()
 
-    # Get all switches in the time period (including non-context switches for time tracking)
-    switches = (
-        db.query(Switch)
+    # Duration of each session = time until the next switch (including
+    # non-context switches for time tracking), computed with a window function
+    sessions = (
+        db.query(
+            Switch.to_task.label("task"),
+            Switch.project.label("project"),
+            session_seconds_until_next().label("duration")
+        )
         .filter(Switch.timestamp >= start_date)
         .filter(Switch.timestamp < end_date)
-        .order_by(Switch.timestamp.asc())
-        .all()
+        .subquery()
     )
 
-    # Calculate time spent on each task
-    task_durations = {}
-
-    for i in range(len(switches) - 1):
-        current_switch = switches[i]
-        next_switch = switches[i + 1]
-
-        if current_switch.to_task:
-            duration = (next_switch.timestamp - current_switch.timestamp).total_seconds()
-            task = current_switch.to_task
-
-            if task not in task_durations:
-                task_durations[task] = {'total_seconds': 0,
-                    'switch_count': 0,
-                    'avg_session': 0}
-
-            task_durations[task]['total_seconds'] += duration
-            task_durations[task]['switch_count'] += 1
+    key = sessions.c.project if group == "project" else sessions.c.task
+    rows = (
+        db.query(
+            key.label("key"),
+            func.sum(sessions.c.duration).label("total_seconds"),
+            func.count().label("switch_count")
+        )
+        .filter(sessions.c.duration.isnot(None))
+        .filter(sessions.c.task.isnot(None))
+        .filter(sessions.c.task != "")
+        .group_by(key)
+        .order_by(desc("total_seconds"))
+        .limit(10)
+        .all()
+    )
+    db.close()
 
-    # Calculate averages and format results
+    # Format results
     result = []
-    for task, data in task_durations.items():
-        if data['switch_count'] > 0:
-            avg_session = data['total_seconds'] / data['switch_count']
-            hours = data['total_seconds'] / 3600
+    for row in rows:
+        avg_session = row.total_seconds / row.switch_count
+        hours = row.total_seconds / 3600
 
-            result.append({'task': task,
-                'total_hours': round(hours, 2),
-                'total_seconds': data['total_seconds'],
-                'switch_count': data['switch_count'],
-                'avg_session_minutes': round(avg_session / 60, 1)})
+        result.append({'project' if group == "project" else 'task': row.key,
+            'total_hours': round(hours, 2),
+            'total_seconds': row.total_seconds,
+            'switch_count': row.switch_count,
+            'avg_session_minutes': round(avg_session / 60, 1)})
 
-    # Sort by total time spent
-    result.sort(key=lambda x: x['total_seconds'], reverse=True)
-
-    db.close()
-    return jsonify(result[:10]), 200  # Top 10
+    return jsonify(result), 200  # Top 10
 
 @app.route("/analytics/switch-leaders", methods=["GET"])
 def get_switch_leaders():
     """
     Return tasks that cause the most context switches.
-    View parameter: 'week' or 'month'
+    View parameter: 'week', 'month' or 'year'
+    Group parameter: 'task' (default) or 'project' (ticket key prefix)
     """
     view = request.args.get("view", "week")
-    today = date.today()
+    group = request.args.get("group", "task")
+    start_date, end_date = get_analytics_range(view)
 
-    if view == "month":
-        # 30-day rolling window
-        start_date = today - timedelta(days=30)
-        end_date = today + timedelta(days=1)
+    if group == "project":
+        from_key, to_key = Switch.from_project, Switch.project
     else:
-        days_since_sunday = (today.weekday() + 1) % 7
-        start_date = today - timedelta(days=days_since_sunday)
-        end_date = start_date + timedelta(days=7)
+        from_key, to_key = Switch.from_task, Switch.to_task
 
     db = SessionLocal()
 
     # Count switches by task (both from and to)
     from_counts = (
-        db.query(Switch.from_task, func.count().label('count'))
+        db.query(from_key, func.count().label('count'))
         .filter(Switch.timestamp >= start_date)
         .filter(Switch.timestamp < end_date)
         .filter(Switch.is_switch.is_(True))
-        .filter(Switch.from_task.isnot(None))
-        .filter(Switch.from_task != '')
-        .group_by(Switch.from_task)
+        .filter(from_key.isnot(None))
+        .filter(from_key != '')
+        .group_by(from_key)
         .all()
     )
 
     to_counts = (
-        db.query(Switch.to_task, func.count().label('count'))
+        db.query(to_key, func.count().label('count'))
         .filter(Switch.timestamp >= start_date)
         .filter(Switch.timestamp < end_date)
         .filter(Switch.is_switch.is_(True))
-        .filter(Switch.to_task.isnot(None))
-        .filter(Switch.to_task != '')
-        .group_by(Switch.to_task)
+        .filter(to_key.isnot(None))
+        .filter(to_key != '')
+        .group_by(to_key)
         .all()
     )
 
@@ -708,7 +854,7 @@ def get_switch_leaders():
     result = []
     for task, counts in task_switches.items():
         total_switches = counts['from_count'] + counts['to_count']
-        result.append({'task': task,
+        result.append({'project' if group == "project" else 'task': task,
             'total_switches': total_switches,
             'switched_from': counts['from_count'],
             'switched_to': counts['to_count']})
@@ -797,18 +943,12 @@ def get_productivity_insights():
 def get_tag_analytics():
     """
     Return analytics grouped by tags.
+    View parameter: 'week', 'month' or 'year'
+    Group parameter: 'project' adds per-project tag counts
     """
     view = request.args.get("view", "week")
-    today = date.today()
-
-    if view == "month":
-        # 30-day rolling window
-        start_date = today - timedelta(days=30)
-        end_date = today + timedelta(days=1)
-    else:
-        days_since_sunday = (today.weekday() + 1) % 7
-        start_date = today - timedelta(days=days_since_sunday)
-        end_date = start_date + timedelta(days=7)
+    group = request.args.get("group")
+    start_date, end_date = get_analytics_range(view)
 
     db = SessionLocal()
 
@@ -850,9 +990,149 @@ def get_tag_analytics():
         'top_tag_types': [{'type': tag_type, 'count': count} for tag_type, count in top_tag_types],
         'total_tagged_switches': len(switches)}
 
+    if group == "project":
+        result['projects'] = get_project_tag_counts(db, start_date, end_date)
+
     db.close()
     return jsonify(result), 200
 
+def get_project_tag_counts(db, start_date, end_date):
+    """
+    Count tags per project, unnesting the JSON tag arrays with json_each so
+    the whole aggregation runs in SQL.
+    """
+    tag = func.json_each(Switch.tags).table_valued("value")
+    rows = (
+        db.query(Switch.project, tag.c.value.label("tag"), func.count().label("count"))
+        .select_from(Switch)
+        .join(tag, text("1"))
+        .filter(Switch.timestamp >= start_date)
+        .filter(Switch.timestamp < end_date)
+        .filter(Switch.is_switch.is_(True))
+        .filter(func.json_valid(Switch.tags) == 1)
+        .group_by(Switch.project, tag.c.value)
+        .order_by(desc("count"))
+        .all()
+    )
+
+    tagged = (
+        db.query(Switch.project, func.count(Switch.id).label("count"))
+        .filter(Switch.timestamp >= start_date)
+        .filter(Switch.timestamp < end_date)
+        .filter(Switch.is_switch.is_(True))
+        .filter(func.json_valid(Switch.tags) == 1)
+        .group_by(Switch.project)
+        .all()
+    )
+
+    projects = {project: {'project': project, 'top_tags': [], 'total_tagged_switches': count}
+                for project, count in tagged}
+    for row in rows:
+        top_tags = projects[row.project]['top_tags']
+        if len(top_tags) < 10:
+            top_tags.append({'tag': row.tag, 'count': row.count})
+
+    return sorted(projects.values(), key=lambda p: p['total_tagged_switches'], reverse=True)
+
+@app.route("/analytics/epics", methods=["GET"])
+def get_epic_analytics():
+    """
+    Return tracked time rolled up by JIRA epic, from locally cached issue metadata.
+    View parameter: 'week', 'month' or 'year'
+    """
+    return issue_field_rollup("epic")
+
+@app.route("/analytics/components", methods=["GET"])
+def get_component_analytics():
+    """
+    Return tracked time rolled up by JIRA component, from locally cached issue metadata.
+    View parameter: 'week', 'month' or 'year'
+    """
+    return issue_field_rollup("component")
+
+@app.route("/analytics/issue-types", methods=["GET"])
+def get_issue_type_analytics():
+    """
+    Return tracked time rolled up by JIRA issue type, from locally cached issue metadata.
+    View parameter: 'week', 'month' or 'year'
+    """
+    return issue_field_rollup("issue_type")
+
+def issue_field_rollup(dimension):
+    view = request.args.get("view", "week")
+    start_date, end_date = get_analytics_range(view)
+
+    db = SessionLocal()
+    try:
+        return jsonify(get_time_by_issue_field(db, dimension, start_date, end_date)), 200
+    finally:
+        db.close()
+
+@app.route("/jira/issue-metadata/refresh", methods=["POST"])
+def refresh_jira_issue_metadata():
+    """
+    Queue a job that fetches missing/stale issue metadata now.
+    Returns 202 with the job id (an already queued refresh is reused).
+    """
+    job_id = enqueue_job("issue_metadata_refresh", unique=True)
+    return jsonify({"message": "Issue metadata refresh queued", "job_id": job_id}), 202
+
+@app.route("/jira/health", methods=["GET"])
+def jira_health():
+    """
+    JIRA circuit breaker state (closed/open/half-open) and call latency.
+    """
+    return jsonify(get_jira_health()), 200
+
+@app.route("/jobs", methods=["GET"])
+def get_jobs():
+    """
+    Recent background jobs, newest first (?status=queued|running|done|failed|cancelled).
+    """
+    return jsonify(list_jobs(request.args.get("status"))), 200
+
+@app.route("/jobs/<int:job_id>", methods=["GET"])
+def get_job_status(job_id):
+    """
+    Status, progress and (once finished) result of one job.
+    """
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+@app.route("/jobs/<int:job_id>/cancel", methods=["POST"])
+def cancel_job_route(job_id):
+    """
+    Cancel a queued job, or stop a running one after the work in flight.
+    """
+    job = cancel_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] in ("done", "failed"):
+        return jsonify({"error": f"Job already {job['status']}"}), 409
+    return jsonify(job), 200
+
+@app.route("/jobs/<int:job_id>/events", methods=["GET"])
+def stream_job_events(job_id):
+    """
+    Server-sent events with the job's progress until it finishes.
+    """
+    return Response(job_events(job_id), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/analytics/anomalies", methods=["GET"])
+def get_switch_anomalies():
+    """
+    Return the live switch rate for the current hour and day compared to
+    running statistics, plus recently flagged anomalous hours/days.
+    """
+    db = SessionLocal()
+    try:
+        return jsonify(get_anomaly_status(db)), 200
+    finally:
+        db.close()
+
 @app.route("/metrics/hours", methods=["GET"])
 def get_estimated_hours():
     """
@@ -860,8 +1140,10 @@ def get_estimated_hours():
     the current week (Mon→Sun) or the current month, based on the
     'view' query parameter ('week' or 'month').
     Calculates estimated work hours based on time between switches.
+    With ?group=project each day also carries a {project: hours} breakdown.
     """
     view = request.args.get("view", "week")
+    group = request.args.get("group")
     today = date.today()
 
     db = SessionLocal()
@@ -907,6 +1189,7 @@ def get_estimated_hours():
             iso = day.isoformat()
             out.append({"date": iso, "hours": round(daily_hours.get(iso, 0), 1)})
             day += timedelta(days=1)
+        range_start, range_end = start, next_month
     else:
         # Week view: current week Sunday→Saturday
         days_since_sunday = (today.weekday() + 1) % 7  # Convert Mon=0 to Sun=0
@@ -940,17 +1223,60 @@ def get_estimated_hours():
             d = week_start + timedelta(days=i)
             iso = d.isoformat()
             out.append({"date": iso, "hours": round(daily_hours.get(iso, 0), 1)})
+        range_start, range_end = week_start, week_end + timedelta(days=1)
+
+    if group == "project":
+        project_hours = get_project_daily_hours(db, range_start, range_end)
+        for entry in out:
+            entry["projects"] = project_hours.get(entry["date"], {})
 
     db.close()
     return jsonify(out), 200
 
+def get_project_daily_hours(db, start_date, end_date):
+    """
+    Estimated hours per day per project, aggregated in SQL with the same
+    rules as /metrics/hours (time until next switch, capped at 4 hours).
+    Returns {date: {project: hours}}.
+    """
+    sessions = (
+        db.query(
+            func.date(Switch.timestamp).label("day"),
+            Switch.to_task.label("task"),
+            Switch.project.label("project"),
+            session_seconds_until_next().label("duration")
+        )
+        .filter(Switch.timestamp >= start_date)
+        .filter(Switch.timestamp < end_date)
+        .subquery()
+    )
+
+    rows = (
+        db.query(
+            sessions.c.day,
+            sessions.c.project,
+            (func.sum(func.min(sessions.c.duration, 4 * 3600)) / 3600).label("hours")
+        )
+        .filter(sessions.c.duration.isnot(None))
+        .filter(sessions.c.task.isnot(None))
+        .filter(sessions.c.task != "")
+        .group_by(sessions.c.day, sessions.c.project)
+        .all()
+    )
+
+    daily = {}
+    for row in rows:
+        daily.setdefault(row.day, {})[row.project or "(none)"] = round(row.hours, 1)
+    return daily
+
 @app.route("/metrics/activitywatch-hours", methods=["GET"])
 def get_activitywatch_hours_endpoint():
     """
-    Returns a list of {date: 'YYYY-MM-DD', hours: N} for either
-    the current week (Mon→Sun) or the current month, based on the
-    'view' query parameter ('week' or 'month').
-    Gets actual laptop activity time from ActivityWatch excluding AFK periods.
+    Returns a list of {date: 'YYYY-MM-DD', hours: N} for the current
+    week (Sun→Sat), the current month or the last 365 days, based on the
+    'view' query parameter ('week', 'month' or 'year').
+    Gets actual laptop activity time from ActivityWatch excluding AFK periods;
+    closed days come from the local activitywatch_days cache.
     """
     view = request.args.get("view", "week")
     
@@ -962,11 +1288,187 @@ def get_activitywatch_hours_endpoint():
         print(f"ActivityWatch error: {e}")
         return jsonify([]), 200
 
+def parse_date_range(params, default_days):
+    """
+    Read start_date/end_date (YYYY-MM-DD) from request args. end_date
+    defaults to today and start_date to the `default_days` days ending
+    on end_date. Raises ValueError if invalid.
+    """
+    try:
+        end = datetime.strptime(params["end_date"], "%Y-%m-%d").date() if params.get("end_date") else date.today()
+        start = (datetime.strptime(params["start_date"], "%Y-%m-%d").date() if params.get("start_date")
+                 else end - timedelta(days=default_days - 1))
+    except ValueError:
+        raise ValueError("Dates must be YYYY-MM-DD")
+    if start > end:
+        raise ValueError("start_date must not be after end_date")
+    return start, end
+
+@app.route("/reconciliation", methods=["GET"])
+def get_reconciliation_report():
+    """
+    Per-day, per-ticket tracked hours vs ActivityWatch active hours vs JIRA
+    logged hours. Accepts start_date/end_date (YYYY-MM-DD, default last 7
+    days) and ?refresh=1 to rebuild cached closed days.
+    """
+    try:
+        start, end = parse_date_range(request.args, default_days=7)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    refresh = request.args.get("refresh", "").lower() in ("1", "true")
+    try:
+        return jsonify(get_reconciliation(start, end, refresh=refresh)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/attribution", methods=["GET"])
+def get_attribution_report():
+    """
+    Active (ActivityWatch not-AFK), AFK and untracked-active time for tracked
+    sessions, ?group=day (default, with per-task rows) or ?group=task.
+    Accepts start_date/end_date (YYYY-MM-DD, default last 7 days) and
+    ?refresh=1 to rebuild cached closed days.
+    """
+    try:
+        start, end = parse_date_range(request.args, default_days=7)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    group = request.args.get("group", "day")
+    if group not in GROUPS:
+        return jsonify({"error": f"group must be one of: {', '.join(GROUPS)}"}), 400
+
+    refresh = request.args.get("refresh", "").lower() in ("1", "true")
+    try:
+        return jsonify(get_attribution(start, end, group=group, refresh=refresh)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/suggestions/rules", methods=["GET"])
+def get_suggestion_rules():
+    """
+    Return every suggestion rule, in the order they're applied.
+    """
+    db = SessionLocal()
+    try:
+        rules = db.query(SuggestionRule).order_by(SuggestionRule.priority, SuggestionRule.id).all()
+        return jsonify([rule_dict(rule) for rule in rules]), 200
+    finally:
+        db.close()
+
+@app.route("/suggestions/rules", methods=["POST"])
+def add_suggestion_rule():
+    """
+    Create a suggestion rule.
+    Expects JSON: {"pattern": "grafana", "is_regex": false, "field": "title|app|any",
+                   "ticket": "OPS-123", "tags": ["monitoring"], "priority": 100}
+    A rule needs a ticket, tags or both; lower priority wins when several match.
+    """
+    data = request.get_json(force=True)
+    pattern = data.get("pattern") or ""
+    is_regex = bool(data.get("is_regex", False))
+    field = data.get("field", "title")
+    ticket = (data.get("ticket") or "").strip() or None
+    tags = data.get("tags") or []
+
+    if field not in SUGGESTION_FIELDS:
+        return jsonify({"error": f"Invalid field. Must be: {', '.join(SUGGESTION_FIELDS)}"}), 400
+    if not isinstance(tags, list) or not all(isinstance(t, str) for t in tags):
+        return jsonify({"error": "'tags' must be a list of strings"}), 400
+    if not ticket and not tags:
+        return jsonify({"error": "A rule needs a 'ticket' or 'tags'"}), 400
+    try:
+        priority = int(data.get("priority", 100))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'priority' must be an integer"}), 400
+    try:
+        validate_pattern(pattern, is_regex)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    db = SessionLocal()
+    try:
+        rule = SuggestionRule(pattern=pattern, is_regex=is_regex, field=field, ticket=ticket,
+                              tags=json.dumps(tags), priority=priority)
+        db.add(rule)
+        db.commit()
+        return jsonify(rule_dict(rule)), 201
+    finally:
+        db.close()
+
+@app.route("/suggestions/rules/<int:rule_id>", methods=["DELETE"])
+def delete_suggestion_rule(rule_id):
+    """
+    Delete a suggestion rule.
+    """
+    db = SessionLocal()
+    try:
+        rule = db.query(SuggestionRule).filter(SuggestionRule.id == rule_id).first()
+        if not rule:
+            return jsonify({"error": "Rule not found"}), 404
+        db.delete(rule)
+        db.commit()
+        return jsonify({"message": f"Rule {rule_id} deleted"}), 200
+    finally:
+        db.close()
+
+@app.route("/suggestions", methods=["GET"])
+def get_untracked_suggestions():
+    """
+    Suggested tickets and tags for active time outside any session, from
+    ActivityWatch window titles matched against the suggestion rules and
+    ticket keys found in the titles. Accepts start_date/end_date
+    (YYYY-MM-DD, default today).
+    """
+    try:
+        start, end = parse_date_range(request.args, default_days=1)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    db = SessionLocal()
+    try:
+        report = get_suggestions(db, start, end)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        db.close()
+    if report is None:
+        return jsonify({"error": "ActivityWatch is unavailable"}), 503
+    return jsonify(report), 200
+
+def switch_list_row(switch):
+    tags_list = []
+    if switch.tags:
+        try:
+            tags_list = json.loads(switch.tags)
+        except json.JSONDecodeError:
+            pass
+
+    # SQLite stores timestamps as naive (no timezone info)
+    # We need to treat them as local time
+    # The timestamp from the database is already in local time
+    local_timestamp = switch.timestamp.isoformat()
+    end_timestamp = switch.end_time.isoformat() if switch.end_time else None
+
+    return {
+        'id': switch.id,
+        'timestamp': local_timestamp,
+        'end_time': end_timestamp,
+        'from_task': switch.from_task or '',
+        'to_task': switch.to_task or '',
+        'note': switch.note or '',
+        'tags': tags_list,
+        'is_switch': switch.is_switch,
+        'category': switch.category or ''
+    }
+
 @app.route("/switches/list", methods=["GET"])
 def list_switches():
     """
     List switch entries with optional date filtering.
     Query params: start_date, end_date (YYYY-MM-DD format)
+    JSON responses hold the newest 500; with Accept: application/x-ndjson
+    every entry in the range is streamed, one per line.
     """
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
@@ -991,37 +1493,16 @@ def list_switches():
             pass
     
     # Get switches ordered by timestamp (newest first)
-    switches = query.order_by(Switch.timestamp.desc()).limit(500).all()
+    query = query.order_by(Switch.timestamp.desc())
+    if wants_ndjson():
+        return ndjson_response((switch_list_row(s) for s in query.yield_per(1000)), db.close), 200
+
+    switches = query.limit(500).all()
     db.close()
-    
+
     # Convert to JSON-serializable format
-    result = []
-    for switch in switches:
-        tags_list = []
-        if switch.tags:
-            try:
-                tags_list = json.loads(switch.tags)
-            except json.JSONDecodeError:
-                pass
-        
-        # SQLite stores timestamps as naive (no timezone info)
-        # We need to treat them as local time
-        # The timestamp from the database is already in local time
-        local_timestamp = switch.timestamp.isoformat()
-        end_timestamp = switch.end_time.isoformat() if switch.end_time else None
-        
-        result.append({
-            'id': switch.id,
-            'timestamp': local_timestamp,
-            'end_time': end_timestamp,
-            'from_task': switch.from_task or '',
-            'to_task': switch.to_task or '',
-            'note': switch.note or '',
-            'tags': tags_list,
-            'is_switch': switch.is_switch,
-            'category': switch.category or ''
-        })
-    
+    result = [switch_list_row(switch) for switch in switches]
+
     return jsonify(result), 200
 
 @app.route("/switches/<int:switch_id>", methods=["PUT"])
@@ -1037,6 +1518,9 @@ def update_switch(switch_id):
     if not switch:
         db.close()
         return jsonify({"error": "Switch entry not found"}), 404
+
+    # Remember the old session so budget counters can be corrected
+    old_session = (switch.to_task, switch.timestamp, switch.end_time)
     
     # Update fields if provided
     if 'from_task' in data:
@@ -1074,6 +1558,12 @@ def update_switch(switch_id):
         except (ValueError, AttributeError) as e:
             print(f"Error parsing end_time '{data.get('end_time')}': {e}")
             return jsonify({"error": f"Invalid end_time format: {str(e)}"}), 400
+
+    if old_session != (switch.to_task, switch.timestamp, switch.end_time):
+        apply_session(db, *old_session, sign=-1)
+        apply_session(db, switch.to_task, switch.timestamp, switch.end_time)
+        forget_session_days(db, old_session[1], old_session[2])
+        forget_session_days(db, switch.timestamp, switch.end_time)
     
     try:
         db.commit()
@@ -1097,6 +1587,8 @@ def delete_switch(switch_id):
         return jsonify({"error": "Switch entry not found"}), 404
     
     try:
+        apply_session(db, switch.to_task, switch.timestamp, switch.end_time, sign=-1)
+        forget_session_days(db, switch.timestamp, switch.end_time)
         db.delete(switch)
         db.commit()
         db.close()
@@ -1106,74 +1598,94 @@ def delete_switch(switch_id):
         db.close()
         return jsonify({"error": str(e)}), 500
 
+EXPORT_HEADER = [
+    'Timestamp',
+    'From Task',
+    'To Task',
+    'Note',
+    'Tags',
+    'Is Context Switch',
+    'Category'
+]
+EXPORT_DURATION_HEADER = ['End Time', 'Duration Seconds', 'Duration Hours']
+
+def export_row(switch, session_end, now):
+    tags_str = ''
+    if switch.tags:
+        try:
+            tags_list = json.loads(switch.tags)
+            tags_str = ', '.join(tags_list)
+        except json.JSONDecodeError:
+            tags_str = switch.tags
+
+    row = [
+        switch.timestamp.astimezone().isoformat(),
+        switch.from_task or '',
+        switch.to_task or '',
+        switch.note or '',
+        tags_str,
+        'Yes' if switch.is_switch else 'No',
+        switch.category or ''
+    ]
+    if now is not None:
+        # The open session runs until now; its end time stays empty
+        seconds = int(((session_end or now) - switch.timestamp).total_seconds())
+        row += [session_end.astimezone().isoformat() if session_end else '', seconds, round(seconds / 3600, 2)]
+    return row
+
 @app.route("/export/switches", methods=["GET"])
 def export_switches():
     """
-    Export all switch history as CSV file.
+    Export switch history as CSV, newest first, streamed while it is read.
+    Query params (all optional): start_date, end_date (YYYY-MM-DD), task
+    and tag (repeatable; a row matches any of them), durations=true to add
+    each session's end time and length.
     """
+    tasks = request.args.getlist('task')
+    tags = request.args.getlist('tag')
+    durations = request.args.get('durations', '').lower() in ('1', 'true', 'yes')
+    try:
+        start = datetime.strptime(request.args['start_date'], '%Y-%m-%d') if request.args.get('start_date') else None
+        # Add 1 day to include the entire end date
+        end = datetime.strptime(request.args['end_date'], '%Y-%m-%d') + timedelta(days=1) \
+            if request.args.get('end_date') else None
+    except ValueError:
+        return jsonify({"error": "start_date and end_date must be YYYY-MM-DD"}), 400
+
     db = SessionLocal()
-    
-    # Get all switches ordered by timestamp (newest first)
-    switches = (
-        db.query(Switch)
-        .order_by(Switch.timestamp.desc())
-        .all()
-    )
-    db.close()
-    
-    # Create CSV in memory
-    output = StringIO()
-    writer = csv.writer(output)
-    
-    # Write CSV header
-    writer.writerow([
-        'Timestamp',
-        'From Task', 
-        'To Task',
-        'Note',
-        'Tags',
-        'Is Context Switch',
-        'Category'
-    ])
-    
-    # Write data rows
-    for switch in switches:
-        tags_str = ''
-        if switch.tags:
-            try:
-                tags_list = json.loads(switch.tags)
-                tags_str = ', '.join(tags_list)
-            except json.JSONDecodeError:
-                tags_str = switch.tags
-        
-        writer.writerow([
-            switch.timestamp.astimezone().isoformat(),
-            switch.from_task or '',
-            switch.to_task or '',
-            switch.note or '',
-            tags_str,
-            'Yes' if switch.is_switch else 'No',
-            switch.category or ''
-        ])
-    
-    # Create response with CSV content
-    csv_content = output.getvalue()
-    output.close()
-    
-    response = Response(
-        csv_content,
-        mimetype='text/csv',
-        headers={
-            'Content-Disposition': 'attachment; filename=context_switch_history.csv'
-        }
+
+    # A session ends at its end_time, or for rows without one, where the next one starts
+    following = aliased(Switch)
+    next_start = (
+        select(func.min(following.timestamp))
+        .where(following.timestamp > Switch.timestamp)
+        .scalar_subquery()
     )
-    
-    return response
+    query = db.query(Switch, func.coalesce(Switch.end_time, next_start).label("session_end"))
+
+    if start:
+        query = query.filter(Switch.timestamp >= start)
+    if end:
+        query = query.filter(Switch.timestamp < end)
+    if tasks:
+        query = query.filter(Switch.to_task.in_(tasks))
+    if tags:
+        # Malformed tag JSON counts as no tags rather than failing json_each
+        tag = func.json_each(case((func.json_valid(Switch.tags) == 1, Switch.tags), else_='[]')).table_valued("value")
+        query = query.filter(select(tag.c.value).where(tag.c.value.in_(tags)).exists())
+
+    # Naive UTC, like the stored timestamps
+    now = datetime.now(timezone.utc).replace(tzinfo=None) if durations else None
+    rows = (export_row(switch, session_end, now)
+            for switch, session_end in query.order_by(Switch.timestamp.desc()).yield_per(1000))
+    header = EXPORT_HEADER + EXPORT_DURATION_HEADER if durations else EXPORT_HEADER
+    return csv_response(header, rows, 'context_switch_history.csv', db.close)
 
 @app.route("/timesync/intervals", methods=["GET"])
 def get_timesync_intervals():
     """
     Get Timewarrior intervals that can be synced to JIRA.
+    With Accept: application/x-ndjson they are streamed, one per line.
     """
     try:
         start_date = request.args.get('start_date', '')
@@ -1186,19 +1698,74 @@ def get_timesync_intervals():
             start_date = start.strftime('%Y-%m-%d')
             end_date = end.strftime('%Y-%m-%d')
         
+        mode, block_minutes = parse_aggregation(request.args)
+        if wants_ndjson() and not mode:
+            # Streamed from the database, matched to worklogs a batch at a time
+            intervals = iter_timewarrior_intervals(start_date, end_date)
+            return ndjson_response(iter_with_existing_worklogs(intervals)), 200
+
         intervals = get_timewarrior_intervals(start_date, end_date)
+        if mode:
+            # Preview of the merged worklogs that would be posted
+            intervals = aggregate_intervals(intervals, mode, block_minutes)
         
-        # For each interval, check if worklog already exists
-        for interval in intervals:
-            worklogs = get_jira_worklogs(interval['ticket'], interval['start'])
-            interval['has_worklog'] = len(worklogs) > 0
-            interval['existing_worklogs'] = worklogs
+        # Match mirrored worklogs to intervals locally
+        attach_existing_worklogs(intervals)
         
+        if wants_ndjson():
+            # Aggregated previews need every interval first; they are still sent as NDJSON
+            return ndjson_response(intervals), 200
         return jsonify(intervals), 200
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def parse_aggregation(params):
+    """
+    Read the worklog aggregation mode from request args/JSON:
+    aggregate=day|block (absent or 'none' for one worklog per interval)
+    and an optional block_minutes. Raises ValueError if invalid.
+    """
+    mode = params.get('aggregate') or None
+    if mode == 'none':
+        mode = None
+    if mode is not None and mode not in AGGREGATE_MODES:
+        raise ValueError(f"aggregate must be one of: none, {', '.join(AGGREGATE_MODES)}")
+
+    block_minutes = params.get('block_minutes')
+    if block_minutes is not None:
+        block_minutes = int(block_minutes)
+        if not 1 <= block_minutes <= 1440:
+            raise ValueError("block_minutes must be between 1 and 1440")
+    return mode, block_minutes
+
+def parse_intervals(params, aggregate=False):
+    """
+    Read the 'intervals' list from a request body: dicts with a ticket, an
+    ISO start (and end, when they are to be aggregated) and a non-negative
+    integer duration_seconds. Raises ValueError if invalid.
+    """
+    intervals = params.get('intervals', [])
+    if not isinstance(intervals, list):
+        raise ValueError("intervals must be a list")
+    required = ('start', 'end') if aggregate else ('start',)
+    for n, interval in enumerate(intervals):
+        if not isinstance(interval, dict):
+            raise ValueError(f"intervals[{n}] must be an object")
+        if not isinstance(interval.get('ticket'), str) or not interval['ticket']:
+            raise ValueError(f"intervals[{n}].ticket is required")
+        for field in required:
+            try:
+                datetime.fromisoformat(interval.get(field))
+            except (TypeError, ValueError):
+                raise ValueError(f"intervals[{n}].{field} must be an ISO date and time")
+        duration = interval.get('duration_seconds')
+        if not isinstance(duration, int) or isinstance(duration, bool) or duration < 0:
+            raise ValueError(f"intervals[{n}].duration_seconds must be a non-negative integer")
+    return intervals
+
 @app.route("/timesync/tickets", methods=["GET"])
 def get_timesync_tickets():
     """
@@ -1232,107 +1799,103 @@ def get_ticket_worklogs(ticket_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/timesync/worklogs/refresh", methods=["POST"])
+def refresh_worklog_mirror():
+    """
+    Queue a sync of the local worklog mirror with JIRA.
+    """
+    job_id = enqueue_job("worklogs_refresh", unique=True)
+    return jsonify({"job_id": job_id}), 202
+
 @app.route("/timesync/sync", methods=["POST"])
 def sync_intervals():
     """
-    Sync selected Timewarrior intervals to JIRA.
+    Queue a sync of the selected Timewarrior intervals to JIRA. Returns the
+    job id; progress and results are at /jobs/<id> and /jobs/<id>/events.
     """
     try:
-        data = request.json
-        intervals = data.get('intervals', [])
+        data = request.json or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object"}), 400
+        try:
+            mode, block_minutes = parse_aggregation(data)
+            intervals = parse_intervals(data, aggregate=bool(mode))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
         if not intervals:
             return jsonify({"error": "No intervals provided"}), 400
+        if mode:
+            intervals = aggregate_intervals(intervals, mode, block_minutes)
 
-        results = batch_sync_to_jira(intervals)
-
-        # Count successes and failures
-        success_count = sum(1 for r in results if r['success'])
-        failure_count = len(results) - success_count
-
-        return jsonify({
-            "results": results,
-            "summary": {
-                "total": len(results),
-                "success": success_count,
-                "failed": failure_count
-            }
-        }), 200
+        job_id = enqueue_job("timesync_sync", {"intervals": intervals})
+        return jsonify({"job_id": job_id, "intervals": len(intervals)}), 202
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/timesync/preview", methods=["POST"])
+def preview_sync():
+    """
+    Show the worklogs a sync would post for the given intervals and
+    aggregation mode, without contacting JIRA.
+    """
+    data = request.json or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    try:
+        mode, block_minutes = parse_aggregation(data)
+        intervals = parse_intervals(data, aggregate=bool(mode))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    plan = aggregate_intervals(intervals, mode, block_minutes) if mode else intervals
+    return jsonify({
+        "plan": plan,
+        "summary": {
+            "intervals": len(intervals),
+            "worklogs": len(plan),
+            "total_seconds": sum(i['duration_seconds'] for i in plan)
+        }
+    }), 200
+
 @app.route("/analytics/chaos", methods=["GET"])
 def get_chaos_metrics():
     """
     Get chaos metrics from the chaos-tracker database.
     Returns daily chaos scores for visualization.
     """
-    try:
-        from pathlib import Path
-        from sqlalchemy import create_engine, text
+    # Get view parameter (week or month)
+    view = request.args.get("view", "week")
+    limit = 30 if view == "month" else 7
 
-        # Get view parameter (week or month)
-        view = request.args.get("view", "week")
+    try:
+        summaries = get_daily_chaos(limit)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if summaries is None:
+        return jsonify({"error": "Chaos database not found. Run chaos-tracker first."}), 404
+    return jsonify(summaries), 200
 
-        # Determine limit based on view
-        if view == "month":
-            limit = 30
-        else:
-            limit = 7
-
-        # Look for chaos.db in project root or user home
-        chaos_db_path = None
-        possible_paths = [
-            Path(__file__).parent.parent / 'chaos.db',
-            Path.home() / 'chaos.db',
-            Path('../chaos-tracker/chaos.db').expanduser()
-        ]
-
-        for path in possible_paths:
-            if path.exists():
-                chaos_db_path = path
-                break
-
-        if not chaos_db_path:
-            return jsonify({"error": "Chaos database not found. Run chaos-tracker first."}), 404
-
-        # Query the chaos database
-        engine = create_engine(f'sqlite:///{chaos_db_path}')
-
-        with engine.connect() as conn:
-            # Get chaos metrics based on view
-            result = conn.execute(text(f"""
-                SELECT
-                    date,
-                    avg_chaos_score,
-                    max_chaos_score,
-                    total_branch_switches,
-                    total_app_switches,
-                    active_hours
-                FROM daily_summary
-                ORDER BY date DESC
-                LIMIT :limit
-            """), {"limit": limit})
-
-            summaries = []
-            for row in result:
-                summaries.append({
-                    'date': row[0],
-                    'avg_score': round(row[1], 1) if row[1] else 0,
-                    'max_score': round(row[2], 1) if row[2] else 0,
-                    'branches': row[3] or 0,
-                    'apps': row[4] or 0,
-                    'active_hours': round(row[5], 1) if row[5] else 0
-                })
-
-            # Reverse to get chronological order
-            summaries.reverse()
-
-            return jsonify(summaries), 200
+@app.route("/analytics/chaos/correlation", methods=["GET"])
+def get_chaos_correlation_report():
+    """
+    Daily chaos scores joined with switch counts, tracked hours, focus
+    hours and the longest session, plus how strongly each correlates with
+    the chaos score. Accepts start_date/end_date (YYYY-MM-DD, default last 30 days).
+    """
+    try:
+        start, end = parse_date_range(request.args, default_days=30)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    try:
+        report = get_chaos_correlation(start, end)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    if report is None:
+        return jsonify({"error": "Chaos database not found. Run chaos-tracker first."}), 404
+    return jsonify(report), 200
 
 
 # =============================================================================
@@ -1506,5 +2069,7 @@ def delete_todo(todo_id):
 
 
 if __name__ == "__main__":
-    # Default host/port; override with FLASK_RUN_HOST/PORT if desired
-    app.run(host="127.0.0.1", port=5000)
+    # Development server; use gunicorn with wsgi.py in production
+    init_app()
+    start_background_threads()
+    app.run(host="127.0.0.1", port=5000, threaded=True)
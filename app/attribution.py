@@ -0,0 +1,217 @@
+# app/attribution.py
+
+from datetime import date, datetime, timedelta, timezone
+from app.models import AttributionDay, ReconciliationDay
+from app.activitywatch import ActivityWatchClient
+from app.reconciliation import cached_days, day_range, load_sessions, local_midnight, split_by_day, utc_timestamp
+
+GROUPS = ("day", "task")
+
+
+def _merged(intervals):
+    """Merge overlapping or touching sorted (start, end) intervals."""
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def sweep(sessions, active):
+    """
+    Attribute activity to sessions in one linear pass over both lists.
+
+    sessions: [(task, start_ts, end_ts)] sorted by start, not overlapping
+    active:   [(start_ts, end_ts)] not-AFK periods sorted by start
+
+    Returns (covered, untracked): covered[i] lists the active (start, end)
+    pieces inside sessions[i]; untracked lists the active pieces outside
+    every session. A session's AFK time is its length minus its pieces.
+    """
+    covered = [[] for _ in sessions]
+    untracked = []
+    i = 0
+    for active_start, active_end in _merged(active):
+        t = active_start
+        # Sessions that ended before this period can't overlap any later one
+        while i < len(sessions) and sessions[i][2] <= t:
+            i += 1
+        k = i
+        while t < active_end:
+            if k >= len(sessions) or sessions[k][1] >= active_end:
+                untracked.append((t, active_end))
+                break
+            _, start, end = sessions[k]
+            if start > t:
+                untracked.append((t, start))
+                t = start
+            piece_end = min(end, active_end)
+            covered[k].append((t, piece_end))
+            t = piece_end
+            if end <= active_end:
+                k += 1
+    return covered, untracked
+
+
+def non_overlapping(sessions):
+    """Sort (label, start, end) spans and trim any overlap (e.g. from bad edits) off the later one."""
+    result = []
+    for task, start, end in sorted(sessions, key=lambda s: s[1]):
+        if result:
+            start = max(start, result[-1][2])
+        if end > start:
+            result.append((task, start, end))
+    return result
+
+
+def _compute(days):
+    """
+    Per-day attribution in seconds for consecutive ISO `days`, from one
+    session load, one ActivityWatch query and one sweep. AW-derived fields
+    are None for days ActivityWatch couldn't provide.
+    """
+    first_day = date.fromisoformat(days[0])
+    after_last = date.fromisoformat(days[-1]) + timedelta(days=1)
+    sessions, _ = load_sessions(local_midnight(first_day), local_midnight(after_last))
+    sessions = non_overlapping(sessions)
+
+    today = date.today()
+    queried = [date.fromisoformat(d) for d in days if date.fromisoformat(d) <= today]
+    aw = ActivityWatchClient().query_not_afk_intervals(queried)
+    # Future days need no ActivityWatch data; the rest need the query to have succeeded
+    available = (set(days) - {d.isoformat() for d in queried}) | set(aw or ())
+    active = sorted(span for d in days for span in (aw or {}).get(d, []))
+
+    covered, untracked = sweep(sessions, active)
+
+    table = {day: {} for day in days}  # day -> task -> [tracked, active]
+    for (task, start, end), pieces in zip(sessions, covered):
+        for day, seconds in split_by_day(start, end):
+            table[day].setdefault(task, [0.0, 0.0])[0] += seconds
+        for piece_start, piece_end in pieces:
+            for day, seconds in split_by_day(piece_start, piece_end):
+                table[day].setdefault(task, [0.0, 0.0])[1] += seconds
+    untracked_by_day = {}
+    for piece_start, piece_end in untracked:
+        for day, seconds in split_by_day(piece_start, piece_end):
+            untracked_by_day[day] = untracked_by_day.get(day, 0.0) + seconds
+
+    report = []
+    for day in days:
+        has_aw = day in available
+        tasks = [
+            {"task": task, "tracked": tracked,
+             "active": active_seconds if has_aw else None,
+             "afk": tracked - active_seconds if has_aw else None}
+            for task, (tracked, active_seconds) in sorted(table[day].items())
+        ]
+        tracked_total = sum(t["tracked"] for t in tasks)
+        active_total = sum(t["active"] for t in tasks) if has_aw else None
+        report.append({
+            "date": day,
+            "tracked": tracked_total,
+            "active": active_total,
+            "afk": tracked_total - active_total if has_aw else None,
+            "untracked_active": untracked_by_day.get(day, 0.0) if has_aw else None,
+            "tasks": tasks
+        })
+    return report
+
+
+def untracked_active_periods(days):
+    """
+    Sorted (start, end) not-AFK periods that fall outside every tracked
+    session on consecutive ISO `days`, or None if ActivityWatch is unavailable.
+    """
+    first_day = date.fromisoformat(days[0])
+    after_last = date.fromisoformat(days[-1]) + timedelta(days=1)
+    sessions, _ = load_sessions(local_midnight(first_day), local_midnight(after_last))
+
+    aw = ActivityWatchClient().query_not_afk_intervals(date.fromisoformat(d) for d in days)
+    if aw is None:
+        return None
+    active = sorted(span for d in days for span in aw.get(d, []))
+    _, untracked = sweep(non_overlapping(sessions), active)
+    return untracked
+
+
+def _day_seconds(start_date, end_date, refresh=False):
+    """Per-day attribution in seconds; closed days with ActivityWatch data are cached."""
+    days = day_range(start_date, end_date)
+    if not days:
+        return []
+
+    def compute(missing):
+        # One computation spanning the missing days; cached days inside the span are recomputed but not kept
+        span = [d for d in days if missing[0] <= d <= missing[-1]]
+        return ((entry, entry["active"] is not None) for entry in _compute(span))
+
+    return cached_days(AttributionDay, days, compute, refresh)
+
+
+def _hours(seconds):
+    return round(seconds / 3600, 2) if seconds is not None else None
+
+
+def _task_entry(task, tracked, active):
+    return {
+        "task": task,
+        "tracked_hours": _hours(tracked),
+        "active_hours": _hours(active),
+        "afk_hours": _hours(tracked - active) if active is not None else None,
+        "active_percent": round(active / tracked * 100, 1) if active is not None and tracked else None
+    }
+
+
+def get_attribution(start_date, end_date, group="day", refresh=False):
+    """
+    How much of each tracked session was spent active at the keyboard
+    (ActivityWatch not-AFK), how much AFK, and how much active time fell
+    outside any session, for local dates start_date..end_date (inclusive).
+
+    group="day" returns one entry per day with per-task rows; group="task"
+    sums the range per task. AW-derived fields are None where
+    ActivityWatch had no data. Closed days are cached in attribution_days
+    and dropped when a session on them is edited or deleted.
+    """
+    days = _day_seconds(start_date, end_date, refresh)
+
+    if group == "task":
+        totals = {}
+        for day in days:
+            for row in day["tasks"]:
+                total = totals.setdefault(row["task"], [0.0, 0.0, True])
+                total[0] += row["tracked"]
+                if row["active"] is None:
+                    total[2] = False
+                else:
+                    total[1] += row["active"]
+        entries = [_task_entry(task, tracked, active if complete else None)
+                   for task, (tracked, active, complete) in totals.items()]
+        return sorted(entries, key=lambda e: e["tracked_hours"], reverse=True)
+
+    return [{
+        "date": day["date"],
+        "tracked_hours": _hours(day["tracked"]),
+        "active_hours": _hours(day["active"]),
+        "afk_hours": _hours(day["afk"]),
+        "untracked_active_hours": _hours(day["untracked_active"]),
+        "tasks": [_task_entry(row["task"], row["tracked"], row["active"]) for row in day["tasks"]]
+    } for day in days]
+
+
+def forget_session_days(db, start, end):
+    """
+    Drop cached attribution and reconciliation for the local days a
+    session (naive-UTC start, end or None while open) touches. Call when a
+    session is edited or deleted; the caller commits.
+    """
+    if not start:
+        return
+    end = end or datetime.now(timezone.utc).replace(tzinfo=None)
+    days = [day for day, _ in split_by_day(utc_timestamp(start), utc_timestamp(max(start, end)))]
+    days.append(datetime.fromtimestamp(utc_timestamp(start)).date().isoformat())
+    db.query(AttributionDay).filter(AttributionDay.day.in_(set(days))).delete(synchronize_session=False)
+    db.query(ReconciliationDay).filter(ReconciliationDay.day.in_(set(days))).delete(synchronize_session=False)
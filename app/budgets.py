@@ -0,0 +1,163 @@
+# app/budgets.py
+
+from datetime import datetime, timedelta, timezone
+from app.models import Switch, SyncState, TimeBudget, TimeTotal, TICKET_KEY_PATTERN, lock_for_write
+
+PERIODS = ("lifetime", "week", "month")
+SCOPES = ("ticket", "project")
+SEEDED_MARKER = "time_totals"  # SyncState row written once the counters hold all history
+
+
+def project_of(task):
+    """Project prefix of a ticket key (OPS-123 -> OPS), same rule as Switch.project."""
+    if task and TICKET_KEY_PATTERN.match(task):
+        return task.split('-', 1)[0]
+    return None
+
+
+def _targets(task):
+    """(scope, target) pairs whose counters a session on `task` contributes to."""
+    targets = [("ticket", task)]
+    project = project_of(task)
+    if project:
+        targets.append(("project", project))
+    return targets
+
+
+def _local_date(timestamp):
+    """Local calendar date of a naive-UTC database timestamp."""
+    return timestamp.replace(tzinfo=timezone.utc).astimezone().date()
+
+
+def period_key(period, day):
+    """Counter key for `period` containing local date `day` (weeks start on Sunday)."""
+    if period == "week":
+        week_start = day - timedelta(days=(day.weekday() + 1) % 7)
+        return f"week:{week_start.isoformat()}"
+    if period == "month":
+        return f"month:{day.strftime('%Y-%m')}"
+    return "lifetime"
+
+
+def _session_contributions(task, start, end):
+    """Yield ((scope, target, period_key), seconds) for one closed session."""
+    if not task or not start or not end:
+        return
+    seconds = (end.replace(tzinfo=None) - start.replace(tzinfo=None)).total_seconds()
+    if seconds <= 0:
+        return
+    # Sessions are attributed to the period they started in
+    day = _local_date(start.replace(tzinfo=None))
+    for scope, target in _targets(task):
+        for period in PERIODS:
+            yield (scope, target, period_key(period, day)), seconds
+
+
+def _ensure_totals(db):
+    """
+    Seed the counters from existing history the first time they are needed,
+    and record that in the SEEDED_MARKER sync_state row, so later calls
+    are a single primary-key read whether or not any history exists.
+    Runs before the caller's pending changes are flushed, so it only sees
+    already-committed sessions. Returns True if it seeded; the caller
+    commits.
+    """
+    if db.get(SyncState, SEEDED_MARKER) is not None:
+        return False
+    lock_for_write(db)
+    # Another request may have seeded them while we waited for the lock
+    if db.get(SyncState, SEEDED_MARKER) is not None:
+        return False
+
+    # Rebuilt from scratch, so partial counters from an interrupted seed don't double up
+    db.query(TimeTotal).delete(synchronize_session=False)
+    totals = {}
+    closed = (
+        db.query(Switch.to_task, Switch.timestamp, Switch.end_time)
+        .filter(Switch.end_time.isnot(None))
+        .yield_per(1000)
+    )
+    for task, start, end in closed:
+        for key, seconds in _session_contributions(task, start, end):
+            totals[key] = totals.get(key, 0) + seconds
+
+    db.add_all(TimeTotal(scope=scope, target=target, period_key=key, seconds=seconds)
+               for (scope, target, key), seconds in totals.items())
+    db.add(SyncState(name=SEEDED_MARKER, synced_at=datetime.now(timezone.utc).replace(tzinfo=None)))
+    db.flush()
+    return True
+
+
+def apply_session(db, task, start, end, sign=1):
+    """
+    Add (sign=1) or remove (sign=-1) one closed session from the running
+    totals. Call when a session's end_time is set, edited or deleted; the
+    caller commits.
+    """
+    if not end:
+        return
+    lock_for_write(db)
+    _ensure_totals(db)
+
+    for (scope, target, key), seconds in _session_contributions(task, start, end):
+        total = db.get(TimeTotal, (scope, target, key))
+        if total is None:
+            total = TimeTotal(scope=scope, target=target, period_key=key, seconds=0)
+            db.add(total)
+        total.seconds = max(0.0, total.seconds + sign * seconds)
+
+
+def _budget_entry(budget, consumed_seconds):
+    budget_seconds = budget.hours * 3600
+    fraction = consumed_seconds / budget_seconds if budget_seconds else 0
+    if fraction >= 1:
+        status = "exceeded"
+    elif fraction >= budget.alert_threshold:
+        status = "warning"
+    else:
+        status = "ok"
+
+    return {
+        "id": budget.id,
+        "scope": budget.scope,
+        "target": budget.target,
+        "period": budget.period,
+        "budget_hours": budget.hours,
+        "consumed_hours": round(consumed_seconds / 3600, 2),
+        "remaining_hours": round(max(0.0, budget_seconds - consumed_seconds) / 3600, 2),
+        "percent": round(fraction * 100, 1),
+        "alert_threshold": budget.alert_threshold,
+        "status": status
+    }
+
+
+def get_budget_status(db, current_task=None, current_start=None, task=None):
+    """
+    Consumption for every budget (or only those covering `task`), read from
+    the running counters. Time in the still-open session of `current_task`
+    is added on top so the numbers are live.
+    """
+    if _ensure_totals(db):
+        db.commit()  # Keep the seed; reads don't commit otherwise
+    today = datetime.now().date()
+
+    query = db.query(TimeBudget).order_by(TimeBudget.scope, TimeBudget.target)
+    if task:
+        query = query.filter(
+            ((TimeBudget.scope == "ticket") & (TimeBudget.target == task)) |
+            ((TimeBudget.scope == "project") & (TimeBudget.target == project_of(task)))
+        )
+
+    open_contributions = {}
+    if current_task and current_start:
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        open_contributions = dict(_session_contributions(current_task, current_start, now))
+
+    result = []
+    for budget in query.all():
+        key = period_key(budget.period, today)
+        total = db.get(TimeTotal, (budget.scope, budget.target, key))
+        consumed = (total.seconds if total else 0) + open_contributions.get((budget.scope, budget.target, key), 0)
+        result.append(_budget_entry(budget, consumed))
+
+    return result
@@ -0,0 +1,211 @@
+# app/chaos.py
+
+import math
+import os
+import threading
+from datetime import datetime, time, timedelta, timezone
+from pathlib import Path
+from sqlalchemy import create_engine, text
+from config import Config
+from app.models import SessionLocal, engine as main_engine
+
+# Where chaos-tracker keeps its database, unless CHAOS_DB_PATH says otherwise
+CANDIDATE_PATHS = [
+    Path(__file__).parent.parent / 'chaos.db',
+    Path.home() / 'chaos.db',
+    Path('../chaos-tracker/chaos.db').expanduser()
+]
+
+_lock = threading.Lock()
+_cached = {"path": None, "identity": None, "engine": None}
+
+
+def _identity(path):
+    """(device, inode) of the file, or None if it's gone. Changes when chaos-tracker replaces the file."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_dev, stat.st_ino)
+
+
+def _locate():
+    """Resolved chaos.db path and its identity, or (None, None) if there isn't one."""
+    candidates = [Path(Config.CHAOS_DB_PATH).expanduser()] if Config.CHAOS_DB_PATH else CANDIDATE_PATHS
+    # The last path found is checked first, so a request normally costs one stat()
+    if _cached["path"]:
+        identity = _identity(_cached["path"])
+        if identity:
+            return _cached["path"], identity
+    for path in candidates:
+        identity = _identity(path)
+        if identity:
+            return str(path.resolve()), identity
+    return None, None
+
+
+def get_chaos_engine():
+    """
+    Engine for chaos-tracker's database, created once and reused. It is
+    only rebuilt when the file is replaced or moves; writes to the same
+    file are visible through the existing connections. None if no
+    chaos.db exists.
+    """
+    with _lock:
+        path, identity = _locate()
+        if (path, identity) != (_cached["path"], _cached["identity"]):
+            if _cached["engine"] is not None:
+                _cached["engine"].dispose()
+            _cached.update(path=path, identity=identity,
+                           engine=create_engine(f"sqlite:///{path}", future=True) if path else None)
+        return _cached["engine"]
+
+
+def attach_chaos(connection):
+    """
+    ATTACH chaos.db as schema `chaos` on a main-database connection, once
+    per pooled connection (again only if the file was replaced). Returns
+    False if there is no chaos.db or the main database isn't SQLite.
+    """
+    if main_engine.dialect.name != "sqlite" or get_chaos_engine() is None:
+        return False
+    path, identity = _cached["path"], _cached["identity"]
+
+    info = connection.connection.info  # Lives as long as the pooled DBAPI connection
+    if info.get("chaos_attached") == (path, identity):
+        return True
+    if "chaos_attached" in info:
+        connection.exec_driver_sql("DETACH DATABASE chaos")
+        del info["chaos_attached"]
+    connection.exec_driver_sql("ATTACH DATABASE ? AS chaos", (path,))
+    info["chaos_attached"] = (path, identity)
+    return True
+
+
+def _rounded(value):
+    return round(value, 1) if value else 0
+
+
+def get_daily_chaos(limit):
+    """The latest `limit` daily_summary rows, oldest first, or None without a chaos.db."""
+    engine = get_chaos_engine()
+    if engine is None:
+        return None
+
+    with engine.connect() as conn:
+        result = conn.execute(text("""
+            SELECT date, avg_chaos_score, max_chaos_score, total_branch_switches, total_app_switches, active_hours
+            FROM daily_summary
+            ORDER BY date DESC
+            LIMIT :limit
+        """), {"limit": limit})
+        summaries = [{
+            'date': row[0],
+            'avg_score': _rounded(row[1]),
+            'max_score': _rounded(row[2]),
+            'branches': row[3] or 0,
+            'apps': row[4] or 0,
+            'active_hours': _rounded(row[5])
+        } for row in result]
+
+    # Reverse to get chronological order
+    summaries.reverse()
+    return summaries
+
+
+# Chaos days joined to per-day session figures, all inside SQLite. Session days
+# are local days of the session start; open sessions run until :now.
+CORRELATION_SQL = """
+    WITH sessions AS (
+        SELECT date(timestamp, 'localtime') AS day,
+               is_switch,
+               (julianday(COALESCE(end_time, :now)) - julianday(timestamp)) * 86400 AS seconds
+        FROM switches
+        WHERE timestamp >= :range_start AND timestamp < :range_end
+    ),
+    per_day AS (
+        SELECT day,
+               SUM(CASE WHEN is_switch THEN 1 ELSE 0 END) AS switches,
+               SUM(seconds) AS tracked_seconds,
+               SUM(CASE WHEN seconds >= :focus_seconds THEN seconds ELSE 0 END) AS focus_seconds,
+               MAX(seconds) AS longest_seconds
+        FROM sessions
+        GROUP BY day
+    )
+    SELECT c.date, c.avg_chaos_score, c.max_chaos_score, c.total_branch_switches, c.total_app_switches,
+           c.active_hours,
+           COALESCE(p.switches, 0), COALESCE(p.tracked_seconds, 0),
+           COALESCE(p.focus_seconds, 0), COALESCE(p.longest_seconds, 0)
+    FROM chaos.daily_summary AS c
+    LEFT JOIN per_day AS p ON p.day = c.date
+    WHERE c.date BETWEEN :start_date AND :end_date
+    ORDER BY c.date
+"""
+
+CORRELATED = ("switches", "tracked_hours", "focus_hours", "longest_session_hours")
+
+
+def _pearson(xs, ys):
+    """Pearson correlation of two equal-length lists, or None if undefined."""
+    n = len(xs)
+    if n < 3:
+        return None
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    var_y = sum((y - mean_y) ** 2 for y in ys)
+    if not var_x or not var_y:
+        return None
+    return round(cov / math.sqrt(var_x * var_y), 3)
+
+
+def _utc_string(value):
+    # Matches how naive-UTC DateTime columns are stored, so comparisons stay textual
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def get_chaos_correlation(start_date, end_date):
+    """
+    Daily chaos scores for local dates start_date..end_date next to that
+    day's switch count, tracked hours, focus hours (sessions of at least
+    CHAOS_FOCUS_MINUTES) and longest session, from one query over the
+    attached chaos database, plus the Pearson correlation of the average
+    chaos score with each. None if there is no chaos.db.
+    """
+    range_start = datetime.combine(start_date, time.min).astimezone()
+    range_end = datetime.combine(end_date + timedelta(days=1), time.min).astimezone()
+
+    db = SessionLocal()
+    try:
+        connection = db.connection()
+        if not attach_chaos(connection):
+            return None
+        rows = connection.execute(text(CORRELATION_SQL), {
+            "now": _utc_string(datetime.now(timezone.utc)),
+            "range_start": _utc_string(range_start),
+            "range_end": _utc_string(range_end),
+            "focus_seconds": Config.CHAOS_FOCUS_MINUTES * 60,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat()
+        }).all()
+    finally:
+        db.close()
+
+    days = [{
+        "date": row[0],
+        "avg_score": _rounded(row[1]),
+        "max_score": _rounded(row[2]),
+        "branches": row[3] or 0,
+        "apps": row[4] or 0,
+        "active_hours": _rounded(row[5]),
+        "switches": row[6],
+        "tracked_hours": round(row[7] / 3600, 2),
+        "focus_hours": round(row[8] / 3600, 2),
+        "longest_session_hours": round(row[9] / 3600, 2)
+    } for row in rows]
+
+    scores = [day["avg_score"] for day in days]
+    return {
+        "days": days,
+        "correlation": {field: _pearson(scores, [day[field] for day in days]) for field in CORRELATED}
+    }
@@ -0,0 +1,232 @@
+# app/issue_metadata.py
+
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func
+from config import Config
+from app.models import SessionLocal, Switch, CustomTask, JiraIssue, TICKET_KEY_PATTERN
+from app.jira_client import search_issues_raw, parse_jira_datetime, CircuitOpenError
+
+# Keys per `key in (...)` query; keeps the JQL well under URL length limits
+BATCH_SIZE = 50
+
+_resolver_thread = None
+
+
+def issue_fields():
+    fields = ['summary', 'issuetype', 'status', 'parent', 'components', 'updated']
+    if Config.JIRA_EPIC_LINK_FIELD:
+        fields.append(Config.JIRA_EPIC_LINK_FIELD)
+    return ','.join(fields)
+
+
+def _fetch_batch(keys, fields):
+    """
+    Fetch raw issues for `keys` with one JQL query. JIRA rejects the whole
+    query if any key is invalid, so bad batches are bisected down to the
+    offending keys, which come back as missing.
+    """
+    jql = f"key in ({','.join(keys)})"
+    try:
+        return search_issues_raw(jql, fields, page_size=len(keys))
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        if len(keys) == 1:
+            print(f"Warning: Could not resolve JIRA issue {keys[0]}: {e}")
+            return []
+        middle = len(keys) // 2
+        return _fetch_batch(keys[:middle], fields) + _fetch_batch(keys[middle:], fields)
+
+
+def fetch_issues(keys, fields=None):
+    """
+    Fetch raw issue JSON for many keys in batched JQL searches, requesting
+    `fields` (default: everything the metadata cache stores). Returns {key: issue}.
+    """
+    keys = sorted(set(keys))
+    fields = fields or issue_fields()
+    issues = {}
+    for i in range(0, len(keys), BATCH_SIZE):
+        for issue in _fetch_batch(keys[i:i + BATCH_SIZE], fields):
+            issues[issue['key']] = issue
+    return issues
+
+
+def _store_issue(db, key, raw, now):
+    """Upsert one issue's metadata (without epic resolution) and return the row."""
+    row = db.get(JiraIssue, key) or JiraIssue(key=key)
+    row.fetched_at = now
+
+    if raw is None:
+        # Unknown/deleted key: remember it so we don't retry until the TTL expires
+        row.issue_type = None
+        db.add(row)
+        return row
+
+    fields = raw.get('fields', {})
+    parent = fields.get('parent') or {}
+    row.summary = fields.get('summary')
+    row.issue_type = (fields.get('issuetype') or {}).get('name')
+    row.status = (fields.get('status') or {}).get('name')
+    row.parent_key = parent.get('key')
+    row.components = json.dumps([c['name'] for c in fields.get('components') or []])
+    row.updated = parse_jira_datetime(fields.get('updated'))
+
+    # Epic: legacy "Epic Link" field, else a parent that is itself an epic
+    epic_link = fields.get(Config.JIRA_EPIC_LINK_FIELD) if Config.JIRA_EPIC_LINK_FIELD else None
+    parent_type = ((parent.get('fields') or {}).get('issuetype') or {}).get('name')
+    if row.issue_type == 'Epic':
+        row.epic_key, row.epic_summary = key, row.summary
+    elif epic_link:
+        row.epic_key, row.epic_summary = epic_link, None
+    elif parent_type == 'Epic':
+        row.epic_key = parent['key']
+        row.epic_summary = (parent.get('fields') or {}).get('summary')
+    else:
+        row.epic_key, row.epic_summary = None, None
+
+    db.add(row)
+    return row
+
+
+def resolve_issue_metadata(keys, raw_issues=None):
+    """
+    Fetch and store metadata for `keys` (or store already-fetched
+    `raw_issues`, requested with issue_fields()). Sub-tasks inherit the epic
+    of their parent, and epics referenced only by key get their summary
+    filled in; any such parents/epics not yet cached are fetched in a second
+    batched pass. Returns the number of issues stored.
+    """
+    if not keys:
+        return 0
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    if raw_issues is None:
+        raw_issues = fetch_issues(keys)
+
+    db = SessionLocal()
+    try:
+        rows = [_store_issue(db, key, raw_issues.get(key), now) for key in set(keys)]
+        db.flush()
+
+        # Second pass for parents (sub-tasks) and epics we don't know yet
+        needed = {r.parent_key for r in rows if r.parent_key and not r.epic_key}
+        needed |= {r.epic_key for r in rows if r.epic_key and not r.epic_summary}
+        known = {k for (k,) in db.query(JiraIssue.key).filter(JiraIssue.key.in_(needed))}
+        for key, raw in fetch_issues(needed - known).items():
+            _store_issue(db, key, raw, now)
+        db.flush()
+
+        for row in rows:
+            if row.parent_key and not row.epic_key:
+                parent = db.get(JiraIssue, row.parent_key)
+                if parent and parent.epic_key:
+                    row.epic_key, row.epic_summary = parent.epic_key, parent.epic_summary
+            if row.epic_key and not row.epic_summary:
+                epic = db.get(JiraIssue, row.epic_key)
+                if epic:
+                    row.epic_summary = epic.summary
+
+        db.commit()
+        return len(rows)
+    finally:
+        db.close()
+
+
+def get_stale_issue_keys():
+    """JIRA keys used in switches whose metadata is missing or older than the TTL."""
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=Config.JIRA_METADATA_TTL_HOURS)
+
+    db = SessionLocal()
+    try:
+        tracked = {k for (k,) in db.query(Switch.to_task).distinct() if k and TICKET_KEY_PATTERN.match(k)}
+        internal = {k for (k,) in db.query(CustomTask.ticket_id)}
+        fresh = {k for (k,) in db.query(JiraIssue.key).filter(JiraIssue.fetched_at >= cutoff)}
+        return sorted(tracked - internal - fresh)
+    finally:
+        db.close()
+
+
+def refresh_issue_metadata():
+    """Resolve metadata for every tracked ticket that needs it."""
+    keys = get_stale_issue_keys()
+    if keys:
+        count = resolve_issue_metadata(keys)
+        print(f"Resolved JIRA metadata for {count} issues")
+    return len(keys)
+
+
+def _resolver_loop():
+    # Each refresh is a queued job, so with several server processes only one runs at a time
+    from app.jobs import enqueue_job
+
+    while True:
+        try:
+            enqueue_job("issue_metadata_refresh", unique=True)
+        except Exception as e:
+            print(f"JIRA metadata resolver error: {e}")
+        time.sleep(Config.JIRA_METADATA_REFRESH_MINUTES * 60)
+
+
+def start_issue_metadata_resolver():
+    """Start the thread that schedules metadata refreshes (once per process) if JIRA is configured."""
+    global _resolver_thread
+    if not Config.JIRA_URL or (_resolver_thread and _resolver_thread.is_alive()):
+        return
+    _resolver_thread = threading.Thread(target=_resolver_loop, name="jira-metadata", daemon=True)
+    _resolver_thread.start()
+
+
+def get_time_by_issue_field(db, dimension, start_date, end_date):
+    """
+    Tracked session time rolled up by 'epic', 'component' or 'issue_type',
+    joining switches to the local jira_issues table (no network calls).
+    Components are unnested with json_each, so an issue in two components
+    counts towards both.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    seconds = (func.julianday(func.coalesce(Switch.end_time, now)) - func.julianday(Switch.timestamp)) * 86400
+
+    if dimension == 'epic':
+        keys = [JiraIssue.epic_key, JiraIssue.epic_summary]
+    elif dimension == 'component':
+        component = func.json_each(JiraIssue.components).table_valued("value")
+        keys = [component.c.value]
+    else:
+        keys = [JiraIssue.issue_type]
+
+    query = (
+        db.query(*keys,
+                 func.sum(seconds).label("total_seconds"),
+                 func.count(Switch.id).label("session_count"),
+                 func.count(func.distinct(Switch.to_task)).label("ticket_count"))
+        .select_from(Switch)
+        .join(JiraIssue, JiraIssue.key == Switch.to_task)
+        .filter(JiraIssue.issue_type.isnot(None))
+        .filter(Switch.timestamp >= start_date)
+        .filter(Switch.timestamp < end_date)
+    )
+    if dimension == 'component':
+        query = query.join(component, func.json_valid(JiraIssue.components) == 1)
+
+    rows = query.group_by(*keys).order_by(func.sum(seconds).desc()).all()
+
+    result = []
+    for row in rows:
+        entry = {
+            'total_hours': round(row.total_seconds / 3600, 2),
+            'total_seconds': round(row.total_seconds),
+            'session_count': row.session_count,
+            'ticket_count': row.ticket_count
+        }
+        if dimension == 'epic':
+            entry['epic'] = row.epic_key
+            entry['summary'] = row.epic_summary
+        else:
+            entry[dimension] = row[0]
+        result.append(entry)
+
+    return result
@@ -1,31 +1,322 @@
 # app/jira_client.py
 
-from jira import JIRA
+import functools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import requests
+from jira import JIRA, JIRAError
 from config import Config
 
 
-def get_jira_client():
+class CircuitOpenError(Exception):
+    """Raised instead of calling JIRA while the circuit breaker is open."""
+
+
+class WriteAppliedError(Exception):
+    """Raised instead of retrying a write that turned out to have reached JIRA despite the error."""
+
+
+def _is_outage(error):
+    """
+    Whether an exception means JIRA is unavailable (vs. a bad request such as
+    an unknown key, or rate limiting, which writes back off from on their own).
+    """
+    if isinstance(error, JIRAError):
+        return error.status_code is None or error.status_code >= 500
+    return isinstance(error, requests.exceptions.RequestException)
+
+
+class CircuitBreaker:
     """
-    Instantiate and return a JIRA client using credentials from Config.
+    Closed: calls go through. After `failure_threshold` consecutive outages
+    it opens and every call fails immediately with CircuitOpenError. Once
+    `reset_seconds` have passed it goes half-open and lets a single trial
+    call through, which either closes it again or re-opens it.
     """
-    return JIRA(
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.last_latency_ms = None
+        self.avg_latency_ms = None
+        self.last_error = None
+        self.last_failure_at = None
+
+    def _acquire(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = "half-open"
+            if self.state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            if self.state != "closed":
+                self.rejected += 1
+                raise CircuitOpenError("JIRA is unavailable (circuit open); using cached data")
+
+    def _record(self, latency, error):
+        with self._lock:
+            self.calls += 1
+            self.last_latency_ms = round(latency * 1000, 1)
+            self.avg_latency_ms = (self.last_latency_ms if self.avg_latency_ms is None
+                                   else round(0.8 * self.avg_latency_ms + 0.2 * self.last_latency_ms, 1))
+            self._trial_in_flight = False
+
+            if error is None:
+                self.state = "closed"
+                self.consecutive_failures = 0
+                return
+
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = str(error)[:200]
+            self.last_failure_at = datetime.now(timezone.utc).isoformat()
+            if self.state == "half-open" or self.consecutive_failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def call(self, fn, *args, **kwargs):
+        """Run `fn` through the breaker, timing it and recording outages."""
+        self._acquire()
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._record(time.monotonic() - started, e if _is_outage(e) else None)
+            raise
+        self._record(time.monotonic() - started, None)
+        return result
+
+    def status(self):
+        with self._lock:
+            retry_in = None
+            if self.state == "open":
+                retry_in = round(max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at)), 1)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "retry_in_seconds": retry_in,
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "last_latency_ms": self.last_latency_ms,
+                "avg_latency_ms": self.avg_latency_ms,
+                "last_error": self.last_error,
+                "last_failure_at": self.last_failure_at
+            }
+
+
+breaker = CircuitBreaker(Config.JIRA_BREAKER_FAILURES, Config.JIRA_BREAKER_RESET_SECONDS)
+
+
+class GuardedJira:
+    """Wraps a JIRA client so every API method call goes through the circuit breaker."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def guarded(*args, **kwargs):
+            return breaker.call(attr, *args, **kwargs)
+        return guarded
+
+
+# One client per process, shared by all threads; rebuilt when credentials change
+_client_lock = threading.Lock()
+_client = None
+_client_key = None
+_clients_built = 0
+
+
+def _build_client():
+    client = JIRA(
         server=Config.JIRA_URL,
-        basic_auth=(Config.JIRA_USER, Config.JIRA_TOKEN)
+        basic_auth=(Config.JIRA_USER, Config.JIRA_TOKEN),
+        timeout=Config.JIRA_TIMEOUT_SECONDS,
+        max_retries=0
     )
+    # Keep-alive pool sized for the parallel page/worklog fetches
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=Config.JIRA_POOL_SIZE)
+    client._session.mount("https://", adapter)
+    client._session.mount("http://", adapter)
+    return client
+
+
+def get_jira_client():
+    """
+    Return the process-wide JIRA client for the credentials in Config.
+    The server-info handshake and TLS connections are reused across calls
+    and threads; the client is rebuilt if the credentials change. Calls time
+    out after JIRA_TIMEOUT_SECONDS without library retries; the circuit
+    breaker decides when to try again.
+    """
+    global _client, _client_key, _clients_built
+    key = (Config.JIRA_URL, Config.JIRA_USER, Config.JIRA_TOKEN)
 
+    with _client_lock:
+        if _client is None or _client_key != key:
+            if _client is not None:
+                _client.close()
+            _client = breaker.call(_build_client)
+            _client_key = key
+            _clients_built += 1
+        return GuardedJira(_client)
 
 
-def get_assigned_tickets(max_results: int = 50):
+def reset_jira_client():
+    """Drop the shared client so the next call reconnects."""
+    global _client, _client_key
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client, _client_key = None, None
+
+
+def get_jira_health():
+    """Circuit breaker state, JIRA call latency and how often the shared client was (re)built."""
+    return {"configured": bool(Config.JIRA_URL), "clients_built": _clients_built, **breaker.status()}
+
+
+class TokenBucket:
+    """Blocking token-bucket rate limiter shared by all threads."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+write_limiter = TokenBucket(Config.JIRA_SYNC_RATE, Config.JIRA_SYNC_BURST)
+
+
+def _is_retryable(error):
+    if isinstance(error, JIRAError):
+        return error.status_code is not None and (error.status_code == 429 or error.status_code >= 500)
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def _retry_delay(error, attempt):
+    """Seconds to wait before retry `attempt`: the server's Retry-After, else full-jitter exponential backoff."""
+    response = getattr(error, 'response', None)
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return random.uniform(0, min(30.0, 2.0 ** attempt))
+
+
+def _may_have_applied(error):
+    """Whether a failed write may still have been carried out: anything but a 429 or a failure to connect."""
+    if isinstance(error, JIRAError):
+        return error.status_code != 429
+    return not isinstance(error, requests.exceptions.ConnectTimeout)
+
+
+def call_with_retries(fn, *args, recheck=None, **kwargs):
     """
-    Fetches up to `max_results` issues assigned to the current user that are unresolved.
-    Returns a list of (issue_key, summary) tuples.
+    Run a JIRA write under the shared rate limit, retrying 429, 5xx and
+    connection errors up to JIRA_SYNC_RETRIES times with jittered backoff.
+    CircuitOpenError is never retried.
+
+    A write that isn't idempotent passes `recheck`. After a failure that
+    may have reached JIRA anyway (a read timeout, a reset connection, a
+    5xx) it is only retried if recheck() returns False; if recheck()
+    finds the write was carried out, WriteAppliedError is raised instead.
+    """
+    for attempt in range(Config.JIRA_SYNC_RETRIES + 1):
+        write_limiter.acquire()
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == Config.JIRA_SYNC_RETRIES or not _is_retryable(e):
+                raise
+            error = e
+        time.sleep(_retry_delay(error, attempt))
+        if recheck is not None and _may_have_applied(error) and recheck():
+            raise WriteAppliedError(str(error)) from error
+
+
+def jira_rest(method, path, **kwargs):
+    """
+    Call a REST API path (relative to /rest/api/2/) that the jira library
+    doesn't wrap, through the shared client and circuit breaker. Returns the
+    parsed JSON body.
+    """
+    client = get_jira_client()._client
+    response = breaker.call(client._session.request, method, client._get_url(path), **kwargs)
+    return response.json()
+
+
+def search_issues_raw(jql: str, fields: str, page_size: int = 100):
+    """
+    Run a JQL search and return every matching issue as a raw JSON dict,
+    following pagination (nextPageToken on Cloud, startAt on Server/DC).
     """
     j = get_jira_client()
-    jql = 'assignee = currentUser() AND resolution = Unresolved ORDER BY updated DESC'
-    # Use the new API format - specify fields to retrieve
-    # According to the migration doc, we need to explicitly request fields
-    issues = j.search_issues(jql, maxResults=max_results, fields='key,summary')
-    results = [(issue.key, issue.fields.summary) for issue in issues]
-    # Sort by numeric part of the ticket key, descending (highest number first)
-    results.sort(key=lambda x: int(x[0].split('-', 1)[1]), reverse=True)
-    return results
+    issues = []
+
+    if j._is_cloud:
+        token = None
+        while True:
+            page = j.enhanced_search_issues(jql, nextPageToken=token, maxResults=page_size,
+                                            fields=fields, json_result=True)
+            issues.extend(page.get('issues', []))
+            token = page.get('nextPageToken')
+            if not token or page.get('isLast'):
+                break
+    else:
+        # The first page reports the total, so the rest can be fetched in parallel.
+        # (Cloud's token paging above is inherently sequential.)
+        def fetch_page(start):
+            return j.search_issues(jql, startAt=start, maxResults=page_size,
+                                   fields=fields, json_result=True)
+
+        first = fetch_page(0)
+        issues.extend(first.get('issues', []))
+        page_size = len(issues) or page_size  # the server may cap maxResults
+        starts = range(len(issues), first.get('total', 0), page_size) if issues else []
+        if starts:
+            with ThreadPoolExecutor(max_workers=min(len(starts), Config.JIRA_PAGE_WORKERS)) as pool:
+                for page in pool.map(fetch_page, starts):
+                    issues.extend(page.get('issues', []))
+
+    return issues
+
+
+def parse_jira_datetime(value):
+    """
+    Parse a JIRA timestamp like 2024-01-02T10:11:12.000+0000 into a naive UTC
+    datetime (the convention used for all datetimes stored in the database).
+    """
+    if not value:
+        return None
+    parsed = datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%f%z')
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None)
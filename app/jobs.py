@@ -0,0 +1,388 @@
+# app/jobs.py
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from config import Config
+from app.models import SessionLocal, Job
+from app.timesync import batch_sync_to_jira
+from app.ticket_cache import sync_assigned_tickets
+from app.worklogs import sync_worklogs
+from app.issue_metadata import refresh_issue_metadata
+
+FINISHED = ("done", "failed", "cancelled")
+
+# How often idle workers look for jobs orphaned by a process that died or was reloaded
+ORPHAN_CHECK_SECONDS = 30
+# Each process stamps its running jobs this often; a job not stamped for STALE_SECONDS is orphaned
+HEARTBEAT_SECONDS = 10
+STALE_SECONDS = 60
+
+_queue_changed = threading.Condition()
+_worker_threads = []
+_workers_lock = threading.Lock()
+_host = socket.gethostname()
+_process = {"pid": None, "id": None}
+_orphans_checked = {"at": 0.0}
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _worker_id():
+    """host:pid:token of this process; the token tells it apart from an earlier process with the same pid."""
+    if _process["pid"] != os.getpid():
+        _process.update(pid=os.getpid(), id=f"{_host}:{os.getpid()}:{uuid.uuid4().hex[:8]}")
+    return _process["id"]
+
+
+def _heartbeat_loop():
+    """Stamp this process's running jobs so other processes can tell it is alive."""
+    while True:
+        try:
+            db = SessionLocal()
+            try:
+                (db.query(Job)
+                 .filter(Job.status == "running", Job.worker == _worker_id())
+                 .update({Job.heartbeat_at: _utcnow()}, synchronize_session=False))
+                db.commit()
+            finally:
+                db.close()
+        except Exception as e:
+            print(f"Job heartbeat error: {e}")
+        time.sleep(HEARTBEAT_SECONDS)
+
+
+class JobContext:
+    """Handed to a running handler to report progress and check for cancellation."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._lock = threading.Lock()
+        self._progress = 0
+        self.stopped = False  # Set once the handler saw a cancel request with work left
+
+    def _update(self, **values):
+        db = SessionLocal()
+        try:
+            db.query(Job).filter(Job.id == self.job_id).update(values, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def set_total(self, total):
+        self._update(total=total)
+
+    def advance(self, units=1):
+        """Record `units` more work done; safe to call from several threads."""
+        with self._lock:
+            self._progress += units
+            self._update(progress=self._progress)
+
+    def cancelled(self):
+        """
+        True if the job was asked to stop. Handlers call this before each
+        unit of work, so a True answer means that work gets skipped.
+        """
+        db = SessionLocal()
+        try:
+            requested = bool(db.query(Job.cancel_requested).filter(Job.id == self.job_id).scalar())
+        finally:
+            db.close()
+        if requested:
+            self.stopped = True
+        return requested
+
+
+def _sync_handler(params, job):
+    intervals = params.get('intervals', [])
+    job.set_total(len(intervals))
+    results = batch_sync_to_jira(intervals, on_result=lambda result: job.advance(), should_stop=job.cancelled)
+
+    # Count successes, skips, cancellations and failures
+    success_count = sum(1 for r in results if r['success'])
+    skipped_count = sum(1 for r in results if r['skipped'])
+    cancelled_count = sum(1 for r in results if r['cancelled'])
+    return {
+        "results": results,
+        "summary": {
+            "total": len(results),
+            "success": success_count,
+            "skipped": skipped_count,
+            "cancelled": cancelled_count,
+            "failed": len(results) - success_count - skipped_count - cancelled_count
+        }
+    }
+
+
+def _tickets_handler(params, job):
+    return {"tickets": sync_assigned_tickets(full=params.get('full', False))}
+
+
+def _worklogs_handler(params, job):
+    return {"worklogs": sync_worklogs()}
+
+
+def _metadata_handler(params, job):
+    return {"issues": refresh_issue_metadata()}
+
+
+# Job kind -> handler(params, JobContext) returning a JSON-serializable result
+HANDLERS = {
+    "timesync_sync": _sync_handler,
+    "tickets_refresh": _tickets_handler,
+    "worklogs_refresh": _worklogs_handler,
+    "issue_metadata_refresh": _metadata_handler,
+}
+
+
+def job_dict(job, include_result=True):
+    entry = {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "total": job.total,
+        "cancel_requested": job.cancel_requested,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+    if include_result:
+        entry["result"] = json.loads(job.result) if job.result else None
+    return entry
+
+
+def enqueue_job(kind, params=None, unique=False):
+    """
+    Queue a job and wake a worker. With `unique`, an already queued or
+    running job of the same kind is reused instead. Returns the job id.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    db = SessionLocal()
+    try:
+        if unique:
+            existing = (
+                db.query(Job.id)
+                .filter(Job.kind == kind, Job.status.in_(("queued", "running")))
+                .order_by(Job.id)
+                .first()
+            )
+            if existing:
+                return existing.id
+
+        # Prune old finished jobs while we're here
+        cutoff = _utcnow() - timedelta(days=Config.JOB_RETENTION_DAYS)
+        (db.query(Job)
+         .filter(Job.status.in_(FINISHED), Job.finished_at < cutoff)
+         .delete(synchronize_session=False))
+
+        job = Job(kind=kind, status="queued", params=json.dumps(params or {}), progress=0,
+                  cancel_requested=False, created_at=_utcnow())
+        db.add(job)
+        db.commit()
+        job_id = job.id
+    finally:
+        db.close()
+
+    start_job_workers()
+    with _queue_changed:
+        _queue_changed.notify()
+    return job_id
+
+
+def get_job(job_id):
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        return job_dict(job) if job else None
+    finally:
+        db.close()
+
+
+def list_jobs(status=None, limit=50):
+    """Most recent jobs first, without their (possibly large) results."""
+    db = SessionLocal()
+    try:
+        query = db.query(Job)
+        if status:
+            query = query.filter(Job.status == status)
+        return [job_dict(job, include_result=False) for job in query.order_by(Job.id.desc()).limit(limit)]
+    finally:
+        db.close()
+
+
+def cancel_job(job_id):
+    """
+    Cancel a queued job outright, or ask a running one to stop after the
+    work in flight. Returns the job, or None if it doesn't exist.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        if job is None:
+            return None
+        if job.status == "queued":
+            job.status = "cancelled"
+            job.finished_at = _utcnow()
+        elif job.status == "running":
+            job.cancel_requested = True
+        db.commit()
+        return job_dict(job)
+    finally:
+        db.close()
+
+
+def job_events(job_id, poll_seconds=0.5, heartbeat_seconds=15):
+    """
+    Server-sent events for one job: the job (without its result until it
+    finishes) each time it changes, ending once it is finished.
+    """
+    last, last_sent = None, time.monotonic()
+    while True:
+        job = get_job(job_id)
+        if job is None:
+            yield f"event: error\ndata: {json.dumps({'error': 'Job not found'})}\n\n"
+            return
+        if job["status"] not in FINISHED:
+            job.pop("result")
+        if job != last:
+            yield f"data: {json.dumps(job)}\n\n"
+            last, last_sent = job, time.monotonic()
+        elif time.monotonic() - last_sent > heartbeat_seconds:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        if job["status"] in FINISHED:
+            return
+        time.sleep(poll_seconds)
+
+
+def _claim_next():
+    """Atomically move the oldest queued job to running. Returns its id, or None."""
+    db = SessionLocal()
+    try:
+        while True:
+            row = db.query(Job.id).filter(Job.status == "queued").order_by(Job.id).first()
+            if row is None:
+                return None
+            claimed = (
+                db.query(Job)
+                .filter(Job.id == row.id, Job.status == "queued")
+                .update({Job.status: "running", Job.started_at: _utcnow(), Job.worker: _worker_id(),
+                         Job.heartbeat_at: _utcnow()},
+                        synchronize_session=False)
+            )
+            db.commit()
+            if claimed:
+                return row.id
+    finally:
+        db.close()
+
+
+def _run(job_id):
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        kind, params = job.kind, json.loads(job.params or "{}")
+    finally:
+        db.close()
+
+    context = JobContext(job_id)
+    result, error = None, None
+    try:
+        result = HANDLERS[kind](params, context)
+        # A cancel that came in after the last unit of work skipped nothing
+        status = "cancelled" if context.stopped else "done"
+    except Exception as e:
+        print(f"Job {job_id} ({kind}) failed: {e}")
+        status, error = "failed", str(e)
+
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        job.status = status
+        job.result = json.dumps(result) if result is not None else None
+        job.error = error
+        job.finished_at = _utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+
+def requeue_orphaned_jobs():
+    """
+    Requeue running jobs whose process is gone (crashed, stopped or
+    replaced by a reload): those not claimed by this process whose
+    heartbeat is over STALE_SECONDS old. Jobs running in other live server
+    processes keep being stamped and are left alone, so every process can
+    call this. The sync journal keeps a rerun sync from posting worklogs
+    twice. Returns the number requeued.
+    """
+    _orphans_checked["at"] = time.monotonic()
+    stale = _utcnow() - timedelta(seconds=STALE_SECONDS)
+    db = SessionLocal()
+    try:
+        orphaned = [
+            job.id for job in (
+                db.query(Job.id)
+                .filter(Job.status == "running")
+                .filter((Job.worker.is_(None)) | (Job.worker != _worker_id()))
+                .filter((Job.heartbeat_at.is_(None)) | (Job.heartbeat_at < stale))
+            )
+        ]
+        if orphaned:
+            (db.query(Job)
+             .filter(Job.id.in_(orphaned), Job.status == "running")
+             .update({Job.status: "queued", Job.progress: 0, Job.worker: None, Job.heartbeat_at: None},
+                     synchronize_session=False))
+            db.commit()
+        return len(orphaned)
+    finally:
+        db.close()
+
+
+def _worker_loop():
+    while True:
+        try:
+            job_id = _claim_next()
+            if job_id is None and time.monotonic() - _orphans_checked["at"] > ORPHAN_CHECK_SECONDS:
+                if requeue_orphaned_jobs():
+                    job_id = _claim_next()
+        except Exception as e:
+            print(f"Job queue error: {e}")
+            job_id = None
+        if job_id is None:
+            with _queue_changed:
+                _queue_changed.wait(Config.JOB_POLL_SECONDS)
+            continue
+        _run(job_id)
+
+
+def start_job_workers():
+    """
+    Start the JOB_WORKERS worker threads and the heartbeat thread (once per
+    process; call it after forking). Jobs orphaned by an earlier process
+    are requeued first.
+    """
+    with _workers_lock:
+        if any(thread.is_alive() for thread in _worker_threads):
+            return
+
+        requeue_orphaned_jobs()
+
+        _worker_threads.clear()
+        for i in range(Config.JOB_WORKERS):
+            thread = threading.Thread(target=_worker_loop, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            _worker_threads.append(thread)
+        heartbeat = threading.Thread(target=_heartbeat_loop, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        _worker_threads.append(heartbeat)
@@ -7,8 +7,14 @@ from sqlalchemy import (
     DateTime,
     Text,
     Boolean,
+    Float,
+    UniqueConstraint,
+    Index,
+    Computed,
     create_engine,
+    event,
     func,
+    text,
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -19,14 +25,61 @@ import re
 engine = create_engine(Config.DATABASE_URL, echo=False, future=True)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+
+# SQLite: WAL lets readers (dashboards) run while a writer (a sync job) commits,
+# and busy_timeout makes concurrent writers from several threads or server
+# processes wait for the lock instead of failing with "database is locked"
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {Config.SQLITE_BUSY_TIMEOUT_MS}")
+        if Config.DATABASE_URL not in ("sqlite://", "sqlite:///:memory:"):
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.close()
+
+
+def lock_for_write(db):
+    """
+    Take the database write lock for `db`'s transaction now (SQLite BEGIN
+    IMMEDIATE) rather than at its first write, so a read-modify-write (a
+    running counter, "the current task") can't interleave with another
+    thread or server process doing the same. Waits up to busy_timeout.
+    A no-op once the transaction has written, and on other databases.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    connection = db.connection()
+    if not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
 # 2) Base class
 Base = declarative_base()
 
 
 
+# JIRA ticket keys (OPS-123): a project of two or more capitals/digits, starting
+# with a letter, a hyphen and a number. project_expression is the same rule in SQL.
+TICKET_KEY = r"[A-Z][A-Z0-9]+-[0-9]+"
+TICKET_KEY_PATTERN = re.compile(rf"{TICKET_KEY}\Z")
+
+
+# Project prefix of a ticket key (OPS-123 -> OPS, INT-001 -> INT), NULL for free-form
+# tasks such as "follow-up"
+def project_expression(column):
+    prefix = f"substr({column}, 1, instr({column}, '-') - 1)"
+    number = f"substr({column}, instr({column}, '-') + 1)"
+    return (f"CASE WHEN instr({column}, '-') > 2 AND {prefix} GLOB '[A-Z]*' AND NOT {prefix} GLOB '*[^A-Z0-9]*' "
+            f"AND {number} GLOB '[0-9]*' AND NOT {number} GLOB '*[^0-9]*' THEN {prefix} END")
+
+
 # 3) Switch record model
 class Switch(Base):
     __tablename__ = "switches"
+    __table_args__ = (
+        Index("ix_switches_timestamp_project", "timestamp", "project"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -37,6 +90,9 @@ class Switch(Base):
     category = Column(String, nullable=True)  # Keep for backward compatibility
     tags = Column(Text, nullable=True)  # JSON as text for SQLite
     is_switch = Column(Boolean, nullable=False, server_default="1")
+    # Generated from the task keys so project rollups are a plain indexed GROUP BY
+    project = Column(String, Computed(project_expression("to_task"), persisted=True), index=True)
+    from_project = Column(String, Computed(project_expression("from_task"), persisted=True), index=True)
 
 
 
@@ -108,6 +164,205 @@ class TodoItem(Base):
     position = Column(Integer, nullable=False, server_default="0")
 
 
+# SwitchRateStat model for online switch-rate statistics (one row per granularity)
+class SwitchRateStat(Base):
+    __tablename__ = "switch_rate_stats"
+
+    granularity = Column(String(10), primary_key=True)  # hour, day
+    bucket = Column(String(20), nullable=True)  # Open bucket, e.g. 2026-10-19T14 or 2026-10-19
+    bucket_count = Column(Integer, nullable=False, server_default="0")  # Switches in the open bucket
+    samples = Column(Integer, nullable=False, server_default="0")  # Closed buckets folded in
+    mean = Column(Float, nullable=False, server_default="0")  # Welford running mean
+    m2 = Column(Float, nullable=False, server_default="0")  # Welford sum of squared deviations
+    ewma = Column(Float, nullable=True)  # Exponentially weighted moving average
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+# SwitchRateAnomaly model for hours/days flagged as unusually chaotic
+class SwitchRateAnomaly(Base):
+    __tablename__ = "switch_rate_anomalies"
+    __table_args__ = (UniqueConstraint("granularity", "bucket"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String(10), nullable=False)
+    bucket = Column(String(20), nullable=False)
+    count = Column(Integer, nullable=False)
+    mean = Column(Float, nullable=False)
+    stddev = Column(Float, nullable=False)
+    z_score = Column(Float, nullable=False)
+    ewma = Column(Float, nullable=True)
+    detected_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+# JiraIssue model: local cache of JIRA issue metadata (type, epic, components)
+class JiraIssue(Base):
+    __tablename__ = "jira_issues"
+
+    key = Column(String(50), primary_key=True)
+    summary = Column(Text, nullable=True)
+    issue_type = Column(String(100), nullable=True, index=True)  # NULL if the key couldn't be resolved
+    status = Column(String(100), nullable=True)
+    parent_key = Column(String(50), nullable=True)
+    epic_key = Column(String(50), nullable=True, index=True)
+    epic_summary = Column(Text, nullable=True)
+    components = Column(Text, nullable=True)  # JSON list of component names
+    updated = Column(DateTime(timezone=True), nullable=True)  # JIRA's last-updated time
+    assigned = Column(Boolean, nullable=False, server_default="0", index=True)  # Unresolved and assigned to the current user
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+# TimeBudget model: hour budgets per ticket or project
+class TimeBudget(Base):
+    __tablename__ = "time_budgets"
+    __table_args__ = (UniqueConstraint("scope", "target", "period"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String(10), nullable=False)  # ticket, project
+    target = Column(String(50), nullable=False)  # OPS-123 or OPS
+    period = Column(String(10), nullable=False, server_default="lifetime")  # lifetime, week, month
+    hours = Column(Float, nullable=False)
+    alert_threshold = Column(Float, nullable=False, server_default="0.8")  # Fraction of budget that triggers a warning
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+# TimeTotal model: running per-ticket/per-project counters, updated as sessions close or change
+class TimeTotal(Base):
+    __tablename__ = "time_totals"
+
+    scope = Column(String(10), primary_key=True)  # ticket, project
+    target = Column(String(50), primary_key=True)
+    period_key = Column(String(20), primary_key=True)  # lifetime, week:2026-10-18, month:2026-10
+    seconds = Column(Float, nullable=False, server_default="0")
+
+
+# ReconciliationDay model: cached tracked/ActivityWatch/JIRA comparison for a closed day
+class ReconciliationDay(Base):
+    __tablename__ = "reconciliation_days"
+
+    day = Column(String(10), primary_key=True)  # Local date, YYYY-MM-DD
+    data = Column(Text, nullable=False)  # JSON: day totals and per-ticket rows
+    computed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+# SuggestionRule model: window-title patterns that suggest a ticket/tags for untracked time
+class SuggestionRule(Base):
+    __tablename__ = "suggestion_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    pattern = Column(String(500), nullable=False)
+    is_regex = Column(Boolean, nullable=False, default=False)  # Otherwise a plain substring
+    field = Column(String(10), nullable=False, default="title")  # title, app or any
+    ticket = Column(String(50), nullable=True)  # Suggested ticket, if any
+    tags = Column(Text, nullable=True)  # JSON list of suggested tags
+    priority = Column(Integer, nullable=False, default=100)  # Lower wins when several rules match
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+# AttributionDay model: cached active/AFK split of tracked sessions for a closed day
+class AttributionDay(Base):
+    __tablename__ = "attribution_days"
+
+    day = Column(String(10), primary_key=True)  # Local date, YYYY-MM-DD
+    data = Column(Text, nullable=False)  # JSON: day totals and per-task seconds
+    computed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+# ActivityWatchDay model: ActivityWatch active time for a closed day (today is always queried live)
+class ActivityWatchDay(Base):
+    __tablename__ = "activitywatch_days"
+
+    day = Column(String(10), primary_key=True)  # Local date, YYYY-MM-DD
+    active_seconds = Column(Float, nullable=False)  # Not-AFK window time
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+# SyncState model: watermark for each incremental sync against an external system
+class SyncState(Base):
+    __tablename__ = "sync_state"
+
+    name = Column(String(50), primary_key=True)  # e.g. assigned_tickets
+    synced_at = Column(DateTime(timezone=True), nullable=True)  # Start of the last successful sync (UTC)
+    full_synced_at = Column(DateTime(timezone=True), nullable=True)  # Start of the last full (non-incremental) sync
+    cursor = Column(Text, nullable=True)  # Source-specific position, if the API has one
+    covers_from = Column(DateTime(timezone=True), nullable=True)  # Older data isn't mirrored (UTC; None: no limit)
+
+# Worklog model: local mirror of the current user's JIRA worklogs
+class Worklog(Base):
+    __tablename__ = "worklogs"
+    __table_args__ = (
+        Index("ix_worklogs_issue_key_started", "issue_key", "started"),
+    )
+
+    id = Column(String(20), primary_key=True)  # JIRA worklog id
+    issue_id = Column(String(20), nullable=False, index=True)
+    issue_key = Column(String(50), nullable=True)  # NULL until the issue id could be resolved
+    author = Column(String(255), nullable=True)  # Author display name
+    started = Column(DateTime(timezone=True), nullable=False, index=True)  # UTC
+    started_raw = Column(String(40), nullable=False)  # JIRA's own string, e.g. 2026-10-18T09:00:00.000-0400
+    time_spent_seconds = Column(Integer, nullable=False)
+    time_spent = Column(String(50), nullable=True)  # e.g. "1h 30m"
+    comment = Column(Text, nullable=True)
+    updated = Column(DateTime(timezone=True), nullable=True)  # JIRA's last-updated time
+
+# SyncJournal model: intervals already posted to JIRA, so reruns skip them without JIRA reads
+class SyncJournal(Base):
+    __tablename__ = "sync_journal"
+    __table_args__ = (
+        UniqueConstraint("switch_id", "content_hash", name="uq_sync_journal_switch_hash"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    switch_id = Column(Integer, nullable=False, index=True)
+    content_hash = Column(String(64), nullable=False)  # sha256 of ticket, start, duration and note
+    ticket = Column(String(50), nullable=False)
+    worklog_id = Column(String(20), nullable=True)
+    synced_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+# Job model: background work (JIRA sync, cache refreshes) queued by the web app
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)  # e.g. timesync_sync, tickets_refresh
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, done, failed, cancelled
+    params = Column(Text, nullable=True)  # JSON arguments for the handler
+    result = Column(Text, nullable=True)  # JSON result once done
+    error = Column(Text, nullable=True)
+    progress = Column(Integer, nullable=False, default=0)  # Units of work done...
+    total = Column(Integer, nullable=True)  # ...out of this many, if known
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    worker = Column(String(100), nullable=True)  # host:pid:token of the process running it
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # Last sign of life from that process (UTC)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+# Columns added after the first release. SQLite can't ALTER in a STORED generated
+# column, so existing databases get a VIRTUAL one; with its index the GROUP BY
+# plans are the same.
+MIGRATIONS = [
+    ("switches", "project",
+     f"ALTER TABLE switches ADD COLUMN project VARCHAR GENERATED ALWAYS AS ({project_expression('to_task')}) VIRTUAL"),
+    ("switches", "from_project",
+     f"ALTER TABLE switches ADD COLUMN from_project VARCHAR GENERATED ALWAYS AS ({project_expression('from_task')}) VIRTUAL"),
+]
+
+
+def migrate_db():
+    """Add missing columns to tables created by older versions, then their indexes."""
+    with engine.begin() as conn:
+        for table, column, ddl in MIGRATIONS:
+            # table_xinfo (unlike table_info) also lists generated columns
+            existing = {row[1] for row in conn.execute(text(f"PRAGMA table_xinfo({table})"))}
+            if column not in existing:
+                conn.execute(text(ddl))
+
+        # create_all() skips indexes on tables that already exist
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
 # 4) Create the table (run once at startup)
 def init_db():
     Base.metadata.create_all(bind=engine)
+    migrate_db()
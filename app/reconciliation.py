@@ -0,0 +1,223 @@
+# app/reconciliation.py
+
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from config import Config
+from app.models import SessionLocal, Switch, CustomTask, ReconciliationDay, Worklog, TICKET_KEY_PATTERN
+from app.activitywatch import get_daily_active_seconds
+from app.worklogs import refresh_worklogs
+
+def utc_timestamp(value):
+    """POSIX timestamp of a naive-UTC database datetime."""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def local_midnight(day):
+    """POSIX timestamp of local midnight at the start of `day`."""
+    return datetime.combine(day, time.min).timestamp()
+
+
+def split_by_day(start_ts, end_ts):
+    """Yield (local date ISO string, seconds) for a span, cut at local midnights."""
+    while start_ts < end_ts:
+        day = datetime.fromtimestamp(start_ts).date()
+        cut = min(end_ts, local_midnight(day + timedelta(days=1)))
+        yield day.isoformat(), cut - start_ts
+        start_ts = cut
+
+
+def day_range(start_date, end_date):
+    """Local dates start_date..end_date (inclusive) as ISO strings."""
+    days = []
+    day = start_date
+    while day <= end_date:
+        days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+def cached_days(model, days, compute, refresh=False):
+    """
+    Per-day entries for ISO dates `days`, from a day cache table (`model`
+    with day, data and computed_at columns) where present. The missing
+    days go to compute(missing), which yields (entry, complete) pairs;
+    entries for other days are ignored. A closed day's entry is cached
+    only if it is complete. `refresh` ignores and rewrites the cache.
+    Returns the entries in `days` order.
+    """
+    today = date.today().isoformat()
+    db = SessionLocal()
+    try:
+        cached = {}
+        if not refresh:
+            rows = db.query(model).filter(model.day.in_(days)).all()
+            cached = {row.day: json.loads(row.data) for row in rows}
+
+        missing = [d for d in days if d not in cached]
+        if missing:
+            wanted = set(missing)
+            for entry, complete in compute(missing):
+                if entry["date"] not in wanted:
+                    continue
+                cached[entry["date"]] = entry
+                if entry["date"] < today and complete:
+                    db.merge(model(day=entry["date"], data=json.dumps(entry),
+                                   computed_at=datetime.now(timezone.utc).replace(tzinfo=None)))
+            db.commit()
+
+        return [cached[d] for d in days]
+    finally:
+        db.close()
+
+
+def _hours(seconds):
+    return round(seconds / 3600, 2) if seconds is not None else None
+
+
+def _reconcile(days, sessions, aw_seconds, worklogs, jira_tickets):
+    """
+    Build the report for `days` from plain inputs. One pass over sessions
+    and one over worklogs fills a {day: {ticket: [tracked, logged]}} table;
+    the days are then summarized.
+
+    sessions:     [(task, start_ts, end_ts)]
+    aw_seconds:   {day: active seconds, or None where ActivityWatch couldn't provide it}
+    worklogs:     [(ticket, started_ts, seconds)], or None if JIRA was unavailable
+    jira_tickets: tasks that are real JIRA tickets (others can't have worklogs)
+    """
+    table = {day: {} for day in days}
+
+    for task, start_ts, end_ts in sessions:
+        for day, seconds in split_by_day(start_ts, end_ts):
+            if day in table:
+                table[day].setdefault(task, [0.0, 0.0])[0] += seconds
+
+    for ticket, started_ts, seconds in worklogs or ():
+        day = datetime.fromtimestamp(started_ts).date().isoformat()
+        if day in table:
+            table[day].setdefault(ticket, [0.0, 0.0])[1] += seconds
+
+    report = []
+    for day in days:
+        tracked_total = logged_total = unlogged_total = 0.0
+        tickets = []
+        for task, (tracked, logged) in sorted(table[day].items()):
+            is_jira = task in jira_tickets
+            tracked_total += tracked
+            logged_total += logged
+            if is_jira and worklogs is not None:
+                unlogged_total += max(0.0, tracked - logged)
+            tickets.append({
+                "ticket": task,
+                "tracked_hours": _hours(tracked),
+                "jira_hours": _hours(logged) if is_jira and worklogs is not None else None,
+                "unlogged_hours": _hours(tracked - logged) if is_jira and worklogs is not None else None
+            })
+
+        active = aw_seconds.get(day)
+        report.append({
+            "date": day,
+            "tracked_hours": _hours(tracked_total),
+            "activitywatch_hours": _hours(active),
+            "jira_hours": _hours(logged_total) if worklogs is not None else None,
+            # Active at the laptop but not inside any tracked session (negative: tracked while AFK)
+            "untracked_active_hours": _hours(active - tracked_total) if active is not None else None,
+            # Tracked on JIRA tickets but not (yet) logged there
+            "unlogged_hours": _hours(unlogged_total) if worklogs is not None else None,
+            "tickets": tickets
+        })
+
+    return report
+
+
+def load_sessions(start_ts, end_ts):
+    """Sessions overlapping [start_ts, end_ts), clipped to it; open sessions run until now."""
+    range_start = datetime.fromtimestamp(start_ts, timezone.utc).replace(tzinfo=None)
+    range_end = datetime.fromtimestamp(end_ts, timezone.utc).replace(tzinfo=None)
+    now_ts = datetime.now(timezone.utc).timestamp()
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Switch.to_task, Switch.timestamp, Switch.end_time)
+            .filter(Switch.to_task.isnot(None))
+            .filter(Switch.to_task != "")
+            .filter(Switch.timestamp < range_end)
+            .filter((Switch.end_time.is_(None)) | (Switch.end_time > range_start))
+            .yield_per(1000)
+        )
+        sessions = []
+        for task, start, end in rows:
+            session_start = max(utc_timestamp(start), start_ts)
+            session_end = min(utc_timestamp(end) if end else now_ts, end_ts)
+            if session_end > session_start:
+                sessions.append((task, session_start, session_end))
+        internal = {k for (k,) in db.query(CustomTask.ticket_id)}
+        return sessions, internal
+    finally:
+        db.close()
+
+
+def _load_worklogs(start_ts, end_ts):
+    """
+    The current user's mirrored worklogs started in [start_ts, end_ts)
+    (None without JIRA), and whether the mirror could be brought up to date.
+    """
+    if not Config.JIRA_URL:
+        return None, False
+    fresh = refresh_worklogs()
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Worklog.issue_key, Worklog.started, Worklog.time_spent_seconds)
+            .filter(Worklog.issue_key.isnot(None))
+            .filter(Worklog.started >= datetime.fromtimestamp(start_ts, timezone.utc).replace(tzinfo=None))
+            .filter(Worklog.started < datetime.fromtimestamp(end_ts, timezone.utc).replace(tzinfo=None))
+        )
+        return [(key, utc_timestamp(started), seconds) for key, started, seconds in rows], fresh
+    finally:
+        db.close()
+
+
+def _compute(days):
+    """
+    Gather all inputs once, then reconcile `days` in a single pass.
+    Returns (report, whether JIRA data was fresh).
+    """
+    first_day = date.fromisoformat(days[0])
+    after_last = date.fromisoformat(days[-1]) + timedelta(days=1)
+    start_ts, end_ts = local_midnight(first_day), local_midnight(after_last)
+
+    sessions, internal = load_sessions(start_ts, end_ts)
+    worklogs, jira_fresh = _load_worklogs(start_ts, end_ts)
+    jira_tickets = {t for t, _, _ in sessions if TICKET_KEY_PATTERN.match(t)} - internal
+    jira_tickets |= {ticket for ticket, _, _ in worklogs or ()}
+    aw_seconds = get_daily_active_seconds(first_day, after_last)
+
+    return _reconcile(days, sessions, aw_seconds, worklogs, jira_tickets), jira_fresh
+
+
+def get_reconciliation(start_date, end_date, refresh=False):
+    """
+    Per-day, per-ticket comparison of tracked time, ActivityWatch active time
+    and JIRA-logged time for local dates start_date..end_date (inclusive).
+
+    Closed days (before today) are served from the reconciliation_days cache
+    when present; only missing days, today and future days are computed.
+    A day is cached only if ActivityWatch was reachable and the worklog
+    mirror was up to date, so an outage doesn't freeze stale numbers into
+    the cache. Cached days are dropped when a session on them is edited or
+    deleted (forget_session_days) and when the worklog mirror changes a
+    worklog started on them, including one a sync just posted
+    (forget_worklog_days). `refresh` ignores and rewrites the cache.
+    """
+    days = day_range(start_date, end_date)
+    if not days:
+        return []
+
+    def compute(missing):
+        report, jira_fresh = _compute(missing)
+        return ((entry, entry["activitywatch_hours"] is not None and jira_fresh) for entry in report)
+
+    return cached_days(ReconciliationDay, days, compute, refresh)
@@ -0,0 +1,192 @@
+# app/responses.py
+
+import csv
+import gzip
+import zlib
+from io import StringIO
+from flask import Response, current_app, request
+from flask.json.provider import DefaultJSONProvider
+from config import Config
+
+try:
+    import orjson
+except ImportError:  # Optional: falls back to the standard library json
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip is offered
+    brotli = None
+
+NDJSON = "application/x-ndjson"
+NDJSON_BATCH_ROWS = 200  # Lines per chunk written to the socket
+CSV_BATCH_ROWS = 500
+
+# Text formats worth compressing; images and the like are already compressed
+COMPRESSIBLE = ("application/json", "application/x-ndjson", "text/csv", "text/html", "text/plain",
+                "text/css", "text/javascript", "application/javascript")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson. Output matches the default
+    provider (sorted keys, dates as HTTP dates, decimals as strings), so
+    clients see the same documents, only produced faster.
+    """
+
+    def _option(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def _pretty(self):
+        return (self.compact is None and self._app.debug) or self.compact is False
+
+    def dumps(self, obj, **kwargs):
+        # Arguments only the json module understands (cls=, ensure_ascii=...) go to it
+        if set(kwargs) - {"indent", "separators"}:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._option(kwargs.get("indent"))).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Encoded straight to bytes, skipping the str round trip of the default provider
+        data = orjson.dumps(obj, default=self.default, option=self._option(self._pretty())) + b"\n"
+        return self._app.response_class(data, mimetype=self.mimetype)
+
+
+def wants_ndjson():
+    """True if the client asked for NDJSON (Accept: application/x-ndjson) over plain JSON."""
+    return request.accept_mimetypes.best_match(["application/json", NDJSON]) == NDJSON
+
+
+def ndjson_response(rows, on_close=None):
+    """
+    Stream `rows`, an iterable of dicts (typically a generator reading with
+    yield_per), as newline-delimited JSON. The first row goes out at once,
+    the rest NDJSON_BATCH_ROWS lines at a time. `on_close` runs when the
+    response is done, whether or not the client read all of it; use it to
+    close the session the rows come from.
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        batch, size = [], 1
+        for row in rows:
+            batch.append(dumps(row))
+            if len(batch) >= size:
+                yield "\n".join(batch) + "\n"
+                batch, size = [], NDJSON_BATCH_ROWS
+        if batch:
+            yield "\n".join(batch) + "\n"
+
+    response = Response(generate(), mimetype=NDJSON)
+    if on_close is not None:
+        response.call_on_close(on_close)
+    return response
+
+
+def csv_response(header, rows, filename, on_close=None):
+    """
+    Stream a CSV download: the header row at once, then `rows` (lists of
+    cell values, typically from a generator reading with yield_per)
+    CSV_BATCH_ROWS at a time. `on_close` works as in ndjson_response.
+    """
+    def generate():
+        output = StringIO()
+        writer = csv.writer(output)
+        writer.writerow(header)
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+            if count % CSV_BATCH_ROWS == 1:  # The first row goes out with the header
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate()
+        yield output.getvalue()
+
+    response = Response(generate(), mimetype="text/csv",
+                        headers={"Content-Disposition": f"attachment; filename={filename}"})
+    if on_close is not None:
+        response.call_on_close(on_close)
+    return response
+
+
+def _encoding():
+    """Best encoding the client accepts: br, then gzip, else None."""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compress_stream(chunks, encoding):
+    """
+    Compress a streamed body chunk by chunk. Each chunk is flushed, so the
+    client can decode every row as soon as it arrives.
+    """
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=Config.COMPRESS_BROTLI_QUALITY)
+        compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(Config.COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+        compress, flush, finish = compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+    for chunk in chunks:
+        data = compress(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+def compress_response(response):
+    """
+    after_request hook: compress text responses with the best encoding
+    the client accepts. Buffered responses are compressed whole if they
+    are at least COMPRESS_MIN_BYTES; streamed ones (NDJSON, CSV exports)
+    chunk by chunk. Server-sent event streams are left alone.
+    """
+    if (response.direct_passthrough or response.status_code < 200
+            or response.status_code in (204, 206, 304) or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = _encoding()
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        response.response = _compress_stream(response.iter_encoded(), encoding)
+        response.headers.pop("Content-Length", None)
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    data = response.get_data()
+    if len(data) < Config.COMPRESS_MIN_BYTES:
+        return response
+
+    if encoding == "br":
+        data = brotli.compress(data, quality=Config.COMPRESS_BROTLI_QUALITY)
+    else:
+        data = gzip.compress(data, compresslevel=Config.COMPRESS_GZIP_LEVEL, mtime=0)
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def configure_responses(app):
+    """Use orjson for JSON when it is installed (and FAST_JSON isn't off) and compress responses."""
+    if orjson is not None and Config.FAST_JSON:
+        app.json = OrjsonProvider(app)
+    if Config.COMPRESS_MIN_BYTES > 0:
+        app.after_request(compress_response)
@@ -2,11 +2,17 @@
     // Analytics page functionality
     let analyticsMonthView = false;
 
+    // Rows are keyed by 'task' or, when grouped by project, by 'project'
+    function itemLabel(d) {
+        return d.project !== undefined ? (d.project || '(no project)') : d.task;
+    }
+
     // Load analytics data and render visualizations
     function loadAnalytics(view = 'week') {
+        const group = window.analyticsGroupByProject ? '&group=project' : '';
         Promise.all([
-            fetch(`/analytics/time-consumers?view=${view}`).then(r => r.json()),
-            fetch(`/analytics/switch-leaders?view=${view}`).then(r => r.json()),
+            fetch(`/analytics/time-consumers?view=${view}${group}`).then(r => r.json()),
+            fetch(`/analytics/switch-leaders?view=${view}${group}`).then(r => r.json()),
             fetch(`/analytics/insights?view=${view}`).then(r => r.json()),
             fetch(`/analytics/tags?view=${view}`).then(r => r.json()),
             fetch(`/analytics/chaos?view=${view}`).then(r => r.json())
@@ -51,7 +57,7 @@
             .range([0, width]);
 
         const y = d3.scaleBand()
-            .domain(data.map(d => d.task))
+            .domain(data.map(d => itemLabel(d)))
             .range([0, height])
             .padding(0.2);
 
@@ -61,7 +67,7 @@
             .enter().append("rect")
             .attr("class", "bar")
             .attr("x", 0)
-            .attr("y", d => y(d.task))
+            .attr("y", d => y(itemLabel(d)))
             .attr("width", d => x(d.total_hours))
             .attr("height", y.bandwidth())
             .attr("fill", "#64748b")
@@ -73,7 +79,7 @@
             .enter().append("text")
             .attr("class", "bar-label")
             .attr("x", d => x(d.total_hours) + 5)
-            .attr("y", d => y(d.task) + y.bandwidth() / 2)
+            .attr("y", d => y(itemLabel(d)) + y.bandwidth() / 2)
             .attr("dy", "0.35em")
             .style("font-size", "11px")
             .style("fill", "#64748b")
@@ -97,7 +103,7 @@
             .attr("class", "analytics-item")
             .html(d => `
                 <div class="analytics-item-header">
-                    <strong>${d.task}</strong>
+                    <strong>${itemLabel(d)}</strong>
                     <span class="analytics-badge">${d.total_hours}h</span>
                 </div>
                 <div class="analytics-item-details">
@@ -136,7 +142,7 @@
             .range([0, width]);
 
         const y = d3.scaleBand()
-            .domain(data.map(d => d.task))
+            .domain(data.map(d => itemLabel(d)))
             .range([0, height])
             .padding(0.2);
 
@@ -146,7 +152,7 @@
             .enter().append("rect")
             .attr("class", "bar")
             .attr("x", 0)
-            .attr("y", d => y(d.task))
+            .attr("y", d => y(itemLabel(d)))
             .attr("width", d => x(d.total_switches))
             .attr("height", y.bandwidth())
             .attr("fill", "#dc2626")
@@ -158,7 +164,7 @@
             .enter().append("text")
             .attr("class", "bar-label")
             .attr("x", d => x(d.total_switches) + 5)
-            .attr("y", d => y(d.task) + y.bandwidth() / 2)
+            .attr("y", d => y(itemLabel(d)) + y.bandwidth() / 2)
             .attr("dy", "0.35em")
             .style("font-size", "11px")
             .style("fill", "#64748b")
@@ -182,7 +188,7 @@
             .attr("class", "analytics-item")
             .html(d => `
                 <div class="analytics-item-header">
-                    <strong>${d.task}</strong>
+                    <strong>${itemLabel(d)}</strong>
                     <span class="analytics-badge analytics-badge-danger">${d.total_switches}</span>
                 </div>
                 <div class="analytics-item-details">
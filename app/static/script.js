@@ -51,6 +51,34 @@ document.addEventListener("DOMContentLoaded", () => {
         setInterval(updateQuarterCountdown, 24 * 60 * 60 * 1000);
     }, msUntilMidnight);
 
+    // Switch-rate anomaly badge: shown when the current hour or day is unusually chaotic
+    function updateAnomalyBadge() {
+        fetch("/analytics/anomalies")
+            .then(r => r.json())
+            .then(data => {
+                const badge = document.getElementById('anomaly-badge');
+                if (!badge) return;
+
+                // Prefer the hourly signal, it reacts fastest
+                const flagged = ['hour', 'day'].find(g => data[g] && data[g].anomalous);
+                if (!flagged) {
+                    badge.style.display = 'none';
+                    return;
+                }
+
+                const status = data[flagged];
+                document.getElementById('anomaly-value').textContent = status.count;
+                document.getElementById('anomaly-label').textContent =
+                    flagged === 'hour' ? 'switches this hour' : 'switches today';
+                badge.title = `Usually ~${status.mean} per ${flagged} (z-score ${status.z_score})`;
+                badge.style.display = 'block';
+            })
+            .catch(err => console.error('Failed to load switch anomalies:', err));
+    }
+
+    updateAnomalyBadge();
+    setInterval(updateAnomalyBadge, 5 * 60 * 1000);
+
     // Theme management
     const themeToggle = document.getElementById('theme-toggle');
     const themeLabel = document.getElementById('theme-label');
@@ -266,9 +294,22 @@ document.addEventListener("DOMContentLoaded", () => {
                 });
                 todayEntriesEl.innerHTML = html;
                 todayTotalEl.textContent = `Total: ${data.total}`;
+                renderBudgets(data.budgets || []);
             });
     }
 
+    // Budget consumption for the running task (ticket and project budgets)
+    function renderBudgets(budgets) {
+        const budgetEl = document.getElementById("budget-status");
+        if (!budgetEl) return;
+        budgetEl.innerHTML = budgets.map(b => {
+            const statusClass = b.status === 'ok' ? '' : ` budget-${b.status}`;
+            return `<div class="budget-entry${statusClass}">
+                Budget ${escapeHtml(b.target)} (${b.period}): ${b.consumed_hours}h / ${b.budget_hours}h (${b.percent}%)
+            </div>`;
+        }).join('');
+    }
+
     function escapeHtml(text) {
         if (!text) return '';
         const div = document.createElement('div');
@@ -330,6 +371,7 @@ document.addEventListener("DOMContentLoaded", () => {
                     selectedTags = [];
                     renderSelectedTags();
                     fetchCurrent();
+                    updateAnomalyBadge();
                     // Auto-hide success message after 5 seconds
                     setTimeout(() => {
                         resultDiv.textContent = "";
@@ -434,6 +476,17 @@ document.addEventListener("DOMContentLoaded", () => {
         });
     }
 
+    // Analytics grouping toggle (per ticket / per project prefix)
+    const analyticsGroupBtn = document.getElementById("analytics-group-btn");
+    if (analyticsGroupBtn) {
+        analyticsGroupBtn.addEventListener("click", () => {
+            window.analyticsGroupByProject = !window.analyticsGroupByProject;
+            const view = window.analyticsMonthView ? "month" : "week";
+            analyticsGroupBtn.textContent = window.analyticsGroupByProject ? "By Ticket" : "By Project";
+            loadAnalytics(view);
+        });
+    }
+
     // METRICS: fetch & render
     function loadMetrics() {
         const view = monthView ? "month" : "week";
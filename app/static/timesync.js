@@ -299,6 +299,11 @@ function displayTicket(ticket) {
     // Update header
     summaryDiv.innerHTML = `
         <span>Ticket: <strong>${ticket.ticket}</strong></span>
+        <select id="sync-aggregate" title="How entries become JIRA worklogs">
+            <option value="none">One worklog per entry</option>
+            <option value="day">One worklog per day</option>
+            <option value="block">One worklog per time block</option>
+        </select>
         <button id="sync-ticket" class="btn-success" onclick="syncTicket()" 
                 ${ticket.total_seconds === 0 ? 'disabled' : ''}>
             ${ticket.total_seconds > 0 ? 'Sync to JIRA' : 'No Time to Sync'}
@@ -419,8 +424,27 @@ async function syncTicket() {
         return;
     }
 
-    // Show confirmation with count of entries to sync
-    const confirmMsg = `This will sync ${unmatchedIntervals.length} unmatched time entries to JIRA. Continue?`;
+    const aggregate = document.getElementById('sync-aggregate').value;
+    
+    // Show confirmation with count of entries to sync (and the merged plan when aggregating)
+    let confirmMsg = `This will sync ${unmatchedIntervals.length} unmatched time entries to JIRA. Continue?`;
+    if (aggregate !== 'none') {
+        try {
+            const previewResponse = await fetch('/timesync/preview', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ intervals: unmatchedIntervals, aggregate: aggregate })
+            });
+            const preview = await previewResponse.json();
+            const lines = preview.plan.map(item =>
+                `${formatDateTime(item.start)}  ${item.duration_formatted}  (${item.interval_count} entries)${item.note ? '  ' + item.note : ''}`
+            );
+            confirmMsg = `This will merge ${preview.summary.intervals} entries into ${preview.summary.worklogs} JIRA worklogs:\n\n` +
+                lines.join('\n') + '\n\nContinue?';
+        } catch (error) {
+            console.error('Error previewing sync:', error);
+        }
+    }
     if (!confirm(confirmMsg)) {
         return;
     }
@@ -439,43 +463,27 @@ async function syncTicket() {
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ intervals: unmatchedIntervals })
+            body: JSON.stringify({ intervals: unmatchedIntervals, aggregate: aggregate })
         });
         
-        const result = await response.json();
+        const queued = await response.json();
         
-        if (response.ok) {
-            const successCount = result.summary.success;
-            const failCount = result.summary.failed;
-            
-            if (successCount > 0) {
-                // Calculate the total seconds that were actually synced
-                const syncedSeconds = unmatchedIntervals.reduce((sum, interval) => sum + interval.duration_seconds, 0);
-                statusDiv.textContent = `✓ Successfully synced ${formatHours(syncedSeconds)} to JIRA (${successCount} entries)`;
-                statusDiv.className = 'sync-status success';
-                button.textContent = 'Synced!';
-                button.disabled = true;
-                
-                // Refresh the data to show updated state
-                setTimeout(() => loadTicket(), 2000);
-            } else {
-                statusDiv.textContent = `✗ Sync failed - ${failCount} entries failed`;
-                statusDiv.className = 'sync-status failed';
-                button.textContent = 'Sync to JIRA';
-                button.disabled = false;
-            }
-            
-            // Show detailed results if there were issues
-            if (failCount > 0) {
-                displaySyncResults(result);
-            }
-        } else {
-            statusDiv.textContent = `✗ Error: ${result.error || 'Unknown error'}`;
+        if (!response.ok) {
+            statusDiv.textContent = `✗ Error: ${queued.error || 'Unknown error'}`;
             statusDiv.className = 'sync-status failed';
             button.textContent = 'Sync to JIRA';
             button.disabled = false;
+            return;
         }
         
+        // The sync runs as a background job; follow its progress
+        const job = await followJob(queued.job_id, progress => {
+            const done = progress.total ? ` ${progress.progress}/${progress.total}` : '';
+            statusDiv.innerHTML = `Syncing to JIRA...${done} ` +
+                `<button class="btn-cancel" onclick="cancelJob(${queued.job_id})">Cancel</button>`;
+        });
+        handleSyncResult(job, unmatchedIntervals, statusDiv, button);
+        
     } catch (error) {
         console.error('Error syncing ticket:', error);
         statusDiv.textContent = '✗ Network error during sync';
@@ -485,6 +493,88 @@ async function syncTicket() {
     }
 }
 
+// Stream a background job's progress until it finishes; resolves with the finished job
+function followJob(jobId, onProgress) {
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`/jobs/${jobId}/events`);
+        source.onmessage = event => {
+            const job = JSON.parse(event.data);
+            if (['done', 'failed', 'cancelled'].includes(job.status)) {
+                source.close();
+                resolve(job);
+            } else {
+                onProgress(job);
+            }
+        };
+        source.onerror = () => {
+            source.close();
+            // Connection dropped: fall back to one status read
+            fetch(`/jobs/${jobId}`)
+                .then(response => response.json())
+                .then(job => ['done', 'failed', 'cancelled'].includes(job.status)
+                    ? resolve(job) : setTimeout(() => followJob(jobId, onProgress).then(resolve, reject), 2000))
+                .catch(reject);
+        };
+    });
+}
+
+async function cancelJob(jobId) {
+    try {
+        await fetch(`/jobs/${jobId}/cancel`, { method: 'POST' });
+    } catch (error) {
+        console.error('Error cancelling job:', error);
+    }
+}
+
+function handleSyncResult(job, unmatchedIntervals, statusDiv, button) {
+    if (job.status === 'failed' || !job.result) {
+        statusDiv.textContent = `✗ Error: ${job.error || 'Sync did not finish'}`;
+        statusDiv.className = 'sync-status failed';
+        button.textContent = 'Sync to JIRA';
+        button.disabled = false;
+        return;
+    }
+    
+    const result = job.result;
+    const successCount = result.summary.success;
+    const failCount = result.summary.failed;
+    
+    if (job.status === 'cancelled') {
+        statusDiv.textContent = `Sync cancelled - ${successCount} synced, ${result.summary.cancelled} not sent`;
+        statusDiv.className = 'sync-status failed';
+        button.textContent = 'Sync to JIRA';
+        button.disabled = false;
+        if (successCount > 0) {
+            setTimeout(() => loadTicket(), 2000);
+        }
+    } else if (successCount > 0) {
+        // Calculate the total seconds that were actually synced
+        const syncedSeconds = unmatchedIntervals.reduce((sum, interval) => sum + interval.duration_seconds, 0);
+        statusDiv.textContent = `✓ Successfully synced ${formatHours(syncedSeconds)} to JIRA (${successCount} entries)`;
+        statusDiv.className = 'sync-status success';
+        button.textContent = 'Synced!';
+        button.disabled = true;
+        
+        // Refresh the data to show updated state
+        setTimeout(() => loadTicket(), 2000);
+    } else if (failCount === 0 && result.summary.skipped > 0) {
+        statusDiv.textContent = `✓ Already synced (${result.summary.skipped} entries)`;
+        statusDiv.className = 'sync-status success';
+        button.textContent = 'Synced!';
+        button.disabled = true;
+    } else {
+        statusDiv.textContent = `✗ Sync failed - ${failCount} entries failed`;
+        statusDiv.className = 'sync-status failed';
+        button.textContent = 'Sync to JIRA';
+        button.disabled = false;
+    }
+    
+    // Show detailed results if there were issues
+    if (failCount > 0) {
+        displaySyncResults(result);
+    }
+}
+
 function displaySyncResults(result) {
     const container = document.getElementById('results-content');
     const resultsDiv = document.getElementById('sync-results');
@@ -494,13 +584,14 @@ function displaySyncResults(result) {
             <h4>Sync Results</h4>
             <p>Total: ${result.summary.total} | 
                Success: <span class="success-count">${result.summary.success}</span> | 
+               Skipped: ${result.summary.skipped || 0} | 
                Failed: <span class="failure-count">${result.summary.failed}</span></p>
         </div>
         <div class="sync-details">
     `;
     
     result.results.forEach(item => {
-        const statusClass = item.success ? 'sync-success' : 'sync-failure';
+        const statusClass = item.success || item.skipped ? 'sync-success' : 'sync-failure';
         const icon = item.success ? '✓' : '✗';
         
         html += `
@@ -0,0 +1,179 @@
+# app/suggestions.py
+
+import json
+import re
+from datetime import date
+from app.models import SuggestionRule, TICKET_KEY
+from app.activitywatch import ActivityWatchClient
+from app.attribution import non_overlapping, sweep, untracked_active_periods
+from app.reconciliation import day_range, split_by_day
+
+FIELDS = ("title", "app", "any")
+
+# Ticket keys anywhere in a title, e.g. "feature/OPS-123-retry - Visual Studio Code"
+TITLE_TICKET_KEY = rf"(?<![A-Za-z0-9]){TICKET_KEY}(?![0-9])"
+
+# Backreferences would point at the wrong group once rules are combined
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+def validate_pattern(pattern, is_regex):
+    """Raise ValueError if `pattern` can't be used in a rule."""
+    if not pattern:
+        raise ValueError("Missing 'pattern'")
+    if is_regex:
+        if _BACKREFERENCE.search(pattern):
+            raise ValueError("Backreferences are not supported in rule patterns")
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"Invalid regex: {e}")
+
+
+def rule_dict(rule):
+    return {
+        "id": rule.id,
+        "pattern": rule.pattern,
+        "is_regex": rule.is_regex,
+        "field": rule.field,
+        "ticket": rule.ticket,
+        "tags": json.loads(rule.tags) if rule.tags else [],
+        "priority": rule.priority
+    }
+
+
+class RuleMatcher:
+    """
+    Rule patterns compiled per field (title rules, app rules) into two
+    case-insensitive regexes: an alternation of lookaheads that finds every
+    position where some rule matches in one scan, and a chain of optional
+    lookaheads, one named group per rule, run at those positions to see
+    every rule matching there. Matches may overlap, so no rule is hidden by
+    another that matched earlier. Ticket keys are found in a separate scan
+    of the title. Each distinct window is classified once.
+    """
+
+    def __init__(self, rules):
+        self._rules = {}
+        title_bodies, app_bodies = {}, {}
+        for rule in sorted(rules, key=lambda r: (r["priority"], r["id"])):
+            name = f"r{rule['id']}"
+            body = rule["pattern"] if rule["is_regex"] else re.escape(rule["pattern"])
+            self._rules[name] = rule
+            if rule["field"] in ("title", "any"):
+                title_bodies[name] = body
+            if rule["field"] in ("app", "any"):
+                app_bodies[name] = body
+
+        self._title = self._compile(title_bodies)
+        self._app = self._compile(app_bodies)
+        self._keys = re.compile(TITLE_TICKET_KEY)
+        self._memo = {}
+
+    @staticmethod
+    def _compile(bodies):
+        if not bodies:
+            return None
+        starts = re.compile("(?=" + "|".join(f"(?:{body})" for body in bodies.values()) + ")", re.IGNORECASE)
+        groups = re.compile("".join(f"(?=(?P<{name}>{body}))?" for name, body in bodies.items()), re.IGNORECASE)
+        return starts, groups
+
+    def _scan(self, compiled, text):
+        """Every rule matching `text`, once per position it matches at."""
+        if compiled is None:
+            return []
+        starts, groups = compiled
+        matched = []
+        for start in starts.finditer(text):
+            hits = groups.match(text, start.start()).groupdict()
+            matched.extend(self._rules[name] for name, value in hits.items()
+                           if value is not None and name in self._rules)
+        return matched
+
+    def classify(self, app, title):
+        """(ticket, tags, rule ids) suggested for a window; memoized per distinct window."""
+        cached = self._memo.get((app, title))
+        if cached is not None:
+            return cached
+
+        matched = self._scan(self._title, title) + self._scan(self._app, app)
+        keys = self._keys.findall(title)
+        matched.sort(key=lambda r: (r["priority"], r["id"]))
+
+        # The best rule that names a ticket wins; otherwise a key from the title
+        ticket = next((r["ticket"] for r in matched if r["ticket"]), None) or (keys[0] if keys else None)
+        tags = []
+        for rule in matched:
+            tags.extend(t for t in rule["tags"] if t not in tags)
+
+        result = (ticket, tuple(tags), tuple(dict.fromkeys(r["id"] for r in matched)))
+        self._memo[(app, title)] = result
+        return result
+
+
+def _hours(seconds):
+    return round(seconds / 3600, 2)
+
+
+def get_suggestions(db, start_date, end_date):
+    """
+    Suggested tickets and tags for untracked active time (ActivityWatch
+    not-AFK time outside every session) on local dates start_date..end_date.
+    Window events are cut to the untracked periods with one sweep and each
+    distinct window is classified once. Returns one entry per day, or None
+    if ActivityWatch is unavailable.
+    """
+    days = day_range(start_date, end_date)
+    if not days:
+        return []
+
+    untracked = untracked_active_periods(days)
+    events = ActivityWatchClient().query_window_events(date.fromisoformat(d) for d in days)
+    if untracked is None or events is None:
+        return None
+
+    # Window events as spans labelled by index, cut to the untracked periods in one sweep
+    flat = [event for d in days for event in events.get(d, [])]
+    windows = non_overlapping((i, start, end) for i, (start, end, _, _) in enumerate(flat))
+    covered, _ = sweep(windows, untracked)
+
+    matcher = RuleMatcher([rule_dict(r) for r in db.query(SuggestionRule)])
+    table = {d: {} for d in days}  # day -> (ticket, tags) -> [seconds, rule ids, {title: seconds}]
+    untracked_seconds = {d: 0.0 for d in days}
+    for (index, _, _), pieces in zip(windows, covered):
+        if not pieces:
+            continue
+        _, _, app, title = flat[index]
+        ticket, tags, rule_ids = matcher.classify(app, title)
+        for piece_start, piece_end in pieces:
+            for day, seconds in split_by_day(piece_start, piece_end):
+                if day not in table:
+                    continue
+                untracked_seconds[day] += seconds
+                entry = table[day].setdefault((ticket, tags), [0.0, set(), {}])
+                entry[0] += seconds
+                entry[1].update(rule_ids)
+                entry[2][title] = entry[2].get(title, 0.0) + seconds
+
+    report = []
+    for day in days:
+        suggestions, unclassified = [], 0.0
+        for (ticket, tags), (seconds, rule_ids, titles) in table[day].items():
+            if ticket is None and not tags:
+                unclassified += seconds
+                continue
+            suggestions.append({
+                "ticket": ticket,
+                "tags": list(tags),
+                "hours": _hours(seconds),
+                "rules": sorted(rule_ids),
+                "titles": [t for t, _ in sorted(titles.items(), key=lambda x: x[1], reverse=True)[:3]]
+            })
+        suggestions.sort(key=lambda s: s["hours"], reverse=True)
+        report.append({
+            "date": day,
+            "untracked_active_hours": _hours(untracked_seconds[day]),
+            "suggestions": suggestions,
+            "unclassified_hours": _hours(unclassified)
+        })
+    return report
@@ -0,0 +1,176 @@
+# app/switch_stats.py
+
+import math
+from datetime import datetime
+from sqlalchemy import func
+from config import Config
+from app.models import Switch, SwitchRateStat, SwitchRateAnomaly, lock_for_write
+
+# Bucket key formats (local time), valid for both Python and SQLite strftime.
+# Keys sort chronologically as strings.
+BUCKET_FORMATS = {
+    "hour": "%Y-%m-%dT%H",
+    "day": "%Y-%m-%d",
+}
+
+
+def _stddev(stat):
+    """Sample standard deviation of the closed buckets folded into `stat`."""
+    if stat.samples < 2:
+        return 0.0
+    return math.sqrt(stat.m2 / (stat.samples - 1))
+
+
+def _fold(stat, count):
+    """Fold a closed bucket's count into the Welford and EWMA running stats."""
+    stat.samples += 1
+    delta = count - stat.mean
+    stat.mean += delta / stat.samples
+    stat.m2 += delta * (count - stat.mean)
+
+    alpha = Config.ANOMALY_EWMA_ALPHA
+    if stat.ewma is None:
+        stat.ewma = float(count)
+    else:
+        stat.ewma = alpha * count + (1 - alpha) * stat.ewma
+
+
+def _z_score(stat, count):
+    """Z-score of `count` against the closed buckets, or None if there is too little history."""
+    stddev = _stddev(stat)
+    if stat.samples < Config.ANOMALY_MIN_SAMPLES or stddev == 0:
+        return None
+    return (count - stat.mean) / stddev
+
+
+def _backfill(db, granularity, bucket):
+    """
+    Seed the running stats for `granularity` from existing switch history.
+    Runs once per database; afterwards every update is O(1).
+    """
+    key = func.strftime(BUCKET_FORMATS[granularity], Switch.timestamp, "localtime")
+    rows = (
+        db.query(key.label("bucket"), func.count(Switch.id).label("count"))
+        .filter(Switch.is_switch.is_(True))
+        .group_by("bucket")
+        .order_by("bucket")
+        .all()
+    )
+
+    stat = SwitchRateStat(granularity=granularity, bucket=None, bucket_count=0,
+                          samples=0, mean=0.0, m2=0.0, ewma=None)
+    for row in rows:
+        if row.bucket is None:
+            continue
+        if row.bucket < bucket:
+            _fold(stat, row.count)
+        elif row.bucket == bucket:
+            stat.bucket = bucket
+            stat.bucket_count = row.count
+
+    db.add(stat)
+    return stat
+
+
+def _flag_if_anomalous(db, stat):
+    """Record the open bucket as anomalous if its count is already far above normal."""
+    z_score = _z_score(stat, stat.bucket_count)
+    if z_score is None or z_score < Config.ANOMALY_Z_THRESHOLD:
+        return
+
+    anomaly = db.query(SwitchRateAnomaly).filter(
+        SwitchRateAnomaly.granularity == stat.granularity,
+        SwitchRateAnomaly.bucket == stat.bucket
+    ).first()
+    if not anomaly:
+        anomaly = SwitchRateAnomaly(granularity=stat.granularity, bucket=stat.bucket)
+        db.add(anomaly)
+
+    anomaly.count = stat.bucket_count
+    anomaly.mean = stat.mean
+    anomaly.stddev = _stddev(stat)
+    anomaly.z_score = z_score
+    anomaly.ewma = stat.ewma
+    anomaly.detected_at = datetime.now()
+
+
+def record_switch(db, when=None):
+    """
+    Update the hourly and daily switch-rate statistics for one new context switch.
+    Must be called in the same session as the Switch insert; the caller commits.
+
+    Only buckets with at least one switch are sampled, so quiet nights and
+    weekends don't drag the baseline towards zero. The baseline counts
+    switches as they are recorded: editing or deleting a switch later
+    doesn't change it.
+    """
+    when = when or datetime.now()
+    lock_for_write(db)
+
+    for granularity, fmt in BUCKET_FORMATS.items():
+        bucket = when.strftime(fmt)
+        stat = db.get(SwitchRateStat, granularity)
+        if stat is None:
+            stat = _backfill(db, granularity, bucket)
+
+        if stat.bucket == bucket:
+            stat.bucket_count += 1
+        else:
+            # A new bucket has started: close the previous one
+            if stat.bucket is not None and stat.bucket < bucket:
+                _fold(stat, stat.bucket_count)
+            stat.bucket = bucket
+            stat.bucket_count = 1
+
+        stat.updated_at = datetime.now()
+        _flag_if_anomalous(db, stat)
+
+
+def _bucket_status(stat, now):
+    """Describe the current (live) bucket for one granularity."""
+    bucket = now.strftime(BUCKET_FORMATS[stat.granularity])
+    count = stat.bucket_count if stat.bucket == bucket else 0
+    z_score = _z_score(stat, count)
+
+    return {
+        "bucket": bucket,
+        "count": count,
+        "mean": round(stat.mean, 2),
+        "stddev": round(_stddev(stat), 2),
+        "ewma": round(stat.ewma, 2) if stat.ewma is not None else None,
+        "z_score": round(z_score, 2) if z_score is not None else None,
+        "samples": stat.samples,
+        "anomalous": z_score is not None and z_score >= Config.ANOMALY_Z_THRESHOLD
+    }
+
+
+def get_anomaly_status(db, limit=20):
+    """
+    Return the live hour/day switch-rate status plus recently flagged buckets.
+    Reads only the running-stat rows and the anomaly log, never switch history.
+    """
+    now = datetime.now()
+    stats = {s.granularity: s for s in db.query(SwitchRateStat).all()}
+
+    result = {"threshold": Config.ANOMALY_Z_THRESHOLD}
+    for granularity in BUCKET_FORMATS:
+        stat = stats.get(granularity)
+        result[granularity] = _bucket_status(stat, now) if stat else None
+
+    recent = (
+        db.query(SwitchRateAnomaly)
+        .order_by(SwitchRateAnomaly.bucket.desc())
+        .limit(limit)
+        .all()
+    )
+    result["recent"] = [{
+        "granularity": a.granularity,
+        "bucket": a.bucket,
+        "count": a.count,
+        "mean": round(a.mean, 2),
+        "stddev": round(a.stddev, 2),
+        "z_score": round(a.z_score, 2),
+        "ewma": round(a.ewma, 2) if a.ewma is not None else None
+    } for a in recent]
+
+    return result
@@ -0,0 +1,117 @@
+# app/ticket_cache.py
+
+import math
+import threading
+from datetime import datetime, timedelta, timezone
+from config import Config
+from app.models import SessionLocal, JiraIssue, SyncState
+from app.jira_client import search_issues_raw, CircuitOpenError
+from app.issue_metadata import issue_fields, resolve_issue_metadata
+
+ASSIGNED_JQL = 'assignee = currentUser() AND resolution = Unresolved'
+# Issues that were ever ours: catches reassignments and resolutions since the last sync
+TOUCHED_JQL = 'assignee was currentUser()'
+SYNC_NAME = "assigned_tickets"
+
+_sync_lock = threading.Lock()
+
+
+def sync_assigned_tickets(full=False):
+    """
+    Bring the assigned flags in jira_issues up to date. Normally only issues
+    updated since the last sync are fetched (relative `updated >= -Nm` JQL,
+    which sidesteps the JIRA profile's timezone); a full sync runs the first
+    time, when forced, and every JIRA_TICKET_FULL_SYNC_HOURS to drop issues
+    that were deleted or moved out of view. Returns the number of issues fetched.
+    """
+    with _sync_lock:
+        started = datetime.now(timezone.utc).replace(tzinfo=None)
+
+        db = SessionLocal()
+        try:
+            state = db.get(SyncState, SYNC_NAME) or SyncState(name=SYNC_NAME)
+            incremental = (
+                not full and state.synced_at and state.full_synced_at and
+                started - state.full_synced_at < timedelta(hours=Config.JIRA_TICKET_FULL_SYNC_HOURS)
+            )
+        finally:
+            db.close()
+
+        window = ""
+        if incremental:
+            # One minute of overlap so edits racing the previous sync aren't missed
+            minutes = math.ceil((started - state.synced_at).total_seconds() / 60) + 1
+            window = f" AND updated >= -{minutes}m"
+
+        assigned = {i['key']: i for i in search_issues_raw(ASSIGNED_JQL + window, issue_fields())}
+        touched = {i['key'] for i in search_issues_raw(TOUCHED_JQL + window, 'key')} if incremental else set()
+        resolve_issue_metadata(list(assigned), assigned)
+
+        db = SessionLocal()
+        try:
+            unassign = db.query(JiraIssue).filter(JiraIssue.assigned.is_(True))
+            if incremental:
+                unassign = unassign.filter(JiraIssue.key.in_(touched - set(assigned)))
+            else:
+                unassign = unassign.filter(JiraIssue.key.notin_(set(assigned)))
+            unassign.update({JiraIssue.assigned: False}, synchronize_session=False)
+
+            if assigned:
+                (db.query(JiraIssue)
+                 .filter(JiraIssue.key.in_(set(assigned)))
+                 .update({JiraIssue.assigned: True}, synchronize_session=False))
+
+            state = db.get(SyncState, SYNC_NAME) or SyncState(name=SYNC_NAME)
+            state.synced_at = started
+            if not incremental:
+                state.full_synced_at = started
+            db.add(state)
+            db.commit()
+        finally:
+            db.close()
+
+        return len(assigned)
+
+
+def _revalidate():
+    try:
+        sync_assigned_tickets()
+    except CircuitOpenError:
+        pass  # JIRA is known to be down; keep serving the cache quietly
+    except Exception as e:
+        print(f"Warning: Could not refresh JIRA ticket cache: {e}")
+
+
+def get_assigned_tickets(refresh=False):
+    """
+    Unresolved issues assigned to the current user, as (issue_key, summary)
+    tuples sorted by ticket number (highest first), read from the local cache.
+
+    Stale-while-revalidate: once the cache is older than
+    JIRA_TICKET_CACHE_SECONDS the cached list is still returned immediately
+    and a background sync refreshes it. Only the very first call (or
+    `refresh`) waits for JIRA, and raises if JIRA can't be reached.
+    """
+    db = SessionLocal()
+    try:
+        state = db.get(SyncState, SYNC_NAME)
+        synced_at = state.synced_at if state else None
+    finally:
+        db.close()
+
+    if refresh or synced_at is None:
+        sync_assigned_tickets()
+    elif datetime.now(timezone.utc).replace(tzinfo=None) - synced_at > timedelta(seconds=Config.JIRA_TICKET_CACHE_SECONDS):
+        if not _sync_lock.locked():
+            threading.Thread(target=_revalidate, name="jira-tickets", daemon=True).start()
+
+    db = SessionLocal()
+    try:
+        results = db.query(JiraIssue.key, JiraIssue.summary).filter(JiraIssue.assigned.is_(True)).all()
+    finally:
+        db.close()
+
+    results = [(key, summary) for key, summary in results]
+    # Sort by numeric part of the ticket key, descending (highest number first)
+    results.sort(key=lambda x: int(x[0].split('-', 1)[1]), reverse=True)
+    return results
@@ -2,104 +2,163 @@
 
 import subprocess
 import json
-from datetime import datetime, timedelta
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from config import Config
-from app.jira_client import get_jira_client
+from app.jira_client import get_jira_client, call_with_retries, WriteAppliedError
+from app.issue_metadata import fetch_issues
+from app.models import SessionLocal, Switch, SyncJournal, JiraIssue
+from app.worklogs import (refresh_worklogs, record_worklog, query_worklogs, worklog_dict,
+                          worklog_seconds, has_duplicate_worklog, ensure_issue_history,
+                          fetch_issue_history)
 import re
 
 TIMEW_BIN = Config.TIMEWARRIOR_BIN
 
 
-def get_timewarrior_intervals(start_date, end_date):
+def get_ticket_summaries(ticket_ids):
     """
-    Get time intervals from the database between start_date and end_date.
-    Returns list of intervals with JIRA ticket tags.
+    Summaries for many tickets from one batched `key in (...)` search that
+    requests only the summary field. Tickets JIRA doesn't return (unknown
+    keys, or JIRA unavailable) fall back to the local jira_issues cache.
     """
+    ticket_ids = set(ticket_ids)
+    summaries, error = {}, None
     try:
-        from app.models import SessionLocal, Switch
-        from datetime import timezone
+        for key, issue in fetch_issues(ticket_ids, fields='summary').items():
+            summaries[key] = issue['fields'].get('summary')
+    except Exception as e:
+        error = e
 
-        # JIRA ticket pattern
-        jira_pattern = re.compile(r'^[A-Z]+-\d+$')
+    missing = ticket_ids - set(summaries)
+    if missing:
+        db = SessionLocal()
+        try:
+            cached = dict(db.query(JiraIssue.key, JiraIssue.summary).filter(JiraIssue.key.in_(missing)))
+        finally:
+            db.close()
+        for ticket_id in missing:
+            summaries[ticket_id] = cached.get(ticket_id) or f"Error loading: {error or 'not found in JIRA'}"
 
-        # Get local timezone
-        local_tz = datetime.now().astimezone().tzinfo
+    return summaries
 
-        db = SessionLocal()
 
-        # Parse date range
-        if isinstance(start_date, str):
-            start = datetime.strptime(start_date, '%Y-%m-%d')
-        else:
-            start = start_date
+def _to_utc(value, end_of_day=False):
+    """
+    Naive UTC datetime for a 'YYYY-MM-DD' local date (its start, or its last
+    second with `end_of_day`) or an ISO datetime (naive means local time).
+    """
+    if 'T' in value:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    else:
+        parsed = datetime.strptime(value, '%Y-%m-%d')
+        if end_of_day:
+            parsed += timedelta(days=1, seconds=-1)
+    if parsed.tzinfo is None:
+        parsed = parsed.astimezone()  # interpret as local time
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None)
 
-        if isinstance(end_date, str):
-            end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
-        else:
-            end = end_date + timedelta(days=1)
 
-        # Query switches with JIRA ticket format in to_task
-        switches = db.query(Switch).filter(
-            Switch.timestamp >= start,
-            Switch.timestamp < end,
-            Switch.to_task.isnot(None)
-        ).order_by(Switch.timestamp.desc()).all()
+JIRA_TICKET = re.compile(r'^[A-Z]+-\d+$')
 
-        db.close()
 
-        jira_intervals = []
-
-        for switch in switches:
-            # Check if to_task matches JIRA ticket format
-            if not switch.to_task or not jira_pattern.match(switch.to_task):
-                continue
-
-            # Database stores UTC times as naive datetimes
-            # Convert to local time for display (matching old behavior)
-            start_utc = switch.timestamp.replace(tzinfo=timezone.utc)
-            start_local = start_utc.astimezone(local_tz).replace(tzinfo=None)
-
-            if switch.end_time:
-                end_utc = switch.end_time.replace(tzinfo=timezone.utc)
-                end_local = end_utc.astimezone(local_tz).replace(tzinfo=None)
-                duration_seconds = int((switch.end_time - switch.timestamp).total_seconds())
-            else:
-                # Ongoing task - calculate duration until now
-                now_utc = datetime.now(timezone.utc).replace(tzinfo=None)
-                end_local = datetime.now().astimezone().replace(tzinfo=None)
-                duration_seconds = int((now_utc - switch.timestamp).total_seconds())
-
-            # Skip entries less than 60 seconds
-            if duration_seconds < 60:
-                continue
-
-            # Parse tags if present
+def _interval_from_switch(switch, local_tz):
+    """The sync interval for a session on a JIRA ticket, or None if it isn't one (or lasted under a minute)."""
+    # Check if to_task matches JIRA ticket format
+    if not switch.to_task or not JIRA_TICKET.match(switch.to_task):
+        return None
+
+    # Database stores UTC times as naive datetimes
+    # Convert to local time for display (matching old behavior)
+    start_utc = switch.timestamp.replace(tzinfo=timezone.utc)
+    start_local = start_utc.astimezone(local_tz).replace(tzinfo=None)
+
+    if switch.end_time:
+        end_utc = switch.end_time.replace(tzinfo=timezone.utc)
+        end_local = end_utc.astimezone(local_tz).replace(tzinfo=None)
+        duration_seconds = int((switch.end_time - switch.timestamp).total_seconds())
+    else:
+        # Ongoing task - calculate duration until now
+        now_utc = datetime.now(timezone.utc).replace(tzinfo=None)
+        end_local = datetime.now().astimezone().replace(tzinfo=None)
+        duration_seconds = int((now_utc - switch.timestamp).total_seconds())
+
+    # Skip entries less than 60 seconds
+    if duration_seconds < 60:
+        return None
+
+    # Parse tags if present
+    tags = []
+    if switch.tags:
+        try:
+            tags = json.loads(switch.tags)
+        except json.JSONDecodeError:
             tags = []
-            if switch.tags:
-                try:
-                    tags = json.loads(switch.tags)
-                except json.JSONDecodeError:
-                    tags = []
-
-            # Add the ticket itself to tags if not already present
-            if switch.to_task not in tags:
-                tags = [switch.to_task] + tags
-
-            interval_data = {
-                'id': switch.id,
-                'start': start_local.isoformat(),
-                'end': end_local.isoformat(),
-                'ticket': switch.to_task,
-                'tags': tags,
-                'duration_seconds': duration_seconds,
-                'duration_formatted': format_duration(duration_seconds),
-                'note': switch.note
-            }
 
-            jira_intervals.append(interval_data)
+    # Add the ticket itself to tags if not already present
+    if switch.to_task not in tags:
+        tags = [switch.to_task] + tags
 
-        return jira_intervals
+    return {
+        'id': switch.id,
+        'start': start_local.isoformat(),
+        'end': end_local.isoformat(),
+        'ticket': switch.to_task,
+        'tags': tags,
+        'duration_seconds': duration_seconds,
+        'duration_formatted': format_duration(duration_seconds),
+        'note': switch.note
+    }
+
+
+def iter_timewarrior_intervals(start_date, end_date, batch_size=1000):
+    """
+    Generator version of get_timewarrior_intervals: sessions are read
+    `batch_size` at a time (yield_per) and yielded as intervals, newest
+    first, so memory doesn't grow with the range. The dates are parsed
+    up front; a bad date raises ValueError here rather than mid-stream.
+    """
+    # Parse date range
+    if isinstance(start_date, str):
+        start = datetime.strptime(start_date, '%Y-%m-%d')
+    else:
+        start = start_date
+
+    if isinstance(end_date, str):
+        end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+    else:
+        end = end_date + timedelta(days=1)
 
+    def generate():
+        # Get local timezone
+        local_tz = datetime.now().astimezone().tzinfo
+        db = SessionLocal()
+        try:
+            # Query switches with JIRA ticket format in to_task
+            switches = db.query(Switch).filter(
+                Switch.timestamp >= start,
+                Switch.timestamp < end,
+                Switch.to_task.isnot(None)
+            ).order_by(Switch.timestamp.desc()).yield_per(batch_size)
+
+            for switch in switches:
+                interval = _interval_from_switch(switch, local_tz)
+                if interval:
+                    yield interval
+        finally:
+            db.close()
+
+    return generate()
+
+
+def get_timewarrior_intervals(start_date, end_date):
+    """
+    Get time intervals from the database between start_date and end_date.
+    Returns list of intervals with JIRA ticket tags.
+    """
+    try:
+        return list(iter_timewarrior_intervals(start_date, end_date))
     except Exception as e:
         print(f"Error getting intervals from database: {e}")
         return []
@@ -148,62 +207,21 @@ def get_single_ticket_data(ticket_id, start_date=None, end_date=None):
         }
     
     # Get JIRA info
-    jira = get_jira_client()
+    ticket_data['summary'] = get_ticket_summaries([ticket_id])[ticket_id]
+
+    # Existing worklogs for this period come from the local mirror
+    refresh_worklogs()
+    db = SessionLocal()
     try:
-        issue = jira.issue(ticket_id, expand='changelog', fields='summary')
-        ticket_data['summary'] = issue.fields.summary
-        
-        # Get existing worklogs for this period - simplified approach
-        existing_seconds = 0
-        try:
-            # Get all worklogs and filter by current user
-            worklogs = jira.worklogs(ticket_id)
-            
-            for worklog in worklogs:
-                try:
-                    # Convert author to string for matching
-                    author_str = str(worklog.author)
-                    
-                    # Check if current user is mentioned in the author string
-                    # Try JIRA_DISPLAY_NAME first, fallback to JIRA_USER
-                    user_identifier = Config.JIRA_DISPLAY_NAME or Config.JIRA_USER
-                    if user_identifier and user_identifier.lower() in author_str.lower():
-                        # Handle timezone properly for worklog date
-                        worklog_start_str = worklog.started
-                        if worklog_start_str.endswith('Z'):
-                            worklog_date = datetime.fromisoformat(worklog_start_str.replace('Z', '+00:00'))
-                        elif '+' in worklog_start_str or '-' in worklog_start_str.split('T')[-1]:
-                            # Already has timezone info
-                            worklog_date = datetime.fromisoformat(worklog_start_str)
-                        else:
-                            worklog_date = datetime.fromisoformat(worklog_start_str + '+00:00')
-                        
-                        start_dt = datetime.fromisoformat(start_date) if 'T' in start_date else datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=worklog_date.tzinfo)
-                        end_dt = datetime.fromisoformat(end_date + 'T23:59:59+00:00') if 'T' not in end_date else datetime.fromisoformat(end_date)
-                        
-                        if start_dt <= worklog_date <= end_dt:
-                            existing_seconds += worklog.timeSpentSeconds
-                except Exception as worklog_item_error:
-                    continue
-                    
-        except Exception as worklog_error:
-            print(f"Warning: Could not fetch worklogs for {ticket_id}: {worklog_error}")
-            existing_seconds = 0
-        
-        ticket_data['existing_seconds'] = existing_seconds
-        ticket_data['existing_formatted'] = format_duration(existing_seconds)
-        ticket_data['new_seconds'] = ticket_data['total_seconds']
-        ticket_data['new_formatted'] = format_duration(ticket_data['new_seconds'])
-        
-        # Get the actual worklog entries for display
-        ticket_data['existing_worklogs'] = get_jira_worklogs(ticket_id, start_date)
-        
-    except Exception as e:
-        ticket_data['summary'] = f"Error loading: {str(e)}"
-        ticket_data['existing_seconds'] = 0
-        ticket_data['existing_formatted'] = "0h 0m"
-        ticket_data['new_seconds'] = ticket_data['total_seconds']
-        ticket_data['new_formatted'] = ticket_data['total_formatted']
+        existing_seconds = worklog_seconds(db, ticket_id, _to_utc(start_date), _to_utc(end_date, end_of_day=True))
+        ticket_data['existing_worklogs'] = [worklog_dict(w) for w in query_worklogs(db, [ticket_id], start=_to_utc(start_date))]
+    finally:
+        db.close()
+
+    ticket_data['existing_seconds'] = existing_seconds
+    ticket_data['existing_formatted'] = format_duration(existing_seconds)
+    ticket_data['new_seconds'] = ticket_data['total_seconds']
+    ticket_data['new_formatted'] = format_duration(ticket_data['new_seconds'])
     
     return ticket_data
 
@@ -237,68 +255,31 @@ def get_timewarrior_by_ticket(start_date, end_date):
         if interval['end'] > tickets[ticket_id]['latest_end']:
             tickets[ticket_id]['latest_end'] = interval['end']
     
-    # Format totals and get JIRA info
-    jira = get_jira_client()
+    # Format totals and get JIRA info: one summary search for all tickets,
+    # and one query against the local worklog mirror
+    summaries = get_ticket_summaries(tickets)
+    refresh_worklogs()
+    db = SessionLocal()
+    try:
+        worklogs_by_ticket = {}
+        for w in query_worklogs(db, list(tickets), start=_to_utc(start_date)):
+            worklogs_by_ticket.setdefault(w.issue_key, []).append(w)
+    finally:
+        db.close()
+    
+    period_end = _to_utc(end_date, end_of_day=True)
     for ticket_id, data in tickets.items():
         data['total_formatted'] = format_duration(data['total_seconds'])
         data['interval_count'] = len(data['intervals'])
+        data['summary'] = summaries[ticket_id]
         
-        # Get ticket summary and existing worklogs
-        try:
-            issue = jira.issue(ticket_id, fields='summary')
-            data['summary'] = issue.fields.summary
-            
-            # Get existing worklogs for this period - simplified approach
-            existing_seconds = 0
-            try:
-                # Get all worklogs and filter by current user
-                worklogs = jira.worklogs(ticket_id)
-                
-                for worklog in worklogs:
-                    try:
-                        # Convert author to string for matching
-                        author_str = str(worklog.author)
-                        
-                        # Check if current user is mentioned in the author string
-                        # Try JIRA_DISPLAY_NAME first, fallback to JIRA_USER
-                        user_identifier = Config.JIRA_DISPLAY_NAME or Config.JIRA_USER
-                        if user_identifier and user_identifier.lower() in author_str.lower():
-                            # Handle timezone properly for worklog date
-                            worklog_start_str = worklog.started
-                            if worklog_start_str.endswith('Z'):
-                                worklog_date = datetime.fromisoformat(worklog_start_str.replace('Z', '+00:00'))
-                            elif '+' in worklog_start_str or '-' in worklog_start_str.split('T')[-1]:
-                                # Already has timezone info
-                                worklog_date = datetime.fromisoformat(worklog_start_str)
-                            else:
-                                worklog_date = datetime.fromisoformat(worklog_start_str + '+00:00')
-                            
-                            start_dt = datetime.fromisoformat(start_date) if 'T' in start_date else datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=worklog_date.tzinfo)
-                            end_dt = datetime.fromisoformat(end_date + 'T23:59:59+00:00') if 'T' not in end_date else datetime.fromisoformat(end_date)
-                            
-                            if start_dt <= worklog_date <= end_dt:
-                                existing_seconds += worklog.timeSpentSeconds
-                    except Exception as worklog_item_error:
-                        continue
-                        
-            except Exception as worklog_error:
-                print(f"Warning: Could not fetch worklogs for {ticket_id}: {worklog_error}")
-                existing_seconds = 0
-            
-            data['existing_seconds'] = existing_seconds
-            data['existing_formatted'] = format_duration(existing_seconds)
-            data['new_seconds'] = data['total_seconds']  # Will be adjusted based on what's selected
-            data['new_formatted'] = format_duration(data['new_seconds'])
-            
-            # Get the actual worklog entries for display
-            data['existing_worklogs'] = get_jira_worklogs(ticket_id, start_date)
-            
-        except Exception as e:
-            data['summary'] = f"Error loading: {str(e)}"
-            data['existing_seconds'] = 0
-            data['existing_formatted'] = "0h 0m"
-            data['new_seconds'] = data['total_seconds']
-            data['new_formatted'] = data['total_formatted']
+        ticket_worklogs = worklogs_by_ticket.get(ticket_id, [])
+        existing_seconds = sum(w.time_spent_seconds for w in ticket_worklogs if w.started <= period_end)
+        data['existing_seconds'] = existing_seconds
+        data['existing_formatted'] = format_duration(existing_seconds)
+        data['new_seconds'] = data['total_seconds']  # Will be adjusted based on what's selected
+        data['new_formatted'] = format_duration(data['new_seconds'])
+        data['existing_worklogs'] = [worklog_dict(w) for w in ticket_worklogs]
     
     return tickets
 
@@ -316,132 +297,108 @@ def format_duration(seconds):
 
 def get_jira_worklogs(ticket_id, start_date=None):
     """
-    Get existing worklogs from JIRA for a specific ticket.
+    Get the current user's worklogs for a specific ticket from the local
+    mirror (resynced from JIRA first if it is stale).
     Optionally filter by start_date.
     """
     try:
-        jira = get_jira_client()
-        worklogs_list = jira.worklogs(ticket_id)
-        
-        worklogs = []
-        for worklog in worklogs_list:
-            # Check if this worklog is by the current user using string matching
-            if hasattr(worklog, 'author'):
-                try:
-                    author_str = str(worklog.author)
-                    author_display = author_str  # Use the string representation as display name
-                    
-                    # Check if current user is mentioned in the author string
-                    # Try JIRA_DISPLAY_NAME first, fallback to JIRA_USER
-                    user_identifier = Config.JIRA_DISPLAY_NAME or Config.JIRA_USER
-                    is_current_user = user_identifier and user_identifier.lower() in author_str.lower()
-                    
-                    if not is_current_user:
-                        continue
-                except Exception:
-                    continue
-            else:
-                continue
-                
-            worklog_data = {
-                'id': worklog.id,
-                'author': author_display,
-                'started': worklog.started,
-                'timeSpentSeconds': worklog.timeSpentSeconds,
-                'timeSpent': worklog.timeSpent,
-                'comment': getattr(worklog, 'comment', '')
-            }
-            
-            # Filter by start date if provided
-            if start_date:
-                # Handle timezone properly for worklog date
-                worklog_start_str = worklog.started
-                
-                # Clean up duplicate timezone suffixes if present
-                if '+00:00' in worklog_start_str and ('-' in worklog_start_str[:19] or '+' in worklog_start_str[:19]):
-                    worklog_start_str = worklog_start_str.replace('+00:00', '')
-                
-                if worklog_start_str.endswith('Z'):
-                    worklog_date = datetime.fromisoformat(worklog_start_str.replace('Z', '+00:00'))
-                elif '+' in worklog_start_str or '-' in worklog_start_str.split('T')[-1]:
-                    # Already has timezone info (like -0400 or +0000)
-                    worklog_date = datetime.fromisoformat(worklog_start_str)
-                else:
-                    # No timezone info, assume UTC
-                    worklog_date = datetime.fromisoformat(worklog_start_str + '+00:00')
-                
-                # Handle timezone for filter date
-                if 'T' in start_date:
-                    filter_date = datetime.fromisoformat(start_date)
-                else:
-                    filter_date = datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=worklog_date.tzinfo)
-                
-                if worklog_date < filter_date:
-                    continue
-                    
-            worklogs.append(worklog_data)
-        
-        # Sort by started time (most recent first)
-        worklogs.sort(key=lambda w: w['started'], reverse=True)
-        return worklogs
+        refresh_worklogs()
+        db = SessionLocal()
+        try:
+            rows = query_worklogs(db, [ticket_id], start=_to_utc(start_date) if start_date else None)
+            return [worklog_dict(row) for row in rows]
+        finally:
+            db.close()
         
     except Exception as e:
         print(f"Error fetching worklogs for {ticket_id}: {e}")
         return []
 
 
-def check_duplicate_worklog(ticket_id, start_time, duration_seconds, tolerance_minutes=5):
+def attach_existing_worklogs(intervals, tolerance_minutes=5, refresh=True):
+    """
+    Set 'existing_worklogs' and 'has_worklog' on each interval with one
+    query against the local worklog mirror: a worklog belongs to an interval
+    if it started within it (allowing the same tolerance as
+    check_duplicate_worklog). refresh=False skips bringing the mirror up
+    to date first.
+    """
+    if not intervals:
+        return intervals
+
+    tolerance = timedelta(minutes=tolerance_minutes)
+    spans = [(_to_utc(i['start']), _to_utc(i['end'])) for i in intervals]
+
+    if refresh:
+        refresh_worklogs()
+    db = SessionLocal()
+    try:
+        rows = query_worklogs(db, {i['ticket'] for i in intervals},
+                              start=min(s for s, _ in spans) - tolerance,
+                              end=max(e for _, e in spans))
+    finally:
+        db.close()
+
+    by_ticket = {}
+    for row in rows:
+        by_ticket.setdefault(row.issue_key, []).append(row)
+
+    for interval, (start, end) in zip(intervals, spans):
+        matches = [worklog_dict(w) for w in by_ticket.get(interval['ticket'], [])
+                   if start - tolerance <= w.started <= end]
+        interval['existing_worklogs'] = matches
+        interval['has_worklog'] = len(matches) > 0
+
+    return intervals
+
+
+def iter_with_existing_worklogs(intervals, batch_size=500, tolerance_minutes=5):
+    """
+    attach_existing_worklogs over a stream of intervals: the mirror is
+    refreshed once, then matched one batch at a time. Batches start small
+    so the first intervals come out quickly.
+    """
+    refresh_worklogs()
+    batch, size = [], 50
+    for interval in intervals:
+        batch.append(interval)
+        if len(batch) >= size:
+            yield from attach_existing_worklogs(batch, tolerance_minutes, refresh=False)
+            batch, size = [], min(size * 2, batch_size)
+    if batch:
+        yield from attach_existing_worklogs(batch, tolerance_minutes, refresh=False)
+
+
+def check_duplicate_worklog(ticket_id, start_time, duration_seconds, tolerance_minutes=5, fetch=False):
     """
     Check if a worklog already exists for this ticket around the given time.
-    Returns True if duplicate found.
+    Returns True if duplicate found. Times older than the mirror window
+    are checked against the ticket's full history, fetched from JIRA;
+    fetch=True always fetches it first.
     """
-    worklogs = get_jira_worklogs(ticket_id)
-    
-    # Handle timezone properly - clean up duplicate timezone suffixes
-    if '+00:00' in start_time and ('-' in start_time[:19] or '+' in start_time[:19]):
-        start_time = start_time.replace('+00:00', '')
-    
-    if start_time.endswith('Z'):
-        start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-    elif '+' in start_time or '-' in start_time.split('T')[-1]:
-        start_dt = datetime.fromisoformat(start_time)
+    start = _to_utc(start_time)
+    if fetch:
+        fetch_issue_history(ticket_id)
     else:
-        start_dt = datetime.fromisoformat(start_time + '+00:00')
-        
-    tolerance = timedelta(minutes=tolerance_minutes)
-    
-    for worklog in worklogs:
-        worklog_start_str = worklog['started']
-        
-        # Clean up duplicate timezone suffixes if present
-        if '+00:00' in worklog_start_str and ('-' in worklog_start_str[:19] or '+' in worklog_start_str[:19]):
-            worklog_start_str = worklog_start_str.replace('+00:00', '')
-        
-        if worklog_start_str.endswith('Z'):
-            worklog_start = datetime.fromisoformat(worklog_start_str.replace('Z', '+00:00'))
-        elif '+' in worklog_start_str or '-' in worklog_start_str.split('T')[-1]:
-            worklog_start = datetime.fromisoformat(worklog_start_str)
-        else:
-            worklog_start = datetime.fromisoformat(worklog_start_str + '+00:00')
-        
-        # Check if start times are within tolerance
-        if abs(worklog_start - start_dt) <= tolerance:
-            # Check if durations are similar (within 10%)
-            if abs(worklog['timeSpentSeconds'] - duration_seconds) < duration_seconds * 0.1:
-                return True
-                
-    return False
+        refresh_worklogs()
+        ensure_issue_history(ticket_id, start - timedelta(minutes=tolerance_minutes))
+    db = SessionLocal()
+    try:
+        return has_duplicate_worklog(db, ticket_id, start, duration_seconds,
+                                     timedelta(minutes=tolerance_minutes))
+    finally:
+        db.close()
 
 
 def sync_interval_to_jira(ticket_id, start_time, duration_seconds, comment=None):
     """
     Add a worklog entry to JIRA for the given ticket.
-    Returns success status and message.
+    Returns success status, message and the new worklog id (or None).
     """
     try:
         # Check for duplicates first
         if check_duplicate_worklog(ticket_id, start_time, duration_seconds):
-            return False, f"Worklog already exists for {ticket_id} at {start_time}"
+            return False, f"Worklog already exists for {ticket_id} at {start_time}", None
         
         jira = get_jira_client()
         
@@ -484,44 +441,159 @@ def sync_interval_to_jira(ticket_id, start_time, duration_seconds, comment=None)
         
         # Send the timezone-aware local time to JIRA
         
-        jira.add_worklog(
+        # Adding a worklog isn't idempotent: before retrying a failure the
+        # POST may have survived, look for the worklog on the ticket again
+        worklog = call_with_retries(
+            jira.add_worklog,
             issue=ticket_id,
             timeSpentSeconds=duration_seconds,
             started=started,
-            comment=comment
+            comment=comment,
+            recheck=lambda: check_duplicate_worklog(ticket_id, start_time, duration_seconds, fetch=True)
         )
+        record_worklog(worklog.raw, ticket_id)
         
-        return True, f"Successfully synced {format_duration(duration_seconds)} to {ticket_id}"
+        return True, f"Successfully synced {format_duration(duration_seconds)} to {ticket_id}", worklog.id
         
+    except WriteAppliedError as e:
+        return False, f"Worklog already exists for {ticket_id} at {start_time} (posted despite: {e})", None
     except Exception as e:
-        return False, f"Error syncing to {ticket_id}: {str(e)}"
+        return False, f"Error syncing to {ticket_id}: {str(e)}", None
+
 
+AGGREGATE_MODES = ("day", "block")
 
-def batch_sync_to_jira(intervals):
+
+def aggregate_intervals(intervals, mode="day", block_minutes=None):
     """
-    Sync multiple intervals to JIRA.
-    Returns list of results.
+    Merge a ticket's intervals into one worklog per local day ("day") or per
+    fixed block of the day ("block", JIRA_SYNC_BLOCK_MINUTES long by default).
+    A merged entry starts at its earliest interval, logs the summed duration,
+    and joins the distinct notes; 'ids' lists the switches it covers.
+    Returned newest first, like get_timewarrior_intervals.
     """
-    results = []
+    block_minutes = block_minutes or Config.JIRA_SYNC_BLOCK_MINUTES
+    groups = {}
+    for interval in sorted(intervals, key=lambda i: i['start']):
+        start = datetime.fromisoformat(interval['start'])
+        key = (interval['ticket'], start.date())
+        if mode == "block":
+            key += ((start.hour * 60 + start.minute) // block_minutes,)
+        groups.setdefault(key, []).append(interval)
+
+    merged = []
+    for members in groups.values():
+        notes, tags = [], []
+        for interval in members:
+            note = (interval.get('note') or '').strip()
+            if note and note not in notes:
+                notes.append(note)
+            tags.extend(t for t in interval.get('tags', []) if t not in tags)
+        duration_seconds = sum(i['duration_seconds'] for i in members)
+        merged.append({
+            'id': None,
+            'ids': [i['id'] for i in members if i.get('id') is not None],
+            'start': members[0]['start'],
+            'end': max(i['end'] for i in members),
+            'ticket': members[0]['ticket'],
+            'tags': tags,
+            'duration_seconds': duration_seconds,
+            'duration_formatted': format_duration(duration_seconds),
+            'note': '; '.join(notes) or None,
+            'interval_count': len(members)
+        })
+
+    merged.sort(key=lambda i: i['start'], reverse=True)
+    return merged
 
-    for interval in intervals:
-        # Note is already included in the interval data from the database
-        comment = interval.get('note', None)
 
-        success, message = sync_interval_to_jira(
+def interval_hash(interval, switch_starts):
+    """
+    Fingerprint of what would be posted for an interval; editing the switch
+    changes it. Built from the switches' stored UTC start times (from
+    `switch_starts`, id -> naive UTC datetime) rather than the rendered
+    local 'start', which shifts with the current UTC offset after a DST
+    change.
+    """
+    switch_ids = interval.get('ids') or ([interval['id']] if interval.get('id') is not None else [])
+    starts = [[switch_id, switch_starts[switch_id].isoformat() if switch_id in switch_starts else None]
+              for switch_id in sorted(switch_ids)]
+    payload = json.dumps([interval['ticket'], starts, interval['duration_seconds'], interval.get('note') or ''])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _sync_one(interval, journaled, switch_starts, should_stop=None):
+    # Note is already included in the interval data from the database
+    comment = interval.get('note', None)
+    # Aggregated entries cover several switches
+    switch_ids = interval.get('ids') or ([interval['id']] if interval.get('id') is not None else [])
+    content_hash = interval_hash(interval, switch_starts)
+    skipped = bool(switch_ids) and all((switch_id, content_hash) in journaled for switch_id in switch_ids)
+    cancelled = not skipped and should_stop is not None and should_stop()
+
+    if skipped:
+        success, message, worklog_id = False, f"Already synced {interval['ticket']} at {interval['start']}", None
+    elif cancelled:
+        success, message, worklog_id = False, f"Cancelled before syncing {interval['ticket']} at {interval['start']}", None
+    else:
+        success, message, worklog_id = sync_interval_to_jira(
             interval['ticket'],
             interval['start'],
             interval['duration_seconds'],
             comment=comment
         )
 
-        results.append({
-            'ticket': interval['ticket'],
-            'start': interval['start'],
-            'duration': interval['duration_formatted'],
-            'success': success,
-            'message': message,
-            'comment': comment or 'No note'
-        })
+    if success and switch_ids:
+        db = SessionLocal()
+        try:
+            db.add_all(SyncJournal(switch_id=switch_id, content_hash=content_hash,
+                                   ticket=interval['ticket'], worklog_id=worklog_id)
+                       for switch_id in switch_ids)
+            db.commit()
+        finally:
+            db.close()
+
+    return {
+        'ticket': interval['ticket'],
+        'start': interval['start'],
+        'duration': interval.get('duration_formatted') or format_duration(interval['duration_seconds']),
+        'success': success,
+        'skipped': skipped,
+        'cancelled': cancelled,
+        'message': message,
+        'comment': comment or 'No note'
+    }
+
+
+def batch_sync_to_jira(intervals, on_result=None, should_stop=None):
+    """
+    Sync multiple intervals to JIRA, posting up to JIRA_SYNC_WORKERS at a
+    time under the shared write rate limit. Intervals whose switch id and
+    content hash are already in the sync journal are skipped without any
+    JIRA reads. `on_result` is called with each result as it completes;
+    once `should_stop()` is true the remaining intervals are reported as
+    cancelled instead of posted. Returns list of results, in input order.
+    """
+    if not intervals:
+        return []
+
+    switch_ids = {switch_id for i in intervals for switch_id in (i.get('ids') or [i.get('id')]) if switch_id is not None}
+    db = SessionLocal()
+    try:
+        journaled = {
+            (row.switch_id, row.content_hash)
+            for row in db.query(SyncJournal.switch_id, SyncJournal.content_hash)
+                         .filter(SyncJournal.switch_id.in_(switch_ids))
+        }
+        switch_starts = dict(db.query(Switch.id, Switch.timestamp).filter(Switch.id.in_(switch_ids)))
+    finally:
+        db.close()
+
+    def sync(interval):
+        result = _sync_one(interval, journaled, switch_starts, should_stop)
+        if on_result:
+            on_result(result)
+        return result
 
-    return results
\ No newline at end of file
+    with ThreadPoolExecutor(max_workers=min(len(intervals), Config.JIRA_SYNC_WORKERS)) as pool:
+        return list(pool.map(sync, intervals))
@@ -0,0 +1,282 @@
+# app/worklogs.py
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func
+from config import Config
+from app.models import SessionLocal, Worklog, SyncState, ReconciliationDay, lock_for_write
+from app.jira_client import jira_rest, search_issues_raw, parse_jira_datetime, CircuitOpenError
+
+SYNC_NAME = "worklogs"
+ISSUE_SYNC_PREFIX = "worklogs:"  # + issue key: that issue's full worklog history is mirrored
+ISSUE_PAGE_SIZE = 1000
+LIST_BATCH_SIZE = 1000  # Max ids per /worklog/list request
+ISSUE_BATCH_SIZE = 100
+
+_sync_lock = threading.Lock()
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def is_current_user(author):
+    """Whether a raw worklog author is the configured user (JIRA_DISPLAY_NAME, else JIRA_USER)."""
+    identifier = Config.JIRA_DISPLAY_NAME or Config.JIRA_USER
+    if not identifier or not author:
+        return False
+    names = (author.get('displayName'), author.get('name'), author.get('emailAddress'), author.get('accountId'))
+    return any(identifier.lower() in name.lower() for name in names if name)
+
+
+def _feed(path, since):
+    """Follow a worklog/updated or worklog/deleted feed from `since` (ms). Returns (ids, until)."""
+    ids, until = [], since
+    while True:
+        page = jira_rest("GET", path, params={"since": since})
+        ids.extend(str(value['worklogId']) for value in page.get('values', []))
+        until = page.get('until', until)
+        if page.get('lastPage', True):
+            return ids, until
+        since = until
+
+
+def _issue_keys(db, issue_ids):
+    """Map issue ids to keys, from the mirror where possible and batched `id in (...)` searches otherwise."""
+    known = dict(
+        db.query(Worklog.issue_id, Worklog.issue_key)
+        .filter(Worklog.issue_id.in_(issue_ids), Worklog.issue_key.isnot(None))
+        .distinct()
+    )
+    missing = sorted(set(issue_ids) - set(known))
+    for i in range(0, len(missing), ISSUE_BATCH_SIZE):
+        batch = missing[i:i + ISSUE_BATCH_SIZE]
+        for issue in search_issues_raw(f"id in ({','.join(batch)})", 'key', page_size=len(batch)):
+            known[str(issue['id'])] = issue['key']
+    return known
+
+
+def forget_worklog_days(db, starts):
+    """
+    Drop cached reconciliation for the local days of these naive-UTC
+    worklog start times, since their JIRA totals changed. The caller commits.
+    """
+    days = {datetime.fromtimestamp(start.replace(tzinfo=timezone.utc).timestamp()).date().isoformat()
+            for start in starts if start}
+    if days:
+        db.query(ReconciliationDay).filter(ReconciliationDay.day.in_(days)).delete(synchronize_session=False)
+
+
+def _store_worklog(db, raw, issue_key):
+    """Upsert one raw worklog. Returns the start times it had before and has now (for forget_worklog_days)."""
+    row = db.get(Worklog, str(raw['id'])) or Worklog(id=str(raw['id']))
+    previous = row.started
+    row.issue_id = str(raw.get('issueId'))
+    row.issue_key = issue_key
+    row.author = (raw.get('author') or {}).get('displayName')
+    row.started = parse_jira_datetime(raw['started'])
+    row.started_raw = raw['started']
+    row.time_spent_seconds = raw.get('timeSpentSeconds', 0)
+    row.time_spent = raw.get('timeSpent')
+    row.comment = raw.get('comment') if isinstance(raw.get('comment'), str) else None
+    row.updated = parse_jira_datetime(raw.get('updated'))
+    db.add(row)
+    return previous, row.started
+
+
+def record_worklog(raw, issue_key):
+    """Add a worklog we just created in JIRA to the mirror, so duplicate checks see it immediately."""
+    db = SessionLocal()
+    try:
+        forget_worklog_days(db, _store_worklog(db, raw, issue_key))
+        db.commit()
+    finally:
+        db.close()
+
+
+def sync_worklogs(max_age_seconds=0):
+    """
+    Bring the mirror up to date from JIRA's worklog/updated and
+    worklog/deleted feeds since the stored watermark (the first sync goes
+    back WORKLOG_MIRROR_DAYS). Changed worklogs are fetched in bulk via
+    worklog/list and only the current user's are kept. Skips the sync if
+    the mirror is younger than `max_age_seconds`. Returns the number of
+    worklogs stored.
+
+    Processes serving the same database may sync at the same time. The
+    results are written under the database write lock, and dropped if
+    another process finished a sync that started later than this one, so
+    older data never overwrites newer data or moves the watermark back.
+    """
+    with _sync_lock:
+        started = _utcnow()
+
+        db = SessionLocal()
+        try:
+            state = db.get(SyncState, SYNC_NAME)
+            if state and state.synced_at and started - state.synced_at < timedelta(seconds=max_age_seconds):
+                return 0
+            if state and state.cursor:
+                since = int(state.cursor)
+                covers_from = state.covers_from
+            else:
+                since = int((time.time() - Config.WORKLOG_MIRROR_DAYS * 86400) * 1000)
+                covers_from = datetime.fromtimestamp(since / 1000, timezone.utc).replace(tzinfo=None)
+        finally:
+            db.close()
+
+        updated_ids, updated_until = _feed("worklog/updated", since)
+        deleted_ids, deleted_until = _feed("worklog/deleted", since)
+
+        raws = []
+        for i in range(0, len(updated_ids), LIST_BATCH_SIZE):
+            raws.extend(jira_rest("POST", "worklog/list", json={"ids": updated_ids[i:i + LIST_BATCH_SIZE]}))
+        mine = [raw for raw in raws if is_current_user(raw.get('author'))]
+        # Worklogs reassigned to someone else leave the mirror too
+        gone = set(deleted_ids) | {str(raw['id']) for raw in raws if not is_current_user(raw.get('author'))}
+
+        db = SessionLocal()
+        try:
+            keys = _issue_keys(db, {str(raw['issueId']) for raw in mine})
+            lock_for_write(db)
+            state = db.get(SyncState, SYNC_NAME)
+            if state and state.synced_at and state.synced_at > started:
+                db.rollback()
+                return 0
+            changed = set()
+            for raw in mine:
+                changed.update(_store_worklog(db, raw, keys.get(str(raw['issueId']))))
+            gone = sorted(gone)
+            for i in range(0, len(gone), LIST_BATCH_SIZE):
+                batch = gone[i:i + LIST_BATCH_SIZE]
+                changed.update(started for (started,) in db.query(Worklog.started).filter(Worklog.id.in_(batch)))
+                db.query(Worklog).filter(Worklog.id.in_(batch)).delete(synchronize_session=False)
+            forget_worklog_days(db, changed)
+
+            state = state or SyncState(name=SYNC_NAME)
+            # Resume from whichever feed is further behind; replaying is harmless
+            state.cursor = str(min(updated_until, deleted_until))
+            state.covers_from = state.covers_from or covers_from
+            state.synced_at = started
+            state.full_synced_at = state.full_synced_at or started
+            db.add(state)
+            db.commit()
+        finally:
+            db.close()
+
+        return len(mine)
+
+
+def ensure_issue_history(ticket, start):
+    """
+    Make sure the mirror holds every worklog of `ticket` that could match
+    naive-UTC `start`. The mirror only goes back to where the first sync
+    started (WORKLOG_MIRROR_DAYS), so for older times the ticket's whole
+    worklog list is fetched from JIRA once and stored; the incremental
+    feeds keep it current after that. Raises if JIRA can't be reached,
+    so a caller checking for duplicates doesn't post blind.
+    """
+    db = SessionLocal()
+    try:
+        state = db.get(SyncState, SYNC_NAME)
+        if state and state.covers_from and start >= state.covers_from:
+            return
+        if db.get(SyncState, ISSUE_SYNC_PREFIX + ticket):
+            return
+    finally:
+        db.close()
+    fetch_issue_history(ticket)
+
+
+def fetch_issue_history(ticket):
+    """
+    Fetch every worklog of `ticket` from JIRA and store the current
+    user's in the mirror, marking the ticket's history as mirrored.
+    Raises if JIRA can't be reached.
+    """
+    started = _utcnow()
+    raws, start_at = [], 0
+    while True:
+        page = jira_rest("GET", f"issue/{ticket}/worklog", params={"startAt": start_at, "maxResults": ISSUE_PAGE_SIZE})
+        worklogs = page.get('worklogs', [])
+        raws.extend(worklogs)
+        start_at += len(worklogs)
+        if not worklogs or start_at >= page.get('total', 0):
+            break
+
+    db = SessionLocal()
+    try:
+        lock_for_write(db)
+        changed = set()
+        for raw in raws:
+            if is_current_user(raw.get('author')):
+                changed.update(_store_worklog(db, raw, ticket))
+        forget_worklog_days(db, changed)
+        db.merge(SyncState(name=ISSUE_SYNC_PREFIX + ticket, synced_at=started, full_synced_at=started))
+        db.commit()
+    finally:
+        db.close()
+
+
+def refresh_worklogs():
+    """
+    Resync the mirror if it is older than WORKLOG_SYNC_SECONDS. If JIRA is
+    unavailable the (last known) local data is used as is. Returns False
+    if the mirror couldn't be refreshed.
+    """
+    if not Config.JIRA_URL:
+        return False
+    try:
+        sync_worklogs(max_age_seconds=Config.WORKLOG_SYNC_SECONDS)
+        return True
+    except CircuitOpenError:
+        return False
+    except Exception as e:
+        print(f"Warning: Could not sync worklogs from JIRA: {e}")
+        return False
+
+
+def worklog_dict(row):
+    """A mirrored worklog in the shape the timesync views have always returned."""
+    return {
+        'id': row.id,
+        'author': row.author,
+        'started': row.started_raw,
+        'timeSpentSeconds': row.time_spent_seconds,
+        'timeSpent': row.time_spent,
+        'comment': row.comment or ''
+    }
+
+
+def query_worklogs(db, tickets=None, start=None, end=None):
+    """The current user's mirrored worklogs, newest first; `start`/`end` are naive UTC bounds on started."""
+    query = db.query(Worklog)
+    if tickets is not None:
+        query = query.filter(Worklog.issue_key.in_(tickets))
+    if start is not None:
+        query = query.filter(Worklog.started >= start)
+    if end is not None:
+        query = query.filter(Worklog.started <= end)
+    return query.order_by(Worklog.started.desc()).all()
+
+
+def worklog_seconds(db, ticket, start=None, end=None):
+    """Total seconds the current user logged on `ticket` between naive UTC `start` and `end`."""
+    query = db.query(func.coalesce(func.sum(Worklog.time_spent_seconds), 0)).filter(Worklog.issue_key == ticket)
+    if start is not None:
+        query = query.filter(Worklog.started >= start)
+    if end is not None:
+        query = query.filter(Worklog.started <= end)
+    return query.scalar()
+
+
+def has_duplicate_worklog(db, ticket, start, duration_seconds, tolerance):
+    """Whether a worklog on `ticket` starts within `tolerance` of naive UTC `start` with a duration within 10%."""
+    return db.query(
+        db.query(Worklog)
+        .filter(Worklog.issue_key == ticket)
+        .filter(Worklog.started.between(start - tolerance, start + tolerance))
+        .filter(func.abs(Worklog.time_spent_seconds - duration_seconds) < duration_seconds * 0.1)
+        .exists()
+    ).scalar()
@@ -0,0 +1,112 @@
+# bench/activitywatch_benchmark.py
+"""
+ActivityWatch parsing benchmark against the offline stand-in.
+
+Serves a month of synthetic window events (or a recorded fixture) and
+compares loading each /query response whole with response.json() against
+ActivityWatchClient's streaming parser, reporting wall time and peak
+Python memory (tracemalloc) for each.
+
+    python -m bench.activitywatch_benchmark --events 150000 --days 30
+    python -m bench.activitywatch_benchmark --replay aw.json --days 7
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fake_activitywatch import FakeActivityWatch, serve
+
+
+def _measure(name, fn, size):
+    """Time `fn` once untraced, then run it again under tracemalloc for its peak."""
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    count = sum(len(rows) for rows in result.values()) if result else 0
+    print(f"{name:<40} {elapsed:8.2f}s {peak / 2**20:10.1f} {count:9d} {size / 2**20:9.1f}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ActivityWatch response parsing")
+    parser.add_argument("--events", type=int, default=120000, help="Synthetic window events in total")
+    parser.add_argument("--days", type=int, default=30, help="Days queried (one timeperiod each)")
+    parser.add_argument("--end-date", default=None, help="Last day queried, YYYY-MM-DD (default yesterday); "
+                                                         "match the recording when replaying a fixture")
+    parser.add_argument("--replay", metavar="FIXTURE", help="Replay a recorded fixture instead")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    fake = FakeActivityWatch(events_per_day=max(1, args.events // args.days), seed=args.seed, fixture=args.replay)
+    server = serve(fake)
+
+    # Config reads the environment when first imported, so this runs before any app import
+    workdir = tempfile.mkdtemp(prefix="aw-bench-")
+    os.environ["ACTIVITYWATCH_URL"] = server.url
+    os.environ["ACTIVITYWATCH_TIMEOUT_SECONDS"] = "120"
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from app.activitywatch import ActivityWatchClient, _span, _window
+
+    client = ActivityWatchClient()
+    last = date.fromisoformat(args.end_date) if args.end_date else date.today() - timedelta(days=1)
+    days = [last - timedelta(days=n) for n in range(args.days - 1, -1, -1)]
+    keys = [d.isoformat() for d in days]
+
+    def buffered(query, row):
+        # The previous approach: the whole body parsed into dicts, then converted
+        result = client._make_request("POST", "/query", json={"timeperiods": client._day_periods(days),
+                                                              "query": [query.strip()]})
+        return {key: sorted(row(event) for event in events or []) for key, events in zip(keys, result)}
+
+    # Warm up so the fake has rendered (or loaded) every response before anything is measured
+    day_start = datetime.combine(days[0], datetime.min.time())
+    day_end = datetime.combine(last + timedelta(days=1), datetime.min.time())
+    client.query_window_events(days)
+    client.query_not_afk_intervals(days)
+    client.calculate_daily_hours(day_start, day_end)
+    fake.reset_stats()
+    client.query_window_events(days)
+    window_bytes = fake.stats()["bytes_sent"]
+    fake.reset_stats()
+    client.query_not_afk_intervals(days)
+    afk_bytes = fake.stats()["bytes_sent"]
+
+    print(f"Fake ActivityWatch {server.url}: {args.days} days, "
+          f"{'fixture ' + args.replay if args.replay else f'{args.events} window events'}")
+    print()
+    print(f"{'phase':<40} {'time':>9} {'peak MiB':>10} {'events':>9} {'body MiB':>9}")
+    whole = _measure("window events, response.json()",
+                     lambda: buffered(client.WINDOW_EVENTS_QUERY, _window), window_bytes)
+    streamed = _measure("window events, streaming parser",
+                        lambda: client.query_window_events(days), window_bytes)
+    _measure("not-AFK periods, response.json()",
+             lambda: buffered(client.NOT_AFK_QUERY, _span), afk_bytes)
+    _measure("not-AFK periods, streaming parser",
+             lambda: client.query_not_afk_intervals(days), afk_bytes)
+
+    started = time.perf_counter()
+    hours = client.calculate_daily_hours(day_start, day_end)
+    print(f"{'calculate_daily_hours (sum_durations)':<40} {time.perf_counter() - started:8.2f}s "
+          f"{'':>10} {len(hours or {}):9d}")
+
+    print()
+    print(f"Streaming and buffered results {'match' if whole == streamed else 'DIFFER'}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
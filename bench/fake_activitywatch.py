@@ -0,0 +1,271 @@
+# bench/fake_activitywatch.py
+"""
+Offline stand-in for the ActivityWatch REST API, in one of three modes:
+
+- synthetic (default): generates a deterministic day of AFK and window
+  events for every timeperiod, answering the queries this app sends
+  (event lists, or one number for sum_durations queries)
+- record: proxies every request to a real ActivityWatch server and saves
+  the request/response pairs to a fixture file
+- replay: answers from a recorded fixture, matching requests by method,
+  path and body
+
+Run standalone:
+    python -m bench.fake_activitywatch --port 5666 --events-per-day 4000
+    python -m bench.fake_activitywatch --port 5666 --record http://localhost:5600 --fixture aw.json
+    python -m bench.fake_activitywatch --port 5666 --replay aw.json
+then point ACTIVITYWATCH_URL at http://127.0.0.1:5666.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import requests
+
+API = "/api/0"
+HOST = "bench-host"
+APPS = [
+    ("Code", "feature/{key}-retry - timesync - Visual Studio Code"),
+    ("Firefox", "{key} Retry failed worklog posts - JIRA"),
+    ("Firefox", "Grafana - Sync dashboard"),
+    ("Slack", "general - Slack"),
+    ("Terminal", "python -m bench.sync_benchmark"),
+    ("Firefox", "Pull request #{n} - GitHub"),
+]
+
+
+def _timestamp(value):
+    return value.astimezone(timezone.utc).isoformat()
+
+
+def _request_key(method, path, body):
+    """Fixture lookup key: the body is canonicalized so key order doesn't matter."""
+    return f"{method} {path} {json.dumps(body, sort_keys=True) if body is not None else ''}"
+
+
+class FakeActivityWatch:
+    """Synthetic ActivityWatch data, or a recorded fixture to replay. Thread-safe."""
+
+    def __init__(self, events_per_day=2000, active_fraction=0.8, latency=0.0, seed=1,
+                 fixture=None, record_url=None):
+        self.events_per_day = events_per_day  # Window events per timeperiod
+        self.active_fraction = active_fraction  # Share of each day that is not-AFK
+        self.latency = latency  # Seconds added to every request
+        self.seed = seed
+        self.record_url = record_url  # Real server to proxy and record, if any
+
+        self._lock = threading.Lock()
+        self._recorded = {}  # request key -> {"method", "path", "body", "status", "response"}
+        self._rendered = {}  # request key -> (status, encoded body) already sent once
+        if fixture:
+            self.load(fixture)
+        self.reset_stats()
+
+    # Fixtures
+
+    def load(self, path):
+        with open(path) as f:
+            entries = json.load(f)
+        with self._lock:
+            for entry in entries:
+                self._recorded[_request_key(entry["method"], entry["path"], entry.get("body"))] = entry
+
+    def save(self, path):
+        with self._lock:
+            entries = list(self._recorded.values())
+        with open(path, "w") as f:
+            json.dump(entries, f)
+
+    # Stats
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = 0
+            self.bytes_sent = 0
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "bytes_sent": self.bytes_sent}
+
+    def _count(self, sent):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += sent
+
+    # Synthetic data
+
+    def day_events(self, start, end):
+        """
+        Deterministic (afk events, window events) for the period [start, end):
+        not-AFK stretches covering `active_fraction` of it, with
+        `events_per_day` window events spread over them.
+        """
+        rng = random.Random(f"{self.seed}:{start.isoformat()}")
+        length = (end - start).total_seconds()
+        afk, spans = [], []
+        cursor = 0.0
+        while cursor < length:
+            active = min(rng.uniform(600, 5400), length - cursor)
+            away = rng.uniform(60, 1800) * (1 - self.active_fraction) / max(self.active_fraction, 0.01)
+            afk.append({"timestamp": _timestamp(start + timedelta(seconds=cursor)), "duration": active,
+                        "data": {"status": "not-afk"}})
+            spans.append((cursor, active))
+            cursor += active
+            if cursor < length:
+                afk.append({"timestamp": _timestamp(start + timedelta(seconds=cursor)),
+                            "duration": min(away, length - cursor), "data": {"status": "afk"}})
+                cursor += away
+
+        total_active = sum(duration for _, duration in spans)
+        windows = []
+        for span_start, span_length in spans:
+            count = max(1, round(self.events_per_day * span_length / total_active))
+            step = span_length / count
+            for n in range(count):
+                app, title = rng.choice(APPS)
+                title = title.format(key=f"BENCH-{rng.randint(1, 50)}", n=rng.randint(1, 999))
+                windows.append({"timestamp": _timestamp(start + timedelta(seconds=span_start + n * step)),
+                                "duration": step, "data": {"app": app, "title": title}})
+        return afk, windows
+
+    def _query(self, body):
+        query = "\n".join(body.get("query", []))
+        results = []
+        for period in body.get("timeperiods", []):
+            start, end = (datetime.fromisoformat(p) for p in period.split("/"))
+            afk, windows = self.day_events(start, end)
+            if "sum_durations" in query:
+                results.append(sum(e["duration"] for e in windows))
+            elif "aw-watcher-window_" in query:
+                results.append(windows)
+            else:
+                results.append([e for e in afk if e["data"]["status"] == "not-afk"])
+        return results
+
+    # Requests
+
+    def handle(self, method, path, body):
+        """Answer one request. Returns (status, encoded JSON body)."""
+        if self.latency:
+            time.sleep(self.latency)
+        key = _request_key(method, path, body)
+
+        if self.record_url:
+            try:
+                response = requests.request(method, self.record_url + path, json=body, timeout=60)
+            except requests.exceptions.RequestException as e:
+                return 502, json.dumps({"message": f"Recording upstream failed: {e}"}).encode()
+            payload = response.json() if response.content else None
+            with self._lock:
+                self._recorded[key] = {"method": method, "path": path, "body": body,
+                                       "status": response.status_code, "response": payload}
+            return response.status_code, json.dumps(payload).encode()
+
+        with self._lock:
+            recorded = self._recorded.get(key)
+            rendered = self._rendered.get(key)
+        if rendered:
+            return rendered
+        if recorded:
+            status, data = recorded["status"], json.dumps(recorded["response"]).encode()
+            with self._lock:
+                self._rendered[key] = (status, data)
+            return status, data
+        if self._recorded:
+            return 404, json.dumps({"message": f"No recorded response for {method} {path}"}).encode()
+
+        if method == "GET" and path == f"{API}/info":
+            payload = {"hostname": HOST, "version": "v0.13.2", "testing": True}
+        elif method == "GET" and path == f"{API}/buckets":
+            payload = {f"aw-watcher-{kind}_{HOST}": {"id": f"aw-watcher-{kind}_{HOST}", "hostname": HOST,
+                                                       "type": "afkstatus" if kind == "afk" else "currentwindow"}
+                       for kind in ("afk", "window")}
+        elif method == "POST" and path == f"{API}/query":
+            payload = self._query(body or {})
+        else:
+            return 404, json.dumps({"message": f"No route for {method} {path}"}).encode()
+
+        # Identical queries get the same bytes back without re-rendering them
+        data = json.dumps(payload).encode()
+        with self._lock:
+            self._rendered[key] = (200, data)
+        return 200, data
+
+
+def _handler_class(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _serve(self, method):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            try:
+                body = json.loads(raw) if raw else None
+            except ValueError:
+                body = None
+            status, data = fake.handle(method, urlparse(self.path).path, body)
+            fake._count(len(data))
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._serve("GET")
+
+        def do_POST(self):
+            self._serve("POST")
+
+    return Handler
+
+
+def serve(fake, host="127.0.0.1", port=0):
+    """Serve `fake` from a background thread. Returns the server; its base URL is server.url."""
+    server = ThreadingHTTPServer((host, port), _handler_class(fake))
+    server.daemon_threads = True
+    server.url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name="fake-activitywatch", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an offline ActivityWatch stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5666)
+    parser.add_argument("--events-per-day", type=int, default=2000, help="Synthetic window events per day")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to each request")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--record", metavar="URL", help="Proxy to this ActivityWatch server and record")
+    parser.add_argument("--replay", metavar="FIXTURE", help="Answer from a recorded fixture")
+    parser.add_argument("--fixture", default="activitywatch-fixture.json", help="Where --record saves")
+    args = parser.parse_args()
+
+    fake = FakeActivityWatch(events_per_day=args.events_per_day, latency=args.latency, seed=args.seed,
+                             fixture=args.replay, record_url=args.record)
+    server = serve(fake, args.host, args.port)
+    mode = f"recording {args.record} to {args.fixture}" if args.record else \
+        f"replaying {args.replay}" if args.replay else f"{args.events_per_day} synthetic events/day"
+    print(f"Fake ActivityWatch on {server.url} ({mode}); Ctrl-C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        if args.record:
+            fake.save(args.fixture)
+            print(f"Saved {args.fixture}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+# bench/fake_jira.py
+"""
+Offline stand-in for the JIRA Server REST API (v2), covering the endpoints
+this app uses: serverInfo, field, search, issue, issue worklogs (list and
+add) and the worklog updated/deleted/list feeds.
+
+Latency, random 5xx errors and a rate limit (429 with Retry-After) can be
+injected to measure how jira_client and timesync behave under load.
+serverInfo and field are never slowed down or failed, so client
+construction always succeeds.
+
+Run standalone:
+    python -m bench.fake_jira --port 8089 --tickets 50 --worklogs 2000 --latency 0.05
+then point JIRA_URL at http://127.0.0.1:8089 (any JIRA_USER/JIRA_TOKEN,
+JIRA_DISPLAY_NAME="Bench User").
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API = "/rest/api/2/"
+FEED_PAGE_SIZE = 1000  # Ids per worklog/updated page, as on real JIRA
+LIST_MAX_IDS = 1000  # Max ids per worklog/list request
+
+FIELDS = [
+    {"id": "summary", "name": "Summary", "clauseNames": ["summary"]},
+    {"id": "issuetype", "name": "Issue Type", "clauseNames": ["issuetype", "type"]},
+    {"id": "status", "name": "Status", "clauseNames": ["status"]},
+    {"id": "parent", "name": "Parent", "clauseNames": ["parent"]},
+    {"id": "components", "name": "Component/s", "clauseNames": ["component"]},
+    {"id": "updated", "name": "Updated", "clauseNames": ["updated"]},
+]
+
+
+def _ms(value):
+    return int(value.timestamp() * 1000)
+
+
+def format_jira_datetime(value):
+    """JIRA's timestamp format, e.g. 2026-10-18T09:00:00.000+0000."""
+    return value.strftime('%Y-%m-%dT%H:%M:%S.000%z')
+
+
+class FakeJira:
+    """In-memory JIRA data plus the fault injection settings. Thread-safe."""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=None,
+                 user="Bench User", max_results=100, seed=None):
+        self.latency = latency  # Seconds added to every API request...
+        self.jitter = jitter  # ...plus up to this much at random
+        self.error_rate = error_rate  # Fraction of API requests answered with 503
+        self.rate_limit = rate_limit  # Requests per second before 429s, None for unlimited
+        self.user = user  # Display name of the authenticated user
+        self.max_results = max_results  # Server-side cap on search page size
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._issues = {}  # key -> issue
+        self._worklogs = {}  # id -> raw worklog
+        self._deleted = {}  # worklog id -> deleted at (ms)
+        self._next_worklog_id = 10000
+        self._last_change_ms = 0
+        self._tokens = float(rate_limit or 0)
+        self._refilled_at = time.monotonic()
+        self.reset_stats()
+
+    # Data
+
+    def add_issue(self, key, summary=None, assigned=True, issue_type="Task"):
+        with self._lock:
+            issue = {
+                "id": str(len(self._issues) + 10000),
+                "key": key,
+                "assigned": assigned,
+                "fields": {
+                    "summary": summary or f"Summary of {key}",
+                    "issuetype": {"name": issue_type},
+                    "status": {"name": "In Progress"},
+                    "parent": None,
+                    "components": [],
+                    "updated": format_jira_datetime(datetime.now(timezone.utc)),
+                },
+            }
+            self._issues[key] = issue
+            return issue
+
+    def add_worklog(self, key, started, seconds, author=None, comment=""):
+        """Add a worklog to an existing issue. `started` is an aware datetime or JIRA timestamp string."""
+        with self._lock:
+            return self._add_worklog(key, started, seconds, author or self.user, comment)
+
+    def _add_worklog(self, key, started, seconds, author, comment):
+        issue = self._issues[key]
+        self._next_worklog_id += 1
+        now = datetime.now(timezone.utc)
+        worklog = {
+            "id": str(self._next_worklog_id),
+            "issueId": issue["id"],
+            "author": {"name": author.lower().replace(" ", "."), "displayName": author},
+            "started": started if isinstance(started, str) else format_jira_datetime(started),
+            "timeSpentSeconds": seconds,
+            "timeSpent": f"{seconds // 3600}h {seconds % 3600 // 60}m",
+            "comment": comment,
+            "created": format_jira_datetime(now),
+            "updated": format_jira_datetime(now),
+            "updatedMs": self._change_ms(),
+        }
+        self._worklogs[worklog["id"]] = worklog
+        return worklog
+
+    def delete_worklog(self, worklog_id):
+        with self._lock:
+            if self._worklogs.pop(str(worklog_id), None):
+                self._deleted[str(worklog_id)] = self._change_ms()
+
+    def _change_ms(self):
+        # Strictly increasing, so feed pages never split a run of equal timestamps
+        self._last_change_ms = max(_ms(datetime.now(timezone.utc)), self._last_change_ms + 1)
+        return self._last_change_ms
+
+    def seed(self, tickets, worklogs, project="BENCH", days=60, other_authors=0.2):
+        """
+        Create `tickets` assigned issues and `worklogs` worklogs spread over
+        the last `days` days; `other_authors` of them belong to someone else.
+        Returns the issue keys.
+        """
+        keys = [f"{project}-{n}" for n in range(1, tickets + 1)]
+        for key in keys:
+            self.add_issue(key)
+        now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        # Seeded changes get distinct timestamps in the past, as if made before the server started
+        changed_ms = _ms(datetime.now(timezone.utc)) - worklogs - 1000
+        for n in range(worklogs):
+            started = now - timedelta(hours=self._random.randrange(days * 24))
+            author = "Someone Else" if self._random.random() < other_authors else self.user
+            worklog = self.add_worklog(self._random.choice(keys), started,
+                                       self._random.choice((900, 1800, 3600, 7200)), author)
+            worklog["updatedMs"] = changed_ms + n
+        return keys
+
+    # Stats
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = {}  # "METHOD route" -> count
+            self.statuses = {}  # HTTP status -> count
+
+    def stats(self):
+        with self._lock:
+            return {"requests": dict(self.requests), "statuses": dict(self.statuses),
+                    "total": sum(self.requests.values())}
+
+    def _count(self, route, status):
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    # Fault injection
+
+    def _rate_limited(self):
+        if not self.rate_limit:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled_at) * self.rate_limit)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return False
+            return True
+
+    def _inject(self):
+        """Sleep for the configured latency; return an error response to send instead, if any."""
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self._random.uniform(0, self.jitter))
+        if self._rate_limited():
+            return 429, {"errorMessages": ["Rate limit exceeded"]}, {"Retry-After": "1"}
+        if self.error_rate and self._random.random() < self.error_rate:
+            return 503, {"errorMessages": ["Injected failure"]}, {}
+        return None
+
+    # Requests
+
+    def handle(self, method, path, query, body):
+        """Route one request. Returns (route label, status, payload, extra headers)."""
+        if not path.startswith(API):
+            return "other", 404, {"errorMessages": ["Not found"]}, {}
+        resource = path[len(API):].strip("/")
+
+        if resource == "serverInfo":
+            return "GET serverInfo", 200, {
+                "baseUrl": "", "version": "9.12.0", "versionNumbers": [9, 12, 0],
+                "deploymentType": "Server", "serverTitle": "Fake JIRA"}, {}
+        if resource == "field":
+            return "GET field", 200, FIELDS, {}
+
+        routes = [
+            ("GET", r"search", self._search),
+            ("POST", r"search", self._search),
+            ("GET", r"issue/([^/]+)", self._issue),
+            ("GET", r"issue/([^/]+)/worklog", self._issue_worklogs),
+            ("POST", r"issue/([^/]+)/worklog", self._post_worklog),
+            ("GET", r"worklog/updated", self._feed_updated),
+            ("GET", r"worklog/deleted", self._feed_deleted),
+            ("POST", r"worklog/list", self._worklog_list),
+        ]
+        for route_method, pattern, handler in routes:
+            match = re.fullmatch(pattern, resource)
+            if match and route_method == method:
+                label = f"{method} {pattern.replace('([^/]+)', '{key}')}"
+                injected = self._inject()
+                if injected:
+                    return (label,) + injected
+                return (label,) + handler(query, body, *match.groups())
+        return f"{method} {resource}", 404, {"errorMessages": [f"No route for {method} {resource}"]}, {}
+
+    def _issue_view(self, issue, fields):
+        view = {"id": issue["id"], "key": issue["key"], "self": f"{API}issue/{issue['id']}"}
+        if fields is None or "*all" in fields:
+            view["fields"] = dict(issue["fields"])
+        else:
+            view["fields"] = {f: issue["fields"].get(f) for f in fields if f in issue["fields"]}
+        return view
+
+    def _matches(self, issue, jql):
+        for clause in re.split(r"\s+AND\s+", jql.strip(), flags=re.I):
+            clause = clause.strip()
+            listed = re.fullmatch(r"(key|id)\s+in\s+\((.*)\)", clause, flags=re.I)
+            if listed:
+                values = {v.strip().strip('"') for v in listed.group(2).split(",")}
+                if issue[listed.group(1).lower()] not in values:
+                    return False
+            elif re.fullmatch(r"assignee\s*=\s*currentUser\(\)", clause, flags=re.I):
+                if not issue["assigned"]:
+                    return False
+            elif re.fullmatch(r"updated\s*>=\s*-\d+m", clause, flags=re.I):
+                continue  # Every issue counts as recently updated
+            # assignee was currentUser(), resolution = Unresolved, ... match everything
+        return True
+
+    def _search(self, query, body, *_):
+        params = body if isinstance(body, dict) else {k: v[0] for k, v in query.items()}
+        jql = params.get("jql", "")
+        start = int(params.get("startAt", 0))
+        page_size = min(int(params.get("maxResults", 50)), self.max_results)
+        fields = params.get("fields")
+        if isinstance(fields, str):
+            fields = [f.strip() for f in fields.split(",")]
+        with self._lock:
+            matched = [i for i in self._issues.values() if self._matches(i, jql)]
+            page = [self._issue_view(i, fields) for i in matched[start:start + page_size]]
+        return 200, {"startAt": start, "maxResults": page_size, "total": len(matched), "issues": page}, {}
+
+    def _issue(self, query, body, key):
+        fields = query["fields"][0].split(",") if "fields" in query else None
+        with self._lock:
+            issue = self._issues.get(key) or next((i for i in self._issues.values() if i["id"] == key), None)
+            if issue is None:
+                return 404, {"errorMessages": ["Issue Does Not Exist"]}, {}
+            return 200, self._issue_view(issue, fields), {}
+
+    def _issue_worklogs(self, query, body, key):
+        with self._lock:
+            issue = self._issues.get(key)
+            if issue is None:
+                return 404, {"errorMessages": ["Issue Does Not Exist"]}, {}
+            worklogs = [self._public(w) for w in self._worklogs.values() if w["issueId"] == issue["id"]]
+        return 200, {"startAt": 0, "maxResults": len(worklogs), "total": len(worklogs), "worklogs": worklogs}, {}
+
+    def _post_worklog(self, query, body, key):
+        with self._lock:
+            if key not in self._issues:
+                return 404, {"errorMessages": ["Issue Does Not Exist"]}, {}
+            worklog = self._add_worklog(key, body["started"], int(body["timeSpentSeconds"]),
+                                        self.user, body.get("comment", ""))
+            return 201, self._public(worklog), {}
+
+    @staticmethod
+    def _public(worklog):
+        return {k: v for k, v in worklog.items() if k != "updatedMs"}
+
+    def _feed(self, query, source):
+        since = int(query.get("since", ["0"])[0])
+        entries = sorted((ms, wid) for wid, ms in source if ms >= since)
+        page, last_page = entries[:FEED_PAGE_SIZE], len(entries) <= FEED_PAGE_SIZE
+        if last_page:
+            until = max([since, _ms(datetime.now(timezone.utc))] + [ms + 1 for ms, _ in page])
+        else:
+            until = page[-1][0] + 1
+        return 200, {
+            "values": [{"worklogId": int(wid), "updatedTime": ms} for ms, wid in page],
+            "since": since, "until": until, "lastPage": last_page,
+        }, {}
+
+    def _feed_updated(self, query, body):
+        with self._lock:
+            return self._feed(query, [(wid, w["updatedMs"]) for wid, w in self._worklogs.items()])
+
+    def _feed_deleted(self, query, body):
+        with self._lock:
+            return self._feed(query, list(self._deleted.items()))
+
+    def _worklog_list(self, query, body):
+        ids = [str(i) for i in (body or {}).get("ids", [])]
+        if len(ids) > LIST_MAX_IDS:
+            return 400, {"errorMessages": [f"At most {LIST_MAX_IDS} ids per request"]}, {}
+        with self._lock:
+            return 200, [self._public(self._worklogs[i]) for i in ids if i in self._worklogs], {}
+
+
+def _handler_class(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, like a real server
+
+        def log_message(self, *args):
+            pass
+
+        def _serve(self, method):
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            try:
+                body = json.loads(raw) if raw else None
+            except ValueError:
+                body = None
+            label, status, payload, headers = fake.handle(method, url.path, parse_qs(url.query), body)
+            fake._count(label, status)
+
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json;charset=UTF-8")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._serve("GET")
+
+        def do_POST(self):
+            self._serve("POST")
+
+    return Handler
+
+
+def serve(fake, host="127.0.0.1", port=0):
+    """Serve `fake` from a background thread. Returns the server; its base URL is server.url."""
+    server = ThreadingHTTPServer((host, port), _handler_class(fake))
+    server.daemon_threads = True
+    server.url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name="fake-jira", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an offline fake JIRA server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--tickets", type=int, default=50, help="Assigned issues to create")
+    parser.add_argument("--worklogs", type=int, default=2000, help="Worklogs to spread over them")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to each API request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of API requests failed with 503")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Requests per second before 429s")
+    parser.add_argument("--user", default="Bench User", help="Display name of the authenticated user")
+    args = parser.parse_args()
+
+    fake = FakeJira(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                    rate_limit=args.rate_limit, user=args.user)
+    fake.seed(args.tickets, args.worklogs)
+    server = serve(fake, args.host, args.port)
+    print(f"Fake JIRA on {server.url} ({args.tickets} issues, {args.worklogs} worklogs); Ctrl-C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# bench/response_benchmark.py
+"""
+Response size and latency benchmark for the large list endpoints.
+
+Seeds a throwaway database with a month of sessions, then requests each
+endpoint through Flask's test client with the standard json provider and
+with orjson, uncompressed and with each Accept-Encoding the app offers.
+Reports server time (median of --repeat requests), the part of it spent
+encoding the JSON body, bytes on the wire and the transfer time those
+bytes take at --bandwidth, with savings against the stdlib-json,
+uncompressed baseline. The NDJSON endpoints are then compared against
+their JSON form, and the streamed CSV export measured, for time to the
+first row, total time and peak Python memory (tracemalloc).
+
+    python -m bench.response_benchmark --switches 20000 --bandwidth 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.sync_benchmark import _seed_switches
+
+
+def _time(client, path, encoding, repeat):
+    """Median seconds per request and the last response."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path, headers={"Accept-Encoding": encoding})
+        response.get_data()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), response
+
+
+def _encode_time(app, response, repeat):
+    """Median seconds the current provider takes to build this JSON response again (0 for other types)."""
+    if response.mimetype != "application/json":
+        return 0.0
+    payload = json.loads(response.get_data())
+    timings = []
+    with app.app_context():
+        for _ in range(repeat):
+            started = time.perf_counter()
+            app.json.response(payload)
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def _stream(client, path, accept):
+    """(seconds to the first body chunk, total seconds, peak traced bytes) for one request."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(path, headers={"Accept": accept}, buffered=False)
+    first = None
+    for _ in response.response:
+        if first is None:
+            first = time.perf_counter() - started
+    total = time.perf_counter() - started
+    response.close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first or total, total, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON serialization and response compression")
+    parser.add_argument("--switches", type=int, default=20000, help="Sessions seeded over this month")
+    parser.add_argument("--tickets", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=10, help="Requests per measurement (median reported)")
+    parser.add_argument("--bandwidth", type=float, default=10, help="Link speed in Mbit/s for transfer times")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # Config reads the environment when first imported, so this runs before any app import
+    workdir = tempfile.mkdtemp(prefix="response-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    for name in ("JIRA_URL", "JIRA_USER", "JIRA_TOKEN"):
+        os.environ[name] = ""
+
+    from flask.json.provider import DefaultJSONProvider
+    from app.app import app, init_app
+    from app.responses import OrjsonProvider, brotli, orjson
+
+    init_app()
+    today = date.today()
+    # Every session falls in the current month, which is what /metrics/switches?view=month returns
+    _seed_switches([f"BENCH-{n}" for n in range(1, args.tickets + 1)], args.switches,
+                   max(1, today.day - 1), args.seed)
+
+    start = today.replace(day=1).isoformat()
+    endpoints = [
+        ("/metrics/switches", "/metrics/switches?view=month"),
+        ("/switches/list", f"/switches/list?start_date={start}&end_date={today.isoformat()}"),
+        ("/timesync/intervals", f"/timesync/intervals?start_date={start}&end_date={today.isoformat()}"),
+        ("/export/switches", "/export/switches"),
+    ]
+    variants = [("json", DefaultJSONProvider, "identity")]
+    if orjson is not None:
+        variants.append(("orjson", OrjsonProvider, "identity"))
+    provider = OrjsonProvider if orjson is not None else DefaultJSONProvider
+    name = "orjson" if orjson is not None else "json"
+    variants.append((f"{name}+gzip", provider, "gzip"))
+    if brotli is not None:
+        variants.append((f"{name}+br", provider, "br"))
+
+    client = app.test_client()
+    bytes_per_second = args.bandwidth * 1e6 / 8
+    print(f"{args.switches} sessions this month; transfer at {args.bandwidth:g} Mbit/s; "
+          f"orjson {'on' if orjson else 'not installed'}, brotli {'on' if brotli else 'not installed'}")
+    print()
+    print(f"{'endpoint':<22} {'variant':<12} {'server ms':>9} {'encode ms':>9} {'KiB':>9} {'xfer ms':>8} {'total ms':>9} "
+          f"{'bytes saved':>11} {'time saved':>10}")
+    for label, path in endpoints:
+        baseline = None
+        for variant, provider_class, encoding in variants:
+            app.json = provider_class(app)
+            client.get(path, headers={"Accept-Encoding": encoding})  # Warm caches
+            server, response = _time(client, path, encoding, args.repeat)
+            encode = _encode_time(app, client.get(path), args.repeat)
+            size = len(response.get_data())
+            total = server + size / bytes_per_second
+            if baseline is None:
+                baseline = (size, total)
+            print(f"{label:<22} {variant:<12} {server * 1000:9.1f} {encode * 1000:9.1f} {size / 1024:9.1f} "
+                  f"{size / bytes_per_second * 1000:8.1f} {total * 1000:9.1f} "
+                  f"{1 - size / baseline[0]:10.0%} {1 - total / baseline[1]:10.0%}")
+        print()
+
+    print(f"{'endpoint':<22} {'format':<8} {'first row ms':>12} {'total ms':>9} {'peak MiB':>9}")
+    for label, path in endpoints:
+        accepts = ("text/csv",) if label == "/export/switches" else ("application/json", "application/x-ndjson")
+        for accept in accepts:
+            first, total, peak = _stream(client, path, accept)
+            print(f"{label:<22} {accept.split('/')[1]:<8} {first * 1000:12.1f} {total * 1000:9.1f} "
+                  f"{peak / 2**20:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# bench/serve_benchmark.py
+"""
+Serving benchmark: dashboard, switch and timesync load while a JIRA sync runs.
+
+Starts the fake JIRA server, seeds a throwaway database, launches the web
+app as a separate server process, queues a sync of every interval and
+then runs concurrent clients against it until the sync finishes (or
+--duration passes). Reports latency per request group.
+
+    python -m bench.serve_benchmark --server gunicorn --workers 2 --threads 8
+    python -m bench.serve_benchmark --server dev     # Flask's single-threaded server, for comparison
+"""
+
+import argparse
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from bench.fake_jira import FakeJira, serve
+from bench.sync_benchmark import _seed_switches
+
+DASHBOARD = ["/current", "/metrics/counts?view=month", "/analytics/insights?view=month",
+             "/analytics/time-consumers?view=month", "/budgets", "/metrics/switches?view=month"]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(args, port, env):
+    if args.server == "gunicorn":
+        env = dict(env, WEB_BIND=f"127.0.0.1:{port}", WEB_WORKERS=str(args.workers), WEB_THREADS=str(args.threads))
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"]
+    else:
+        command = [sys.executable, "-c",
+                   f"from wsgi import app; app.run(host='127.0.0.1', port={port}, threaded=False)"]
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{url}/jira/health", timeout=1)
+            return process, url
+        except requests.exceptions.RequestException:
+            time.sleep(0.1)
+    process.kill()
+    raise SystemExit("Server didn't start")
+
+
+def _client(url, group, stop, latencies, errors, keys, seed):
+    rng = random.Random(seed)
+    session = requests.Session()
+    start_date = (date.today() - timedelta(days=7)).isoformat()
+    end_date = date.today().isoformat()
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            if group == "dashboard":
+                response = session.get(url + rng.choice(DASHBOARD), timeout=60)
+            elif group == "switch":
+                response = session.post(f"{url}/switch", json={"to_task": rng.choice(keys), "note": "bench"},
+                                        timeout=60)
+            else:
+                response = session.get(f"{url}/timesync/intervals",
+                                       params={"start_date": start_date, "end_date": end_date}, timeout=60)
+            ok = response.status_code < 500
+        except requests.exceptions.RequestException:
+            ok = False
+        latencies[group].append(time.perf_counter() - started)
+        if not ok:
+            errors[group] += 1
+        if group == "switch":
+            time.sleep(rng.uniform(0.1, 0.3))  # People don't switch tasks back to back
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the web server under mixed load during a sync")
+    parser.add_argument("--server", choices=("gunicorn", "dev"), default="gunicorn")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent dashboard clients")
+    parser.add_argument("--switch-clients", type=int, default=2, help="Concurrent clients switching tasks")
+    parser.add_argument("--timesync-clients", type=int, default=2, help="Concurrent timesync view clients")
+    parser.add_argument("--intervals", type=int, default=300, help="Tracked sessions (all synced)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to each JIRA request")
+    parser.add_argument("--duration", type=float, default=30, help="Stop after this many seconds at most")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    fake = FakeJira(latency=args.latency, seed=args.seed)
+    keys = fake.seed(20, 500, days=30)
+    jira = serve(fake)
+
+    workdir = tempfile.mkdtemp(prefix="serve-bench-")
+    env = dict(os.environ, JIRA_URL=jira.url, JIRA_USER="bench", JIRA_TOKEN="bench",
+               JIRA_DISPLAY_NAME=fake.user, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    # Seed in this process first; Config reads the environment when first imported
+    os.environ.update(env)
+    from app.models import init_db
+    init_db()
+    _seed_switches(keys, args.intervals, 7, args.seed)
+
+    process, url = _start_server(args, _free_port(), env)
+    try:
+        start_date = (date.today() - timedelta(days=7)).isoformat()
+        intervals = requests.get(f"{url}/timesync/intervals", timeout=120,
+                                 params={"start_date": start_date, "end_date": date.today().isoformat()}).json()
+        job_id = requests.post(f"{url}/timesync/sync", json={"intervals": intervals}, timeout=60).json()["job_id"]
+
+        stop = threading.Event()
+        groups = {"dashboard": args.clients, "switch": args.switch_clients, "timesync": args.timesync_clients}
+        latencies = {group: [] for group in groups}
+        errors = {group: 0 for group in groups}
+        clients = [threading.Thread(target=_client, args=(url, group, stop, latencies, errors, keys, args.seed + n))
+                   for group, count in groups.items() for n in range(count)]
+        started = time.perf_counter()
+        for client in clients:
+            client.start()
+
+        job = {}
+        while time.perf_counter() - started < args.duration:
+            job = requests.get(f"{url}/jobs/{job_id}", timeout=60).json()
+            if job["status"] in ("done", "failed", "cancelled"):
+                break
+            time.sleep(0.5)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for client in clients:
+            client.join()
+    finally:
+        process.terminate()
+        process.wait()
+        jira.shutdown()
+
+    mode = f"gunicorn, {args.workers} workers x {args.threads} threads" if args.server == "gunicorn" \
+        else "Flask dev server, single-threaded"
+    print(f"{mode}; {len(intervals)} intervals syncing against fake JIRA ({args.latency}s latency)")
+    print(f"Sync job {job_id}: {job.get('status')}, {job.get('progress')}/{job.get('total')} after {elapsed:.1f}s")
+    print()
+    print(f"{'group':<10} {'clients':>7} {'requests':>9} {'req/s':>7} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for group, count in groups.items():
+        values = latencies[group]
+        print(f"{group:<10} {count:7d} {len(values):9d} {len(values) / elapsed:7.1f} {errors[group]:7d} "
+              f"{_percentile(values, 0.5) * 1000:8.0f} {_percentile(values, 0.95) * 1000:8.0f} "
+              f"{max(values, default=0) * 1000:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# bench/sync_benchmark.py
+"""
+Sync throughput benchmark against the offline fake JIRA server.
+
+Seeds a throwaway database with switches and the fake server with issues
+and worklogs, then times the worklog mirror sync, the timesync views and
+batch_sync_to_jira (first run and the journaled rerun), reporting the
+JIRA requests, 429s and 5xx each phase caused.
+
+    python -m bench.sync_benchmark --tickets 50 --worklogs 5000 --intervals 300 \\
+        --latency 0.05 --rate-limit 20 --error-rate 0.01
+
+JIRA_SYNC_* settings are read from the environment as usual; --sync-rate
+and --sync-workers override JIRA_SYNC_RATE/JIRA_SYNC_BURST and
+JIRA_SYNC_WORKERS for the run.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fake_jira import FakeJira, serve
+
+
+def _configure(args, url, user, database):
+    # Config reads the environment when first imported, so this runs before any app import
+    os.environ.update({
+        "JIRA_URL": url,
+        "JIRA_USER": "bench",
+        "JIRA_TOKEN": "bench",
+        "JIRA_DISPLAY_NAME": user,
+        "DATABASE_URL": f"sqlite:///{database}",
+    })
+    if args.sync_rate:
+        os.environ["JIRA_SYNC_RATE"] = str(args.sync_rate)
+        os.environ["JIRA_SYNC_BURST"] = str(max(1, int(args.sync_rate)))
+    if args.sync_workers:
+        os.environ["JIRA_SYNC_WORKERS"] = str(args.sync_workers)
+
+
+def _seed_switches(keys, count, days, seed):
+    """`count` closed sessions on random tickets over the last `days` days, none overlapping."""
+    from app.models import SessionLocal, Switch
+
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(tzinfo=None, second=0, microsecond=0)
+    cursor = now - timedelta(days=days)
+    step = timedelta(days=days) / max(count, 1)
+    db = SessionLocal()
+    try:
+        previous = None
+        for n in range(count):
+            start = cursor + step * n
+            minutes = rng.randint(5, max(5, int(step.total_seconds() // 60) - 1))
+            task = rng.choice(keys)
+            db.add(Switch(timestamp=start, end_time=start + timedelta(minutes=minutes),
+                          from_task=previous, to_task=task, note=f"bench {n}", tags=json.dumps([])))
+            previous = task
+        db.commit()
+    finally:
+        db.close()
+
+
+def _phase(fake, name, fn, default=None):
+    """Run and time one phase; a phase that raises is reported and yields `default`."""
+    fake.reset_stats()
+    started = time.perf_counter()
+    try:
+        result, failure = fn(), ""
+    except Exception as e:
+        result, failure = default, f"  failed: {type(e).__name__}"
+    elapsed = time.perf_counter() - started
+    stats = fake.stats()
+    statuses = stats["statuses"]
+    errors = sum(count for status, count in statuses.items() if status >= 500)
+    print(f"{name:<34} {elapsed:8.2f}s {stats['total']:9d} {statuses.get(429, 0):6d} {errors:6d}{failure}")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark timesync against a fake JIRA server")
+    parser.add_argument("--tickets", type=int, default=50, help="Assigned issues on the fake server")
+    parser.add_argument("--worklogs", type=int, default=2000, help="Existing worklogs on the fake server")
+    parser.add_argument("--intervals", type=int, default=200, help="Tracked sessions to sync")
+    parser.add_argument("--days", type=int, default=30, help="Span of the tracked sessions")
+    parser.add_argument("--latency", type=float, default=0.03, help="Seconds added to each JIRA request")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of JIRA requests failed with 503")
+    parser.add_argument("--rate-limit", type=float, default=None, help="JIRA requests per second before 429s")
+    parser.add_argument("--sync-rate", type=float, default=None, help="Override JIRA_SYNC_RATE")
+    parser.add_argument("--sync-workers", type=int, default=None, help="Override JIRA_SYNC_WORKERS")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    fake = FakeJira(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                    rate_limit=args.rate_limit, seed=args.seed)
+    keys = fake.seed(args.tickets, args.worklogs, days=max(args.days, 60))
+    server = serve(fake)
+
+    workdir = tempfile.mkdtemp(prefix="timesync-bench-")
+    _configure(args, server.url, fake.user, os.path.join(workdir, "bench.db"))
+
+    from config import Config
+    from app.models import init_db
+    from app.worklogs import sync_worklogs
+    from app.timesync import (get_timewarrior_intervals, get_timewarrior_by_ticket, get_single_ticket_data,
+                              attach_existing_worklogs, batch_sync_to_jira)
+
+    init_db()
+    _seed_switches(keys, args.intervals, args.days, args.seed)
+    start_date = (date.today() - timedelta(days=args.days)).isoformat()
+    end_date = date.today().isoformat()
+
+    print(f"Fake JIRA {server.url}: {args.tickets} issues, {args.worklogs} worklogs, "
+          f"latency {args.latency}+{args.jitter}s, error rate {args.error_rate}, rate limit {args.rate_limit or 'none'}")
+    print(f"Sync: {Config.JIRA_SYNC_WORKERS} workers, {Config.JIRA_SYNC_RATE}/s, {Config.JIRA_SYNC_RETRIES} retries; "
+          f"database {workdir}")
+    print()
+    print(f"{'phase':<34} {'time':>9} {'requests':>9} {'429':>6} {'5xx':>6}")
+
+    mirrored, _ = _phase(fake, "worklog mirror (initial)", sync_worklogs, default=0)
+    _phase(fake, "worklog mirror (incremental)", sync_worklogs)
+    by_ticket, _ = _phase(fake, "timesync view, all tickets",
+                          lambda: get_timewarrior_by_ticket(start_date, end_date), default={})
+    busiest = max(by_ticket, key=lambda k: by_ticket[k]['interval_count']) if by_ticket else keys[0]
+    _phase(fake, "timesync view, one ticket", lambda: get_single_ticket_data(busiest, start_date, end_date))
+    intervals, _ = _phase(fake, "intervals + existing worklogs",
+                          lambda: attach_existing_worklogs(get_timewarrior_intervals(start_date, end_date)),
+                          default=[])
+
+    results, elapsed = _phase(fake, "batch_sync_to_jira", lambda: batch_sync_to_jira(intervals), default=[])
+    rerun, _ = _phase(fake, "batch_sync_to_jira (rerun)", lambda: batch_sync_to_jira(intervals), default=[])
+
+    success = sum(1 for r in results if r['success'])
+    skipped = sum(1 for r in results if r['skipped'])
+    print()
+    print(f"Mirrored {mirrored} of your worklogs; {len(by_ticket)} tickets in the view")
+    print(f"Sync: {success}/{len(results)} posted, {skipped} skipped, {len(results) - success - skipped} failed "
+          f"({success / elapsed if elapsed else 0:.1f} worklogs/s)")
+    print(f"Rerun: {sum(1 for r in rerun if r['skipped'])}/{len(rerun)} skipped via the sync journal")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,12 +13,61 @@ class Config:
     JIRA_USER = os.getenv("JIRA_USER")
     JIRA_TOKEN = os.getenv("JIRA_TOKEN")
     JIRA_DISPLAY_NAME = os.getenv("JIRA_DISPLAY_NAME")  # For matching worklogs by name
+    JIRA_EPIC_LINK_FIELD = os.getenv("JIRA_EPIC_LINK_FIELD")  # e.g. customfield_10014 on older instances
+    JIRA_METADATA_REFRESH_MINUTES = int(os.getenv("JIRA_METADATA_REFRESH_MINUTES", "30"))
+    JIRA_METADATA_TTL_HOURS = int(os.getenv("JIRA_METADATA_TTL_HOURS", "24"))
+    JIRA_TICKET_CACHE_SECONDS = int(os.getenv("JIRA_TICKET_CACHE_SECONDS", "60"))  # Revalidate assigned tickets after this
+    JIRA_TICKET_FULL_SYNC_HOURS = int(os.getenv("JIRA_TICKET_FULL_SYNC_HOURS", "24"))  # Full resync catches deleted issues
+    JIRA_PAGE_WORKERS = int(os.getenv("JIRA_PAGE_WORKERS", "4"))  # Parallel page fetches on Server/DC
+    WORKLOG_SYNC_SECONDS = int(os.getenv("WORKLOG_SYNC_SECONDS", "60"))  # Max age of the local worklog mirror before reads resync
+    WORKLOG_MIRROR_DAYS = int(os.getenv("WORKLOG_MIRROR_DAYS", "90"))  # History pulled by the first worklog sync
+    JIRA_SYNC_WORKERS = int(os.getenv("JIRA_SYNC_WORKERS", "4"))  # Concurrent worklog posts
+    JIRA_SYNC_RATE = float(os.getenv("JIRA_SYNC_RATE", "5"))  # Worklog posts per second (token bucket)
+    JIRA_SYNC_BURST = int(os.getenv("JIRA_SYNC_BURST", "5"))  # Token bucket capacity
+    JIRA_SYNC_BLOCK_MINUTES = int(os.getenv("JIRA_SYNC_BLOCK_MINUTES", "240"))  # Block size for ?aggregate=block
+    JIRA_SYNC_RETRIES = int(os.getenv("JIRA_SYNC_RETRIES", "4"))  # Retries for 429/5xx/connection errors
+    JIRA_POOL_SIZE = int(os.getenv("JIRA_POOL_SIZE", "10"))  # Keep-alive connections in the shared client
+    JIRA_TIMEOUT_SECONDS = float(os.getenv("JIRA_TIMEOUT_SECONDS", "5"))  # Per-request connect/read timeout
+    JIRA_BREAKER_FAILURES = int(os.getenv("JIRA_BREAKER_FAILURES", "3"))  # Consecutive failures that open the breaker
+    JIRA_BREAKER_RESET_SECONDS = float(os.getenv("JIRA_BREAKER_RESET_SECONDS", "30"))  # Wait before a half-open trial call
+
+    # Background jobs
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # Worker threads running queued jobs
+    JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))  # Queue poll interval when idle
+    JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "7"))  # Finished jobs are pruned after this
 
     # Timewarrior
     TIMEWARRIOR_BIN = os.getenv("TIMEWARRIOR_BIN", "timew")
 
     # Database (SQLite URI)
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///switches.db")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "10000"))  # Wait this long for a write lock
+
+    # Responses
+    FAST_JSON = os.getenv("FAST_JSON", "true").lower() in ("1", "true", "yes")  # Serialize with orjson when installed
+    COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))  # Smaller responses go uncompressed; 0 disables compression
+    COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))  # Higher costs far more CPU per request
+
+    # Serving (gunicorn.conf.py)
+    WEB_BIND = os.getenv("WEB_BIND", "127.0.0.1:5000")
+    WEB_WORKERS = int(os.getenv("WEB_WORKERS", "2"))  # Processes
+    WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))  # Request threads per process; each open progress stream holds one
+    WEB_TIMEOUT_SECONDS = int(os.getenv("WEB_TIMEOUT_SECONDS", "120"))  # Silent worker is restarted after this
+    WEB_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("WEB_GRACEFUL_TIMEOUT_SECONDS", "30"))  # In-flight requests get this long on reload/stop
+
+    # ActivityWatch
+    ACTIVITYWATCH_URL = os.getenv("ACTIVITYWATCH_URL", "http://localhost:5600")
+    ACTIVITYWATCH_TIMEOUT_SECONDS = float(os.getenv("ACTIVITYWATCH_TIMEOUT_SECONDS", "2"))  # Local server; fail fast when it's down
+
+    # chaos-tracker
+    CHAOS_DB_PATH = os.getenv("CHAOS_DB_PATH")  # Defaults to the first chaos.db found in the usual places
+    CHAOS_FOCUS_MINUTES = int(os.getenv("CHAOS_FOCUS_MINUTES", "25"))  # Sessions at least this long count as focus time
+
+    # Switch-rate anomaly detection
+    ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", "3.0"))
+    ANOMALY_MIN_SAMPLES = int(os.getenv("ANOMALY_MIN_SAMPLES", "5"))
+    ANOMALY_EWMA_ALPHA = float(os.getenv("ANOMALY_EWMA_ALPHA", "0.2"))
 
 # you can import Config elsewhere as:
 # from config import Config
@@ -0,0 +1,41 @@
+# gunicorn.conf.py
+"""
+gunicorn settings for serving the tracker:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+WEB_WORKERS processes with WEB_THREADS request threads each (gthread), so
+a long request (a sync preview, a progress stream) never blocks the UI.
+The app is imported once in the master and shared by the forked workers;
+the database is set up there once. Background threads start per worker.
+
+    kill -HUP <master pid>    # Graceful restart of the workers; with preload_app they keep the
+                              # code and settings the master loaded
+    kill -USR2 <master pid>   # Start a new master with new code and settings, then QUIT the old one
+
+Settings come from the environment / .env (see config.py).
+"""
+
+from config import Config
+
+bind = Config.WEB_BIND
+workers = Config.WEB_WORKERS
+worker_class = "gthread"
+threads = Config.WEB_THREADS
+timeout = Config.WEB_TIMEOUT_SECONDS
+graceful_timeout = Config.WEB_GRACEFUL_TIMEOUT_SECONDS
+keepalive = 5
+preload_app = True
+accesslog = "-"
+
+
+def on_starting(server):
+    # Once per master start, before any worker exists
+    from app.app import init_app
+    init_app()
+
+
+def post_fork(server, worker):
+    # Threads started in the master wouldn't exist in the workers
+    from app.app import start_background_threads
+    start_background_threads()
@@ -0,0 +1,13 @@
+# tests/conftest.py
+
+import os
+import sys
+import tempfile
+
+# Config reads the environment when first imported: point it at a throwaway
+# database and no JIRA before any app module loads
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='tests-'), 'test.db')}"
+for name in ("JIRA_URL", "JIRA_USER", "JIRA_TOKEN"):
+    os.environ[name] = ""
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,24 @@
+# tests/test_date_ranges.py
+
+from datetime import date, timedelta
+import pytest
+from app.app import app, init_app, parse_date_range
+
+PATHS = ["/reconciliation", "/attribution", "/suggestions", "/analytics/chaos/correlation"]
+
+
+def test_defaults_end_today():
+    assert parse_date_range({}, default_days=7) == (date.today() - timedelta(days=6), date.today())
+    assert parse_date_range({"end_date": "2026-03-10"}, default_days=1) == (date(2026, 3, 10), date(2026, 3, 10))
+
+
+@pytest.mark.parametrize("path", PATHS)
+@pytest.mark.parametrize("query, error", [
+    ("start_date=2026-13-01", "Dates must be YYYY-MM-DD"),
+    ("start_date=2026-03-02&end_date=2026-03-01", "start_date must not be after end_date"),
+])
+def test_invalid_ranges_are_rejected(path, query, error):
+    init_app()
+    response = app.test_client().get(f"{path}?{query}")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": error}
@@ -0,0 +1,36 @@
+# tests/test_projects.py
+
+import sqlite3
+import pytest
+from app.budgets import project_of
+from app.models import project_expression
+
+TASKS = {
+    "OPS-123": "OPS",
+    "INT-001": "INT",
+    "AB2-7": "AB2",
+    "follow-up": None,
+    "code-review": None,
+    "O-1": None,
+    "2FA-1": None,
+    "OPS-": None,
+    "OPS-12a": None,
+    "OPS-1-2": None,
+    "ops-1": None,
+    "OPS-1\n": None,
+    "Meeting": None,
+    "": None,
+}
+
+
+@pytest.mark.parametrize("task, project", TASKS.items())
+def test_project_only_for_ticket_keys(task, project):
+    assert project_of(task) == project
+
+
+def test_sql_expression_agrees_with_python():
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE t (task TEXT)")
+    db.executemany("INSERT INTO t VALUES (?)", [(task,) for task in TASKS])
+    rows = db.execute(f"SELECT task, {project_expression('task')} FROM t").fetchall()
+    assert dict(rows) == {task: project_of(task) for task in TASKS}
@@ -0,0 +1,31 @@
+# tests/test_suggestions.py
+
+from app.suggestions import RuleMatcher
+
+
+def _rule(rule_id, pattern, ticket=None, tags=(), priority=100, field="title", is_regex=False):
+    return {"id": rule_id, "pattern": pattern, "is_regex": is_regex, "field": field,
+            "ticket": ticket, "tags": list(tags), "priority": priority}
+
+
+def test_overlapping_rules_all_match_and_best_priority_wins():
+    matcher = RuleMatcher([_rule(1, "dashboard", ticket="OPS-1", priority=1),
+                           _rule(2, "grafana dash", ticket="OPS-2", priority=50)])
+    ticket, _, rule_ids = matcher.classify("firefox", "grafana dashboard")
+    assert ticket == "OPS-1"
+    assert rule_ids == (1, 2)
+
+
+def test_rule_matching_inside_a_ticket_key_keeps_the_key():
+    matcher = RuleMatcher([_rule(1, "OPS", tags=["ops"])])
+    ticket, tags, rule_ids = matcher.classify("terminal", "fix OPS-77 bug")
+    assert ticket == "OPS-77"
+    assert tags == ("ops",)
+    assert rule_ids == (1,)
+
+
+def test_app_and_title_rules_combine_tags():
+    matcher = RuleMatcher([_rule(1, "code", tags=["dev"], field="app"),
+                           _rule(2, r"(?:feat|fix)/", tags=["branch"], is_regex=True)])
+    assert matcher.classify("Code", "fix/ABC-2 retry") == ("ABC-2", ("dev", "branch"), (1, 2))
+    assert matcher.classify("vim", "notes") == (None, (), ())
@@ -0,0 +1,40 @@
+# tests/test_timesync_api.py
+
+import pytest
+from app.app import app, init_app
+
+
+@pytest.fixture(scope="module")
+def client():
+    init_app()
+    return app.test_client()
+
+
+INTERVAL = {"id": 1, "ticket": "OPS-1", "start": "2026-10-01T09:00:00", "end": "2026-10-01T10:00:00",
+            "duration_seconds": 3600}
+
+
+@pytest.mark.parametrize("path", ["/timesync/sync", "/timesync/preview"])
+@pytest.mark.parametrize("body, error", [
+    ({"intervals": [{"ticket": "OPS-1"}], "aggregate": "day"}, "intervals[0].start must be an ISO date and time"),
+    ({"intervals": [{**INTERVAL, "duration_seconds": "3600"}]},
+     "intervals[0].duration_seconds must be a non-negative integer"),
+    ({"intervals": [{**INTERVAL, "end": None}], "aggregate": "block"}, "intervals[0].end must be an ISO date and time"),
+    ({"intervals": "OPS-1"}, "intervals must be a list"),
+    ([INTERVAL], "Expected a JSON object"),
+])
+def test_malformed_intervals_are_rejected(client, path, body, error):
+    response = client.post(path, json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": error}
+
+
+def test_sync_requires_intervals(client):
+    response = client.post("/timesync/sync", json={"intervals": []})
+    assert response.status_code == 400
+
+
+def test_preview_aggregates_valid_intervals(client):
+    response = client.post("/timesync/preview", json={"intervals": [INTERVAL], "aggregate": "day"})
+    assert response.status_code == 200
+    assert response.get_json()["summary"] == {"intervals": 1, "worklogs": 1, "total_seconds": 3600}
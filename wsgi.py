@@ -0,0 +1,18 @@
+# wsgi.py
+"""
+Production entry point:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Under gunicorn, gunicorn.conf.py runs the one-time setup in the master and
+starts the background threads in each worker after it forks. Any other
+WSGI server (single process) gets both here on import.
+"""
+
+import sys
+
+from app.app import app, init_app, start_background_threads
+
+if "gunicorn" not in sys.modules:
+    init_app()
+    start_background_threads()